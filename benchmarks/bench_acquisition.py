@@ -0,0 +1,244 @@
+"""
+Benchmarks of the acquisition and limit detection hot paths: frame
+parsing, history updates, direction estimates, the limit switch check,
+the latency from a pot limit crossing to ``Motor.reverse'', and the
+overhead of tracing and of recording telemetry.
+
+"""
+
+import logging
+import tempfile
+import threading
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import tracing
+from eigsep_motor_control.clock import VirtualClock
+from eigsep_motor_control.limit_switch_hit import LimitSwitches
+from eigsep_motor_control.sim import Simulator
+from eigsep_motor_control.telemetry import TelemetryRecorder
+
+from common import best_time, make_pot, result, volts_to_frames
+
+logger = logging.getLogger(__name__)
+
+
+def _ramp(n, lo=1.0, hi=2.0):
+    return np.linspace(lo, hi, n)[:, None] * np.ones(2)
+
+
+def _feed_live(ser, volts, rate, chunk=5):
+    """
+    Feed voltages to ``ser'' in chunks of ``chunk'' frames at ``rate''
+    frames per second, like the Pico, so that the timestamps of the pot
+    match the voltage steps.
+
+    """
+    t0 = time.monotonic()
+    for i in range(0, len(volts), chunk):
+        delay = t0 + i / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        ser.feed(volts_to_frames(volts[i : i + chunk]))
+    while ser.in_waiting:
+        time.sleep(0.001)
+
+
+def bench_parse(n):
+    """Frames decoded per second, in bulk and one at a time."""
+    pot = make_pot()
+    frames = volts_to_frames(_ramp(n))
+    pot.ser.feed(frames)
+    t0 = time.perf_counter()
+    while len(pot.read_analog_batch(timeout=0)):
+        pass
+    bulk = n / (time.perf_counter() - t0)
+    pot.ser.feed(frames)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        pot.read_analog()
+    single = n / (time.perf_counter() - t0)
+    return [
+        result("read_analog_batch_rate", bulk, "frames/s"),
+        result("read_analog_rate", single, "frames/s"),
+    ]
+
+
+def bench_history(n):
+    """Cost of adding readings to the history and the estimator."""
+    pot = make_pot()
+    pot.ser.feed(volts_to_frames(_ramp(n)))
+    t0 = time.perf_counter()
+    for _ in range(n):
+        pot.read_volts()
+    read_volts = (time.perf_counter() - t0) / n
+    batch = _ramp(50)
+    record = best_time(lambda: pot._record(batch), number=n // 50 + 1)
+    return [
+        result("read_volts", read_volts * 1e6, "us"),
+        result("record_50", record * 1e6, "us"),
+    ]
+
+
+def bench_direction(n):
+    """Cost of evaluating the pot direction and mean voltage change."""
+    pot = make_pot()
+    pot.ser.feed(volts_to_frames(_ramp(pot.size)))
+    pot.read_volts_batch(timeout=0)
+    return [
+        result(
+            "direction", best_time(lambda: pot.direction, n) * 1e6, "us"
+        ),
+        result("vdiff", best_time(lambda: pot.vdiff, n) * 1e6, "us"),
+    ]
+
+
+def bench_reverse_limit(n):
+    """
+    Per-sample cost of the limit switch checks of the controller
+    (``LimitSwitches.update'') while the motors move.
+
+    """
+    clock = VirtualClock()
+    motor = emc.DummyMotor(logger=logger, clock=clock)
+    pot = emc.DummyPotentiometer(motor)
+    sim = Simulator(motor, pot)
+    motor.set_velocity(250, 250)
+    sim.advance(5)
+    switches = LimitSwitches(motor, pot)
+    dt = best_time(switches.update, n)
+    return [result("reverse_limit_tick", dt * 1e6, "us")]
+
+
+def bench_latency(n):
+    """
+    Latency from the bytes of a pot limit crossing reaching the serial
+    port to ``Motor.reverse'', through the acquisition thread and the
+    controller, with a DummyMotor.
+
+    """
+    pot = make_pot()
+    motor = emc.DummyMotor(logger=logger)
+    motor.debounce_interval = 0
+    reversed_at = []
+    done = threading.Event()
+    reverse = motor.reverse
+
+    def timed_reverse(m, force=False):
+        reverse(m, force=force)
+        reversed_at.append(time.monotonic())
+        done.set()
+
+    motor.reverse = timed_reverse
+    controller = emc.Controller(motor, pot, motors=["az"], logger=logger)
+    pot.subscribe(controller.on_sample)
+    thd = threading.Thread(target=controller.run, daemon=True)
+    thd.start()
+    pot.start()
+    vmin, vmax = sorted(pot.VOLT_RANGE["az"])
+    pos = (vmin + vmax) / 2
+    latency = []
+    for i in range(n):
+        d = 1 if i % 2 == 0 else -1
+        motor.velocities["az"] = d * 100
+        # approach the limit at 0.5 V/s, far enough to not be predicted
+        end = vmax - 0.2 if d > 0 else vmin + 0.2
+        nframes = int(abs(end - pos) / 0.5 * pot.emit_rate) + 2
+        _feed_live(pot.ser, _ramp(nframes, pos, end), pot.emit_rate)
+        time.sleep(1 / pot.emit_rate)
+        done.clear()
+        pos = vmax + 0.01 if d > 0 else vmin - 0.01
+        t0 = time.monotonic()
+        pot.ser.feed(volts_to_frames([[pos, pos]]))
+        if done.wait(timeout=1):
+            latency.append(reversed_at[-1] - t0)
+    controller.stop()
+    pot.stop(timeout=1)
+    thd.join(timeout=1)
+    if not latency:
+        return [result("limit_to_reverse_median", np.nan, "ms")]
+    latency = np.array(latency) * 1e3
+    return [
+        result("limit_to_reverse_median", np.median(latency), "ms"),
+        result("limit_to_reverse_max", np.max(latency), "ms"),
+        result("limit_to_reverse_missed", n - len(latency), "count"),
+    ]
+
+
+def bench_tracing(n):
+    """Cost of the controller subscriber with tracing off and on."""
+    pot = make_pot()
+    motor = emc.DummyMotor(logger=logger)
+    controller = emc.Controller(motor, pot, motors=["az", "alt"])
+    # a reading beyond the limits, so that the tracer is used
+    pot._trigger_reverse = lambda m, v: True
+    v = np.array([1.0, 1.0])
+
+    def on_sample():
+        controller.on_sample(time.monotonic(), v)
+        controller.queue.queue.clear()
+
+    off = best_time(on_sample, n)
+    tracing.enable()
+    try:
+        on = best_time(on_sample, n)
+    finally:
+        tracing.disable()
+    return [
+        result("on_sample_trace_off", off * 1e6, "us"),
+        result("on_sample_trace_on", on * 1e6, "us"),
+    ]
+
+
+def bench_telemetry(n):
+    """
+    Per-sample cost on the acquisition thread of recording telemetry
+    versus logging each sample as text (to a file).
+
+    """
+    v = np.array([1.0, 2.0])
+    with tempfile.TemporaryDirectory() as d:
+        with TelemetryRecorder(d) as rec:
+            record = best_time(lambda: rec.sample(0.0, v), n)
+        log = logging.getLogger("bench_telemetry")
+        log.propagate = False
+        handler = logging.FileHandler(f"{d}/log.txt")
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        disabled = logging.root.manager.disable  # set by ``suite''
+        logging.disable(logging.NOTSET)
+        try:
+            text = best_time(
+                lambda: log.info(f"az: {v[0]:.3f} V, alt: {v[1]:.3f} V"), n
+            )
+        finally:
+            logging.disable(disabled)
+            log.removeHandler(handler)
+            handler.close()
+    return [
+        result("telemetry_sample", record * 1e6, "us"),
+        result("log_sample", text * 1e6, "us"),
+    ]
+
+
+def suite(quick=False):
+    n = 1000 if quick else 10000
+    logging.disable(logging.WARNING)
+    try:
+        return (
+            bench_parse(n)
+            + bench_history(n)
+            + bench_direction(n)
+            + bench_reverse_limit(n)
+            + bench_tracing(n)
+            + bench_telemetry(n)
+            + bench_latency(5 if quick else 20)
+        )
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    for r in suite():
+        print(f"{r['name']:26} {r['value']:12.3f} {r['unit']}")
@@ -0,0 +1,81 @@
+"""
+Round trip of commands through the control daemon: a client connected to
+a daemon owning a PololuMotor on the in-memory GPIO backend, and a new
+connection per command, as the command-line clients make.
+
+"""
+
+from argparse import ArgumentParser
+import logging
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.daemon import Client, Daemon
+from eigsep_motor_control.gpio import FakeGPIOBackend
+
+from common import result
+
+
+def start_daemon(path):
+    logger = logging.getLogger(__name__)
+    motor = emc.PololuMotor(logger=logger, backend=FakeGPIOBackend())
+    pot = emc.DummyPotentiometer(motor)
+    daemon = Daemon(motor, pot, path=path, logger=logger)
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    return daemon
+
+
+def bench_daemon(n):
+    """Seconds per set_velocity, status, and connect + stop."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "emc.sock")
+        daemon = start_daemon(path)
+        rng = np.random.default_rng(0)
+        vel = rng.integers(-480, 480, (n, 2)).tolist()
+        with Client(path) as client:
+            t0 = time.perf_counter()
+            for az, alt in vel:
+                client.set_velocity(az=az, alt=alt)
+            set_velocity = (time.perf_counter() - t0) / n
+            t0 = time.perf_counter()
+            for _ in range(n):
+                client.status()
+            status = (time.perf_counter() - t0) / n
+        t0 = time.perf_counter()
+        for _ in range(n // 10):
+            with Client(path) as client:
+                client.stop()
+        connect = (time.perf_counter() - t0) / (n // 10)
+        daemon.shutdown()
+    return set_velocity, status, connect
+
+
+def suite(quick=False):
+    logging.disable(logging.INFO)
+    try:
+        set_velocity, status, connect = bench_daemon(200 if quick else 2000)
+    finally:
+        logging.disable(logging.NOTSET)
+    return [
+        result("daemon_set_velocity", set_velocity * 1e6, "us"),
+        result("daemon_status", status * 1e6, "us"),
+        result("daemon_connect_stop", connect * 1e6, "us"),
+    ]
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=2000, help="Repetitions.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+    names = ["set_velocity", "status", "connect_stop"]
+    for name, dt in zip(names, bench_daemon(args.n)):
+        print(f"{name:13} {dt * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
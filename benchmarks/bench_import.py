@@ -0,0 +1,70 @@
+"""
+Import time of the package and of what the short-lived tools use, each in
+a fresh interpreter, and the modules they load.
+
+"""
+
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+from common import result
+
+ROOT = Path(__file__).resolve().parent.parent
+# name -> import statement
+STATEMENTS = {
+    "package": "import eigsep_motor_control",
+    "pololu": "from eigsep_motor_control import PololuMotor",
+    "dummy_motor": "from eigsep_motor_control import DummyMotor",
+    "potentiometer": "from eigsep_motor_control import Potentiometer",
+    "controller": "from eigsep_motor_control import Controller",
+}
+HEAVY = ["numpy", "serial", "yaml", "qwiic_scmd", "RPi"]
+
+CODE = """
+import sys, time
+t0 = time.perf_counter()
+{stmt}
+dt = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(dt, ",".join(heavy))
+"""
+
+
+def import_time(stmt, repeat=5):
+    """
+    Best time in seconds of an import statement in a new interpreter, and
+    the heavy dependencies it loaded.
+
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(ROOT)] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+    best, heavy = float("inf"), ""
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", CODE.format(stmt=stmt, heavy=HEAVY)],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        ).stdout.split()
+        best = min(best, float(out[0]))
+        heavy = out[1] if len(out) > 1 else ""
+    return best, heavy
+
+
+def suite(quick=False):
+    out = []
+    for name, stmt in STATEMENTS.items():
+        dt, _ = import_time(stmt, repeat=3 if quick else 10)
+        out.append(result(f"import_{name}", dt * 1e3, "ms"))
+    return out
+
+
+if __name__ == "__main__":
+    for name, stmt in STATEMENTS.items():
+        dt, heavy = import_time(stmt)
+        print(f"{name:14} {dt * 1e3:8.1f} ms  loads: {heavy or '-'}")
@@ -0,0 +1,78 @@
+"""
+Time the set_drive, set_velocity and cleanup paths of PololuMotor on the
+in-memory GPIO backend, i.e., the Python overhead without hardware.
+
+"""
+
+from argparse import ArgumentParser
+import logging
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.gpio import FakeGPIOBackend
+
+from common import result
+
+
+def make_motor():
+    return emc.PololuMotor(
+        logger=logging.getLogger(__name__), backend=FakeGPIOBackend()
+    )
+
+
+def bench_set_drive(n):
+    motor = make_motor()
+    speeds = np.random.default_rng(0).integers(0, motor.MAX_SPEED, n)
+    t0 = time.perf_counter()
+    for s in speeds:
+        motor.set_drive("az", 0, s)
+    return (time.perf_counter() - t0) / n
+
+
+def bench_set_velocity(n):
+    motor = make_motor()
+    rng = np.random.default_rng(0)
+    vel = rng.integers(motor.MIN_SPEED, motor.MAX_SPEED, (n, 2)).tolist()
+    t0 = time.perf_counter()
+    for az, alt in vel:
+        motor.set_velocity(az, alt)
+    return (time.perf_counter() - t0) / n
+
+
+def bench_cleanup(n):
+    total = 0.0
+    for _ in range(n):
+        motor = make_motor()
+        motor.set_velocity(100, 100)
+        t0 = time.perf_counter()
+        motor.cleanup()
+        total += time.perf_counter() - t0
+    return total / n
+
+
+def suite(quick=False):
+    n = 1000 if quick else 10000
+    return [
+        result("pololu_set_drive", bench_set_drive(n) * 1e6, "us"),
+        result("pololu_set_velocity", bench_set_velocity(n) * 1e6, "us"),
+        result("pololu_cleanup", bench_cleanup(n // 100) * 1e6, "us"),
+    ]
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=10000, help="Repetitions.")
+    args = parser.parse_args(argv)
+    results = {
+        "set_drive": bench_set_drive(args.n),
+        "set_velocity": bench_set_velocity(args.n),
+        "cleanup": bench_cleanup(max(args.n // 100, 1)),
+    }
+    for name, dt in results.items():
+        print(f"{name:13} {dt * 1e6:.2f} us")
+    return results
+
+
+if __name__ == "__main__":
+    main()
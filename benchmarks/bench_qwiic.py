@@ -0,0 +1,98 @@
+"""
+Compare I2C transactions and time per set_velocity command of QwiicMotor
+with and without batched (block) writes of the drive registers.
+
+"""
+
+from argparse import ArgumentParser
+import logging
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+
+from common import result
+
+
+class CountingI2C:
+    """Fake I2C bus counting transactions, with an optional bus delay."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.transactions = 0
+
+    def _transfer(self):
+        self.transactions += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    def readByte(self, address, register):
+        return 0xA9
+
+    def writeByte(self, address, register, value):
+        self._transfer()
+
+    def writeBlock(self, address, register, values):
+        self._transfer()
+
+
+def run(batch, commands, delay=0.0):
+    i2c = CountingI2C(delay=delay)
+    motor = emc.QwiicMotor(
+        logger=logging.getLogger(__name__), i2c_driver=i2c, batch=batch
+    )
+    i2c.transactions = 0
+    t0 = time.perf_counter()
+    for az, alt in commands:
+        motor.set_velocity(az, alt)
+    dt = time.perf_counter() - t0
+    return {
+        "batch": batch,
+        "commands": len(commands),
+        "transactions_per_command": i2c.transactions / len(commands),
+        "us_per_command": dt / len(commands) * 1e6,
+        "suppressed": motor.writes_suppressed,
+    }
+
+
+def suite(quick=False):
+    n = 1000 if quick else 10000
+    rng = np.random.default_rng(0)
+    commands = rng.integers(-254, 255, size=(n, 2)).tolist()
+    out = []
+    for batch in (False, True):
+        r = run(batch, commands)
+        name = "qwiic_batch" if batch else "qwiic_single"
+        out.append(
+            result(
+                f"{name}_transactions",
+                r["transactions_per_command"],
+                "transactions/command",
+            )
+        )
+        out.append(result(f"{name}_set_velocity", r["us_per_command"], "us"))
+    return out
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=10000, help="Commands.")
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="Seconds per transaction."
+    )
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(0)
+    # both motors change on every command, the worst case for coalescing
+    commands = rng.integers(-254, 255, size=(args.n, 2)).tolist()
+    results = [run(b, commands, delay=args.delay) for b in (False, True)]
+    for r in results:
+        print(
+            f"batch={r['batch']!s:5}  "
+            f"{r['transactions_per_command']:.2f} transactions/command  "
+            f"{r['us_per_command']:.1f} us/command"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
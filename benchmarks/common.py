@@ -0,0 +1,101 @@
+"""
+Helpers shared by the benchmarks.
+
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import protocol
+
+
+def best_time(fn, number=1000, repeat=5):
+    """
+    Best time per call of ``fn'' in seconds over ``repeat'' runs of
+    ``number'' calls, like ``timeit''.
+
+    """
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def result(name, value, unit):
+    return {"name": name, "value": float(value), "unit": unit}
+
+
+def volts_to_frames(volts, int_len=emc.serial_params.INT_LEN):
+    """Encode pot voltages, shape (N, 2), as Pico frames."""
+    res = 2**emc.Potentiometer.NBITS - 1
+    bits = np.round(np.asarray(volts) / emc.Potentiometer.VMAX * res)
+    return b"".join(
+        protocol.encode_frame(int(v1), int(v2))
+        for v1, v2 in bits.astype(int) * int_len
+    )
+
+
+class BufferSerial:
+    """
+    Serial port replaying a byte buffer, refilled with ``feed''. Reads
+    block up to ``timeout'' for the requested bytes, like pyserial.
+
+    """
+
+    def __init__(self, port=None, baudrate=None, timeout=None):
+        self.timeout = timeout
+        self.buf = bytearray()
+        self.cond = threading.Condition()
+
+    def feed(self, data):
+        with self.cond:
+            self.buf.extend(data)
+            self.cond.notify_all()
+
+    @property
+    def in_waiting(self):
+        return len(self.buf)
+
+    def read(self, size=1):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.buf) >= size, self.timeout)
+            data = bytes(self.buf[:size])
+            del self.buf[:size]
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        # keep the preloaded frames
+        pass
+
+
+@contextmanager
+def serial_port(ser):
+    """Make ``Potentiometer'' open ``ser'' instead of a serial port."""
+    orig = emc.potentiometer.serial.Serial
+    emc.potentiometer.serial.Serial = lambda **kwargs: ser
+    try:
+        yield ser
+    finally:
+        emc.potentiometer.serial.Serial = orig
+
+
+def make_pot():
+    """A Potentiometer on a ``BufferSerial'' with a full history."""
+    ser = BufferSerial(timeout=emc.Potentiometer.TIMEOUT)
+    size = emc.Potentiometer.DIRECTION_WINDOW * emc.serial_params.EMIT_RATE
+    ser.feed(volts_to_frames(np.full((int(size) + 1, 2), 1.65)))
+    with serial_port(ser):
+        pot = emc.Potentiometer()
+    return pot
@@ -0,0 +1,218 @@
+"""
+Run the benchmark suite and append the results to results.jsonl (not
+tracked by git), one JSON line per run tagged with the git commit, so that
+regressions are visible across commits:
+
+    python benchmarks/run_benchmarks.py            # run and store
+    python benchmarks/run_benchmarks.py --quick --no-save
+    python benchmarks/run_benchmarks.py --compare  # also diff to the last
+                                                   # run of another commit
+    python benchmarks/run_benchmarks.py --quick --baseline
+
+``--baseline'' compares to the committed baseline.jsonl instead; append a
+run to it with ``--output benchmarks/baseline.jsonl'' when a change is
+expected to move the numbers. Any missed event (the ``*_missed'' counts)
+fails the run, whatever the baseline.
+
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+import importlib
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+
+HERE = Path(__file__).parent
+RESULTS = HERE / "results.jsonl"
+BASELINE = HERE / "baseline.jsonl"
+MODULES = [
+    "bench_acquisition",
+    "bench_qwiic",
+    "bench_pololu",
+    "bench_import",
+    "bench_daemon",
+]
+# units where larger values are better, for all others smaller is better
+HIGHER_IS_BETTER = {"frames/s"}
+# suffix of the counts of missed events, which must be zero
+MISSED = "_missed"
+
+
+def git_commit():
+    """Commit hash of HEAD and whether the tree has local changes."""
+
+    def git(*args):
+        out = subprocess.run(
+            ["git", *args], cwd=HERE, capture_output=True, text=True
+        )
+        return out.stdout.strip()
+
+    return git("rev-parse", "HEAD") or None, bool(git("status", "--porcelain"))
+
+
+def run(modules=MODULES, quick=False):
+    """Run the ``suite'' function of each benchmark module."""
+    sys.path.insert(0, str(HERE))
+    results = []
+    for name in modules:
+        mod = importlib.import_module(name)
+        results.extend(mod.suite(quick=quick))
+    return results
+
+
+def load(path=RESULTS):
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save(record, path=RESULTS):
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def missed_events(record):
+    """
+    Print and return the names of the ``*_missed'' counts of ``record''
+    that are not zero.
+
+    """
+    missed = []
+    for name, (value, unit) in record["results"].items():
+        if name.endswith(MISSED) and value:
+            print(f"  {name:32} {value:8.0f} {unit}  FAILED")
+            missed.append(name)
+    return missed
+
+
+def compare(record, history, threshold=0.2, other_commit=True):
+    """
+    Print the change of each result relative to the latest stored run of
+    another commit (of any commit if not ``other_commit''), flagging
+    regressions larger than ``threshold''. Missed events are failures
+    with or without an earlier run.
+
+    Returns
+    -------
+    regressions : list of str
+        Names of the regressed benchmarks.
+    missed : list of str
+        Names of the ``*_missed'' counts that are not zero.
+
+    """
+    missed = missed_events(record)
+    base = None
+    for old in reversed(history):
+        if old["quick"] != record["quick"]:
+            continue
+        if not other_commit or old["commit"] != record["commit"]:
+            base = old
+            break
+    if base is None:
+        print("No earlier run to compare to.")
+        return [], missed
+    print(f"Compared to {base['commit'][:10]} ({base['date']}):")
+    regressions = []
+    for name, (value, unit) in record["results"].items():
+        if name.endswith(MISSED) or name not in base["results"]:
+            continue
+        old = base["results"][name][0]
+        if not old:
+            continue
+        change = (value - old) / abs(old)
+        worse = -change if unit in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:32} {change:+8.1%}{flag}")
+    return regressions, missed
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--quick", action="store_true", help="Fewer repetitions."
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="Do not store the results."
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="Compare to an earlier run."
+    )
+    parser.add_argument(
+        "--baseline",
+        nargs="?",
+        const=str(BASELINE),
+        default=None,
+        help="Compare to the latest run in this file (default: the "
+        "committed baseline.jsonl) instead of the stored results.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=str(RESULTS),
+        help="File the results are appended to.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown reported as a regression.",
+    )
+    parser.add_argument(
+        "--allow-slowdown",
+        action="store_true",
+        help="Report regressions without failing, e.g., on a machine other "
+        "than the one of the baseline. Missed events still fail.",
+    )
+    parser.add_argument(
+        "-m", "--module", action="append", help="Benchmark module(s) to run."
+    )
+    args = parser.parse_args(argv)
+    commit, dirty = git_commit()
+    results = run(modules=args.module or MODULES, quick=args.quick)
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "results": {r["name"]: [r["value"], r["unit"]] for r in results},
+    }
+    for r in results:
+        print(f"{r['name']:32} {r['value']:14.3f} {r['unit']}")
+    output = Path(args.output)
+    regressions = []
+    if args.baseline is not None:
+        history = load(Path(args.baseline))
+        regressions, missed = compare(
+            record, history, threshold=args.threshold, other_commit=False
+        )
+    elif args.compare:
+        regressions, missed = compare(
+            record, load(output), threshold=args.threshold
+        )
+    else:
+        missed = missed_events(record)
+    if os.environ.get("GITHUB_ACTIONS"):
+        # annotations, so that the results show on the workflow summary
+        for name in regressions:
+            print(f"::warning::Benchmark {name} regressed.")
+        for name in missed:
+            print(f"::error::Benchmark {name} missed events.")
+    if not args.no_save:
+        save(record, path=output)
+    if missed or (regressions and not args.allow_slowdown):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,40 @@
 __author__ = "EIGSEP Team"
 __version__ = "0.0.1"
 
-from .limit_switch_hit import reverse_limit
+# Public names and the modules defining them. They are imported on first
+# access (PEP 562), so a program only loads the drivers and dependencies
+# (numpy, serial, qwiic_scmd, RPi.GPIO, ...) of what it uses, and a
+# missing driver only fails when that driver is used.
+_LAZY = {
+    "reverse_limit": "limit_switch_hit",
+    "Controller": "controller",
+    "PololuMotor": "pololu",
+    "QwiicMotor": "qwiic",
+    "DummyMotor": "motor",
+    "Potentiometer": "potentiometer",
+    "DummyPotentiometer": "potentiometer",
+    "AsyncPotentiometer": "aio",
+}
 
-try:
-    from .motor import PololuMotor, QwiicMotor, DummyMotor
-except ImportError:
-    pass
-from .potentiometer import Potentiometer, DummyPotentiometer
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    import importlib
+
+    if name in _LAZY:
+        module = importlib.import_module(f"{__name__}.{_LAZY[name]}")
+        value = getattr(module, name)
+        globals()[name] = value  # later lookups skip __getattr__
+        return value
+    # submodules, e.g., ``emc.motor.MAX_SPEED''
+    try:
+        return importlib.import_module(f"{__name__}.{name}")
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,175 @@
+"""
+asyncio front end for the motors and potentiometers. One task reads the
+pots through a non-blocking serial transport and fans the samples out to
+any number of consumers, so that acquisition, control, telemetry and a
+command interface can share one event loop.
+
+"""
+
+import asyncio
+import logging
+from eigsep_motor_control.potentiometer import MOTOR_INDEX
+
+
+class AsyncPotentiometer:
+    def __init__(self, pot, bulk=True):
+        """
+        Async sample stream for a Potentiometer.
+
+        Parameters
+        ----------
+        pot : emc.Potentiometer
+            The potentiometer to read, without its acquisition thread (see
+            ``Potentiometer.start''). Its voltage history is updated and
+            its synchronous subscribers are notified as usual. Samples are
+            stamped with its ``clock''.
+        bulk : bool
+            Publish only the latest sample of each batch of frames read from
+            the port (see ``Potentiometer.start'').
+
+        """
+        self.pot = pot
+        self.bulk = bulk
+        self._queues = []
+
+    def subscribe(self, maxsize=1):
+        """
+        Get a queue receiving the (t, volts) samples. When the queue is
+        full the oldest sample is dropped, so slow consumers always see the
+        latest pot position.
+
+        Parameters
+        ----------
+        maxsize : int
+            Maximum number of samples to buffer. Unbounded if 0.
+
+        Returns
+        -------
+        queue : asyncio.Queue
+
+        """
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._queues.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        """Stop sending samples to a queue from ``subscribe''."""
+        self._queues.remove(queue)
+
+    async def samples(self, maxsize=1):
+        """Async iterator over the (t, volts) samples."""
+        queue = self.subscribe(maxsize=maxsize)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+    def _publish(self, t, v):
+        self.pot._publish(t, v)
+        for queue in self._queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((t, v))
+
+    def _fileno(self):
+        ser = getattr(self.pot, "ser", None)
+        try:
+            return ser.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    async def run(self):
+        """
+        Read the pots until cancelled. The serial port is watched with
+        ``loop.add_reader'' where possible; otherwise (e.g. the dummy pots)
+        the blocking read runs in the default executor.
+
+        Raises
+        ------
+        RuntimeError
+            If the acquisition thread of the pot is running, it would race
+            for the frames on the port.
+
+        """
+        if self.pot.acquiring:
+            raise RuntimeError(
+                "The pot acquisition thread is running, stop it first."
+            )
+        loop = asyncio.get_running_loop()
+        fd = self._fileno()
+        readable = asyncio.Event()
+        if fd is not None:
+            loop.add_reader(fd, readable.set)
+        try:
+            while True:
+                if fd is None:
+                    v = await loop.run_in_executor(
+                        None, self.pot.read_volts_batch, self.pot.TIMEOUT
+                    )
+                else:
+                    await readable.wait()
+                    readable.clear()
+                    v = self.pot.read_volts_batch(timeout=0)
+                if not len(v):
+                    continue
+                t = self.pot.clock.time()
+                if self.bulk:
+                    self._publish(t, v[-1])
+                else:
+                    for vi in v:
+                        self._publish(t, vi)
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+
+
+async def supervise(
+    motor, apot, motors=("az", "alt"), stall_timeout=None, logger=None
+):
+    """
+    Reverse the motors at the pot limits as samples arrive.
+
+    Parameters
+    ----------
+    motor : emc.Motor
+        The motor to control.
+    apot : AsyncPotentiometer
+        The async sample stream of the potentiometer.
+    motors : list of str
+        The motors to reverse at the pot limits ('az' and/or 'alt').
+    stall_timeout : float, optional
+        Stop the motors and return if the pots show no movement for this
+        many seconds. Runs until cancelled if None.
+    logger : logging.Logger
+        Logger to use. Defaults to the motor's logger.
+
+    """
+    if logger is None:
+        logger = getattr(motor, "logger", logging.getLogger(__name__))
+    pot = apot.pot
+    queue = apot.subscribe()
+    clock = pot.clock
+    last_motion = clock.time()
+    try:
+        while True:
+            if stall_timeout is None:
+                timeout = None
+            else:
+                deadline = last_motion + stall_timeout
+                timeout = max(deadline - clock.time(), 0)
+            try:
+                t, v = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("No movement detected from either motor.")
+                await motor.stop_async()
+                return
+            for m in motors:
+                trigger = pot._trigger_reverse(m, v[MOTOR_INDEX[m]])
+                if trigger and motor.should_reverse(m):
+                    await motor.reverse_async(m)
+            d = pot.direction
+            if d["az"] != 0 or d["alt"] != 0:
+                last_motion = t
+    finally:
+        apot.unsubscribe(queue)
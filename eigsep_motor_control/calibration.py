@@ -0,0 +1,292 @@
+"""
+Calibration of the pot voltage limits. Both axes are swept to their hard
+limits and back at the same time while one acquisition thread streams the
+pots; the limits are the extrema of the full streamed trace of each sweep,
+and a linear fit of each sweep measures the quality of the calibration.
+
+"""
+
+from collections import namedtuple
+import threading
+import numpy as np
+
+from eigsep_motor_control import config as emc_config
+from eigsep_motor_control.potentiometer import MOTOR_INDEX
+from eigsep_motor_control.ring_buffer import RingBuffer
+
+# calibration of one axis: the voltage extrema, and per sweep (forward,
+# reverse) the fitted pot velocity (V/s), the rms residual of the linear
+# fit (V) and its coefficient of determination, and the motor to pot gain
+# (V/s per unit of speed, see ``emc.config.gain'') averaged over the sweeps
+Calibration = namedtuple(
+    "Calibration",
+    ["vmin", "vmax", "slope", "rms", "r2", "gain", "duration", "samples"],
+)
+
+
+def fit_sweep(t, v):
+    """
+    Fit a line to the pot voltages of a sweep at constant speed.
+
+    Parameters
+    ----------
+    t : np.ndarray
+        Sample timestamps in seconds.
+    v : np.ndarray
+        Pot voltages.
+
+    Returns
+    -------
+    slope : float
+        Pot velocity in V/s.
+    rms : float
+        Rms of the residuals in V.
+    r2 : float
+        Coefficient of determination of the fit.
+
+    """
+    if len(t) < 3:
+        return np.nan, np.nan, np.nan
+    slope, offset = np.polyfit(t - t[0], v, 1)
+    resid = v - (slope * (t - t[0]) + offset)
+    ss_tot = np.sum((v - v.mean()) ** 2)
+    r2 = 1 - np.sum(resid**2) / ss_tot if ss_tot > 0 else np.nan
+    return float(slope), float(np.sqrt(np.mean(resid**2))), float(r2)
+
+
+class _Axis:
+    """State of the calibration sweeps of one axis."""
+
+    def __init__(self, motor, speed, t0, polarity=1):
+        self.motor = motor
+        self.sign = 1  # direction of the pot voltage change
+        self.speed = speed
+        self.polarity = polarity  # sign of the motor to pot gain
+        self.sweeps = []  # (sign, start index, end index, moving span)
+        self.error = None
+        self._start(0, t0)
+
+    def _start(self, i, t):
+        self.start = i
+        self.t_start = t
+        self.first_motion = None  # sample index the sweep began moving
+        self.last_motion = None
+
+    @property
+    def done(self):
+        return len(self.sweeps) == 2 or self.error is not None
+
+    @property
+    def velocity(self):
+        return 0 if self.done else self.sign * self.polarity * self.speed
+
+
+class Calibrator:
+    def __init__(
+        self,
+        motor,
+        pot,
+        motors=("az", "alt"),
+        settle=0.5,
+        stall_timeout=10,
+        timeout=600,
+    ):
+        """
+        Calibrate the pot voltage limits of the axes concurrently. Each
+        axis is driven towards increasing pot voltage until the pot stops
+        moving that way (the axis reached its limit switch), then back
+        until it stops again. The motion is found from the least squares
+        slope of the streamed trace over the last ``settle'' seconds.
+
+        Parameters
+        ----------
+        motor : emc.Motor
+            The motors. The sign of the ``gain'' of each axis in the config
+            (see ``emc.config.gain'') must be right.
+        pot : emc.Potentiometer
+            The pots, streaming from one acquisition thread (see
+            ``Potentiometer.start''); ``update'' is subscribed to it.
+        motors : list of str
+            The axes to calibrate.
+        settle : float
+            Seconds over which the slope of the pot voltage must not show
+            motion in the commanded direction before the sweep is
+            considered at its limit.
+        stall_timeout : float
+            Seconds a sweep may take to start moving before the axis is
+            considered stuck.
+        timeout : float
+            Maximum duration of the calibration in seconds (``run'').
+
+        """
+        self.motor = motor
+        self.pot = pot
+        self.motors = list(motors)
+        for m in self.motors:
+            if m not in MOTOR_INDEX:
+                raise ValueError(f"Invalid motor {m}, must be az or alt.")
+        self.settle = settle
+        self.stall_timeout = stall_timeout
+        self.timeout = timeout
+        self.times = []
+        self.volts = []
+        self._window = None  # (t, az, alt) of the last ``settle'' seconds
+        self.axes = {}
+        self.done = threading.Event()
+        self.logger = motor.logger
+
+    def begin(self, t0):
+        """Start the forward sweeps of all axes at time ``t0''."""
+        speed = self.motor.MAX_SPEED
+        self.axes = {
+            m: _Axis(
+                m, speed, t0, polarity=emc_config.polarity(self.pot.GAIN[m])
+            )
+            for m in self.motors
+        }
+        self.times.clear()
+        self.volts.clear()
+        size = int(round(self.settle * self.pot.emit_rate)) + 1
+        self._window = RingBuffer(max(2, size), 3)
+        self.done.clear()
+        self._command()
+
+    def _command(self):
+        vel = {m: 0 for m in MOTOR_INDEX}
+        for m, axis in self.axes.items():
+            vel[m] = axis.velocity
+        self.motor.set_velocity(vel["az"], vel["alt"])
+
+    def _trend(self):
+        """
+        Direction of each pot over the window of the last samples: the
+        sign of the least squares slope, 0 if it is within ``nsigma'' of
+        the estimator of the noise.
+
+        """
+        w = self._window.buf[: len(self._window)]
+        t = w[:, 0] - w[:, 0].mean()
+        tt = t @ t
+        if tt == 0:
+            return np.zeros(2)
+        slope = t @ w[:, 1:] / tt
+        est = self.pot.estimator
+        threshold = est.nsigma * np.sqrt(est.r / tt)
+        return np.where(np.abs(slope) > threshold, np.sign(slope), 0)
+
+    def update(self, t, v):
+        """
+        Add a pot sample and advance the sweeps. Subscriber for the pot
+        acquisition thread; commands the motors when a sweep ends.
+
+        """
+        if self.done.is_set():
+            return
+        i = len(self.times)
+        self.times.append(t)
+        self.volts.append(np.array(v, dtype=float))
+        self._window.append([t, v[0], v[1]])
+        trend = self._trend()
+        changed = False
+        for m, axis in self.axes.items():
+            if axis.done:
+                continue
+            if trend[MOTOR_INDEX[m]] == axis.sign:
+                if axis.first_motion is None:
+                    axis.first_motion = i
+                axis.last_motion = i
+                continue
+            if axis.first_motion is None:
+                if t - axis.t_start > self.stall_timeout:
+                    axis.error = "no movement"
+                    self.logger.warning(f"{m}: pot does not move, stopping.")
+                    changed = True
+                continue
+            if not self._window.full:
+                continue
+            # no motion over the window, at the limit, sweep back
+            moving = (axis.first_motion, axis.last_motion + 1)
+            axis.sweeps.append((axis.sign, axis.start, i + 1, moving))
+            dt = t - axis.t_start
+            self.logger.info(f"{m}: limit reached after {dt:.1f} s.")
+            axis.sign = -axis.sign
+            axis._start(i, t)
+            changed = True
+        if changed:
+            self._command()
+        if all(axis.done for axis in self.axes.values()):
+            self.done.set()
+
+    def run(self):
+        """
+        Calibrate with the pot acquisition thread, blocking until all
+        axes are done or ``timeout'' passes. The motors are stopped at
+        the end.
+
+        Returns
+        -------
+        results : dict
+            Maps each motor to its ``Calibration''.
+
+        """
+        self.begin(self.pot.clock.time())
+        self.pot.subscribe(self.update)
+        self.pot.start()
+        try:
+            if not self.done.wait(timeout=self.timeout):
+                self.logger.warning("Calibration timed out.")
+        finally:
+            self.pot.unsubscribe(self.update)
+            self.motor.stop()
+        return self.results()
+
+    def results(self):
+        """
+        Limits and fit quality of each axis from the streamed trace.
+
+        Returns
+        -------
+        results : dict
+            Maps each motor to its ``Calibration''. Raises RuntimeError if
+            an axis did not complete both sweeps.
+
+        """
+        t = np.array(self.times)
+        v = np.array(self.volts).reshape(-1, 2)
+        noise = np.sqrt(self.pot.estimator.r)  # of a pot reading in volts
+        out = {}
+        for m, axis in self.axes.items():
+            if len(axis.sweeps) < 2:
+                reason = axis.error or "timed out"
+                raise RuntimeError(f"Calibration of {m} failed: {reason}.")
+            col = v[:, MOTOR_INDEX[m]]
+            vmin, vmax = np.nan, np.nan
+            slope, rms, r2, gain = [], [], [], []
+            for sign, start, end, (m0, m1) in axis.sweeps:
+                if sign > 0:
+                    vmax = extreme = float(np.max(col[start:end]))
+                else:
+                    vmin = extreme = float(np.min(col[start:end]))
+                # the fit ends before the sweep reaches the limit (within the
+                # noise), in the middle of a sample interval at full speed;
+                # the window of the trend only flattens later
+                at_limit = sign * (col[m0:m1] - extreme) >= -3 * noise
+                if np.any(at_limit):
+                    m1 = m0 + max(2, int(np.argmax(at_limit)))
+                s, e, q = fit_sweep(t[m0:m1], col[m0:m1])
+                slope.append(s)
+                gain.append(s / (sign * axis.polarity * axis.speed))
+                rms.append(e)
+                r2.append(q)
+            start, end = axis.sweeps[0][1], axis.sweeps[-1][2]
+            out[m] = Calibration(
+                vmin=vmin,
+                vmax=vmax,
+                slope=tuple(slope),
+                rms=tuple(rms),
+                r2=tuple(r2),
+                gain=float(np.mean(gain)),
+                duration=float(t[end - 1] - t[start]),
+                samples=end - start,
+            )
+        return out
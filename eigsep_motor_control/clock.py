@@ -0,0 +1,58 @@
+"""
+Clocks used for timestamps, debouncing and waiting. The system clock is
+used on hardware; a virtual clock lets the simulator (see ``emc.sim'') run
+deterministically and faster than real time.
+
+"""
+
+import time
+
+
+class SystemClock:
+    """The real clock: ``time.monotonic'' and ``time.sleep''."""
+
+    virtual = False
+
+    @staticmethod
+    def time():
+        return time.monotonic()
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(seconds)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+
+    virtual = True
+
+    def __init__(self, t0=0.0):
+        """
+        Clock that only moves when advanced. Sleeping advances the clock,
+        or calls ``on_sleep'' (e.g., ``Simulator.advance'') to step a
+        simulation through the sleep.
+
+        Parameters
+        ----------
+        t0 : float
+            Initial time in seconds.
+
+        """
+        self.t = t0
+        self.on_sleep = None
+
+    def time(self):
+        return self.t
+
+    def advance(self, seconds):
+        """Move the clock forward without stepping anything."""
+        self.t += seconds
+
+    def sleep(self, seconds):
+        if self.on_sleep is None:
+            self.advance(seconds)
+        else:
+            self.on_sleep(seconds)
@@ -0,0 +1,358 @@
+"""
+Runtime configuration. The config file is looked up in order at
+
+    1. the path in the environment variable ``EIGSEP_MOTOR_CONFIG'',
+    2. ``USER_PATH'' (written by ``scripts/calibrate_pot.py''),
+    3. the config.yaml shipped with the package,
+
+parsed once per process, validated, and cached until the file changes.
+Potentiometers register with a watcher thread (see ``watch'') that
+applies new voltage limits as soon as they are written, so calibrations
+take effect without reinstalling the package or restarting a run.
+
+"""
+
+import copy
+import logging
+import os
+from pathlib import Path
+import threading
+import weakref
+import numpy as np
+import yaml
+
+ENV_VAR = "EIGSEP_MOTOR_CONFIG"
+USER_PATH = Path.home() / ".config" / "eigsep_motor_control" / "config.yaml"
+DEFAULT_PATH = Path(__file__).parent / "config.yaml"
+VMAX = 3.3  # pot voltages are between 0 and VMAX
+DEFAULT_GAIN = 1e-3  # pot V/s per unit motor speed, until calibrated
+WATCH_INTERVAL = 1.0  # seconds between checks of the config file
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cache = {}  # path -> (stat signature, validated config)
+
+
+def config_path():
+    """
+    The config file in use: ``ENV_VAR'' if set, else ``USER_PATH'' if it
+    exists, else the default shipped with the package.
+
+    """
+    env = os.environ.get(ENV_VAR)
+    if env:
+        return Path(env).expanduser()
+    if USER_PATH.exists():
+        return USER_PATH
+    return DEFAULT_PATH
+
+
+def user_path():
+    """The file new configurations are saved to (see ``save'')."""
+    env = os.environ.get(ENV_VAR)
+    if env:
+        return Path(env).expanduser()
+    return USER_PATH
+
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _check_range(name, volt_range):
+    if not isinstance(volt_range, dict):
+        raise ValueError(f"{name} must map az and alt to voltage limits.")
+    for m in ["az", "alt"]:
+        v = volt_range.get(m)
+        if v is None or len(v) != 2:
+            raise ValueError(f"{name} of {m} must be two voltages.")
+        v = np.asarray(v, dtype=float)
+        if not np.all(np.isfinite(v)) or np.any(v < 0) or np.any(v > VMAX):
+            raise ValueError(f"{name} of {m} must be between 0 and {VMAX}.")
+        if v[0] == v[1]:
+            raise ValueError(f"{name} of {m} is empty.")
+
+
+def gain(config):
+    """
+    Pot velocity (V/s) per unit of commanded motor speed of each axis, from
+    the ``gain'' section of the configuration (measured by
+    ``scripts/calibrate_pot.py''). The sign is the direction of the pot for
+    positive speeds. This is the only place the motor to pot sign is
+    configured; the estimator, ``Motor.goto'', the scans, and the limit
+    switch logic derive it from here (see ``polarity''). A gain of 0 makes
+    the estimator a constant-velocity model without control input.
+
+    Parameters
+    ----------
+    config : dict
+        The configuration.
+
+    Returns
+    -------
+    gain : dict
+        The gain of 'az' and 'alt'.
+
+    """
+    g = config.get("gain") or {}
+    return {m: float(g.get(m, DEFAULT_GAIN)) for m in ["az", "alt"]}
+
+
+def polarity(gain):
+    """
+    Direction of the pot for a positive motor speed, the sign of a motor
+    to pot gain. A gain of 0 has no sign and counts as positive.
+
+    Parameters
+    ----------
+    gain : float
+        The gain of an axis, see ``gain''.
+
+    Returns
+    -------
+    polarity : int
+        1 or -1.
+
+    """
+    return -1 if gain < 0 else 1
+
+
+def _check_positive(name, section, keys, strict=True):
+    for k in keys:
+        if k not in section:
+            continue
+        v = section[k]
+        if not isinstance(v, (int, float)) or not np.isfinite(v):
+            raise ValueError(f"{name}.{k} must be a number.")
+        if v < 0 or (strict and v == 0):
+            raise ValueError(f"{name}.{k} must be positive.")
+
+
+def validate(config):
+    """
+    Check the values of a configuration.
+
+    Parameters
+    ----------
+    config : dict
+        Parsed configuration.
+
+    Raises
+    ------
+    ValueError
+        If a value is missing or out of range.
+
+    """
+    if not isinstance(config, dict):
+        raise ValueError("The configuration must be a mapping.")
+    if "volt_range" not in config:
+        raise ValueError("The configuration has no volt_range.")
+    _check_range("volt_range", config["volt_range"])
+    if "dummy_volt_range" in config:
+        _check_range("dummy_volt_range", config["dummy_volt_range"])
+    for m, g in (config.get("gain") or {}).items():
+        if m not in ("az", "alt"):
+            raise ValueError(f"Invalid axis {m} in gain.")
+        if not isinstance(g, (int, float)) or not np.isfinite(g):
+            raise ValueError(f"gain.{m} must be a number.")
+    kalman = config.get("kalman") or {}
+    _check_positive("kalman", kalman, ["q", "r", "nsigma"])
+    _check_positive("kalman", kalman, ["tau"], strict=False)
+    for m, c in (config.get("predictive") or {}).items():
+        _check_positive(f"predictive.{m}", c, ["lead_time"], strict=False)
+    goto = config.get("goto") or {}
+    _check_positive("goto", goto, ["tol"])
+    _check_positive("goto", goto, ["settle"], strict=False)
+    for m, v in (config.get("stow") or {}).items():
+        if not 0 <= v <= VMAX:
+            raise ValueError(f"stow.{m} must be between 0 and {VMAX}.")
+    _check_mounts(config.get("mounts"))
+
+
+def _check_mounts(mounts):
+    """Check the ``mounts'' section, see ``emc.mount.load_mounts''."""
+    if mounts is None:
+        return
+    if not isinstance(mounts, list) or not mounts:
+        raise ValueError("mounts must be a non-empty list.")
+    names = set()
+    for m in mounts:
+        if not isinstance(m, dict):
+            raise ValueError("Each mount must be a mapping.")
+        name = m.get("name", "main")
+        if name in names:
+            raise ValueError(f"Duplicate mount name {name}.")
+        names.add(name)
+        if m.get("board", "pololu") not in ("pololu", "qwiic", "dummy"):
+            raise ValueError(f"Invalid board of mount {name}.")
+        axes = m.get("axes", ["az", "alt"])
+        if not axes or not set(axes) <= {"az", "alt"}:
+            raise ValueError(f"Axes of mount {name} must be az and/or alt.")
+        if "volt_range" in m:
+            _check_range(f"volt_range of mount {name}", m["volt_range"])
+
+
+def load(path=None, reload=False):
+    """
+    Read and validate a config file. The file is parsed once per process;
+    later calls return the cached result until the file changes.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path, optional
+        The file. Defaults to ``config_path()''.
+    reload : bool
+        Parse the file even if it has not changed.
+
+    Returns
+    -------
+    config : dict
+        A copy of the configuration, so callers may modify it.
+
+    """
+    path = Path(config_path() if path is None else path)
+    sig = _signature(path)
+    with _lock:
+        cached = _cache.get(path)
+        if reload or cached is None or cached[0] != sig:
+            with open(path, "r") as f:
+                config = yaml.safe_load(f)
+            validate(config)
+            cached = _cache[path] = (sig, config)
+        return copy.deepcopy(cached[1])
+
+
+def save(config, path=None):
+    """
+    Validate a configuration and write it atomically, so that running
+    processes never read a partial file.
+
+    Parameters
+    ----------
+    config : dict
+        The configuration.
+    path : str or pathlib.Path, optional
+        The file. Defaults to ``user_path()''.
+
+    Returns
+    -------
+    path : pathlib.Path
+        The file written.
+
+    """
+    validate(config)
+    path = Path(user_path() if path is None else path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        yaml.safe_dump(config, f)
+    os.replace(tmp, path)
+    return path
+
+
+class ConfigWatcher:
+    def __init__(self, interval=WATCH_INTERVAL):
+        """
+        Poll the config file in a thread and pass the new configuration to
+        the subscribers when it changes. A file that fails to parse or
+        validate is logged and ignored.
+
+        Parameters
+        ----------
+        interval : float
+            Seconds between checks of the file.
+
+        """
+        self.interval = interval
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = None  # (path, signature) of the last seen file
+
+    def subscribe(self, callback):
+        """
+        Register ``callback(config)''. Bound methods are held by weak
+        reference, so subscribing does not keep their object alive.
+
+        """
+        try:
+            ref = weakref.WeakMethod(callback)
+        except TypeError:
+            ref = lambda: callback  # noqa: E731
+        with self._lock:
+            self._subscribers.append(ref)
+            if self._state is None:
+                self._state = self._current()
+
+    def _current(self):
+        path = config_path()
+        try:
+            return path, _signature(path)
+        except OSError:
+            return path, None
+
+    def check(self):
+        """
+        Notify the subscribers if the config file changed since the last
+        check.
+
+        Returns
+        -------
+        bool
+            True if a new configuration was applied.
+
+        """
+        state = self._current()
+        if state == self._state or state[1] is None:
+            return False
+        self._state = state
+        try:
+            config = load(state[0])
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            logger.warning(f"Ignoring invalid config {state[0]}: {e}")
+            return False
+        logger.info(f"Config {state[0]} changed, applying.")
+        with self._lock:
+            refs = [r for r in self._subscribers if r() is not None]
+            self._subscribers = refs
+        for ref in refs:
+            callback = ref()
+            if callback is not None:
+                callback(copy.deepcopy(config))
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Start the polling thread if it is not running."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+
+watcher = ConfigWatcher()  # shared by the live potentiometers
+
+
+def watch(callback):
+    """
+    Call ``callback(config)'' whenever the config file changes, from the
+    shared watcher thread (started on first use).
+
+    """
+    watcher.subscribe(callback)
+    watcher.start()
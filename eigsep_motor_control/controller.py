@@ -0,0 +1,229 @@
+import itertools
+import logging
+import queue
+from threading import Event
+from eigsep_motor_control import tracing
+from eigsep_motor_control.clock import SYSTEM_CLOCK
+from eigsep_motor_control.limit_switch_hit import LimitSwitches
+from eigsep_motor_control.potentiometer import MOTOR_INDEX
+
+# events are handled in this order, reversals first so that they are not
+# delayed behind limit switch handling
+PRIORITY = {"reverse": 0, "stop": 1, "sample": 2}
+
+
+class Controller:
+    def __init__(
+        self,
+        motor,
+        pot,
+        motors=("az", "alt"),
+        safe=False,
+        stall_timeout=10,
+        logger=None,
+        clock=None,
+        telemetry=None,
+    ):
+        """
+        Event-driven control loop. Subscribe ``on_sample'' to the pot
+        acquisition thread and call ``run''; the loop blocks on a priority
+        queue and reverses a motor as soon as its pot crosses the voltage
+        limits. At most one 'sample' event is pending at a time.
+
+        Parameters
+        ----------
+        motor : emc.Motor
+            The motor to control.
+        pot : emc.Potentiometer
+            The potentiometer monitoring the motor.
+        motors : list of str
+            The motors to reverse at the pot limits ('az' and/or 'alt').
+        safe : bool
+            Also handle limit switch events and stop if the pots show no
+            movement for ``stall_timeout'' seconds.
+        stall_timeout : float
+            Seconds without pot movement before stopping in safe mode.
+        logger : logging.Logger
+            Logger to use. Defaults to the motor's logger.
+        clock : emc.clock.SystemClock or emc.clock.VirtualClock
+            Clock of the pot timestamps. Defaults to the motor's clock.
+            With a virtual clock, ``run'' cannot be used; the simulator
+            feeds the events to ``handle'' instead.
+        telemetry : emc.telemetry.TelemetryRecorder
+            Optional recorder of reversals and limit switch events.
+
+        """
+        self.motor = motor
+        self.pot = pot
+        self.motors = list(motors)
+        self.safe = safe
+        self.stall_timeout = stall_timeout
+        if logger is None:
+            logger = getattr(motor, "logger", logging.getLogger(__name__))
+        self.logger = logger
+        if clock is None:
+            clock = getattr(motor, "clock", SYSTEM_CLOCK)
+        self.clock = clock
+        self.queue = queue.PriorityQueue()
+        self._seq = itertools.count()  # first in, first out per priority
+        self._sample_pending = Event()
+        self._sample_t = None  # timestamp of the latest sample
+        # events indicating limit switches are triggered (az, alt)
+        self.limits = [Event(), Event()]
+        self.switches = LimitSwitches(motor, pot, self.limits)
+        self.last_motion = self.clock.time()
+        # seconds from the pot sample triggering a reversal to Motor.reverse
+        self.latencies = {m: [] for m in self.motors}
+        self.telemetry = telemetry
+
+    def post(self, kind, motor=None, t=None):
+        """
+        Put an event on the queue of the control loop.
+
+        Parameters
+        ----------
+        kind : str
+            One of 'reverse', 'sample', or 'stop'.
+        motor : str
+            The motor the event refers to, if any.
+        t : float
+            Timestamp (see ``clock'') of the pot sample causing the event.
+
+        """
+        self.queue.put((PRIORITY[kind], next(self._seq), kind, motor, t))
+
+    def get(self, timeout=None):
+        """
+        Take the next event off the queue, reversals first.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait for an event. Blocks until one arrives if None;
+            does not block if 0.
+
+        Returns
+        -------
+        event : tuple
+            The arguments of ``handle'': (kind, motor, t). Raises
+            queue.Empty if no event arrived in time.
+
+        """
+        if timeout == 0:
+            event = self.queue.get_nowait()
+        else:
+            event = self.queue.get(timeout=timeout)
+        return event[2:]
+
+    def on_sample(self, t, v):
+        """
+        Subscriber for the pot acquisition thread. Checks the limits of
+        each motor and posts events for the control loop.
+
+        """
+        for m in self.motors:
+            if self.pot._trigger_reverse(m, v[MOTOR_INDEX[m]]):
+                tr = tracing.tracer
+                if tr is not None:
+                    tr.stamp((m, t), "frame", t)
+                    tr.stamp((m, t), "trigger")
+                self.post("reverse", m, t)
+                if tr is not None:
+                    tr.stamp((m, t), "post")
+        if self.safe:
+            d = self.pot.direction
+            if d["az"] != 0 or d["alt"] != 0:
+                self.last_motion = t
+            # the handler reads the latest pot state, so one pending
+            # sample event covers all samples arriving before it runs
+            self._sample_t = t
+            if not self._sample_pending.is_set():
+                self._sample_pending.set()
+                self.post("sample", t=t)
+
+    def handle(self, kind, motor=None, t=None):
+        """
+        Act on an event from the queue.
+
+        Returns
+        -------
+        bool
+            False if the control loop should exit.
+
+        """
+        if kind == "stop":
+            return False
+        if kind == "reverse":
+            tr = tracing.tracer
+            if not self.motor.should_reverse(motor):
+                # already reversed, pot direction not updated yet
+                if tr is not None:
+                    tr.discard((motor, t))
+                return True
+            if tr is not None:
+                tr.stamp((motor, t), "reverse")
+            self.motor.reverse(motor)
+            if tr is not None:
+                tr.stamp((motor, t), "write")
+            latency = self.clock.time() - t
+            self.latencies[motor].append(latency)
+            if self.telemetry is not None:
+                self.telemetry.reversal(
+                    motor, latency, self.motor.velocities[motor]
+                )
+            predictor = getattr(self.pot, "predictor", None)
+            if predictor is not None:
+                predictor.observe_latency(motor, latency)
+            self.logger.info(
+                f"Reversed {motor} motor {latency * 1e3:.1f} ms after the "
+                "pot sample triggering it."
+            )
+        elif kind == "sample":
+            self._sample_pending.clear()
+            t = self._sample_t
+            before = [lim.is_set() for lim in self.limits]
+            self.switches.update(self.clock.time())
+            if self.telemetry is not None:
+                for m, lim, was in zip(MOTOR_INDEX, self.limits, before):
+                    if lim.is_set() != was:
+                        self.telemetry.limit(m, lim.is_set(), t=t)
+        return self._check_motion()
+
+    def _check_motion(self):
+        """Return False if no movement has been seen for too long."""
+        if not self.safe:
+            return True
+        if self.clock.time() >= self.last_motion + self.stall_timeout:
+            self.logger.warning(
+                "No movement detected from either motor. Exiting."
+            )
+            return False
+        return True
+
+    def run(self):
+        """
+        Run the control loop until ``stop'' is called or, in safe mode, no
+        movement is detected. Blocks on the event queue between events.
+
+        """
+        while True:
+            if self.safe:
+                timeout = self.last_motion + self.stall_timeout
+                timeout = max(timeout - self.clock.time(), 0)
+            else:
+                timeout = None
+            try:
+                event = self.get(timeout=timeout)
+            except queue.Empty:
+                if not self._check_motion():
+                    return
+                continue
+            tr = tracing.tracer
+            if tr is not None and event[0] == "reverse":
+                tr.stamp(event[1:], "wake")
+            if not self.handle(*event):
+                return
+
+    def stop(self):
+        """Make the control loop exit."""
+        self.post("stop")
@@ -0,0 +1,506 @@
+"""
+Control daemon. One long-running process owns the motor board and the pot
+reader, keeps the motors within their pot limits, and serves commands from
+any number of local clients over a Unix socket, so that commands take
+effect without initializing GPIO and the serial port again:
+
+    python scripts/daemon.py --board pololu &
+    python scripts/run.py --az 300
+    python scripts/stop.py
+
+The protocol is JSON lines. A request is an object with the command in
+``cmd'' and its arguments, e.g. ``{"cmd": "set_velocity", "az": 300}''; the
+reply is ``{"ok": true, ...}'' or ``{"ok": false, "type": ..., "error":
+...}''. After ``subscribe'', the daemon writes one ``{"t": ..., "v": [az,
+alt]}'' line per pot sample until the client disconnects.
+
+"""
+
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+
+SOCKET_PATH = os.environ.get(
+    "EIGSEP_MOTOR_SOCKET", "/tmp/eigsep_motor_control.sock"
+)
+SOCKET_MODE = 0o660  # clients of other users need the group of the daemon
+COMMANDS = (
+    "set_velocity",
+    "stop",
+    "goto",
+    "stow",
+    "calibrate",
+    "status",
+    "subscribe",
+    "shutdown",
+)
+SUBSCRIBE_QUEUE = 1000  # samples buffered per subscriber before dropping
+RESTART_DELAY = 1  # seconds before restarting a failed control loop
+# exceptions re-raised by the client, others become RuntimeError
+ERRORS = {e.__name__: e for e in (ValueError, TypeError, TimeoutError)}
+
+
+def _default(obj):
+    if hasattr(obj, "tolist"):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable.")
+
+
+def _encode(obj):
+    return (json.dumps(obj, default=_default) + "\n").encode()
+
+
+def _error(e):
+    return {"ok": False, "type": type(e).__name__, "error": str(e)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection, serving requests until it is closed."""
+
+    def handle(self):
+        daemon = self.server.motor_daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                cmd = request.pop("cmd")
+            except (ValueError, KeyError, AttributeError, TypeError):
+                e = ValueError("Requests must be JSON objects with a cmd.")
+                self.wfile.write(_encode(_error(e)))
+                continue
+            if cmd == "subscribe":
+                try:
+                    daemon.stream(self.wfile, **request)
+                except (TypeError, ValueError) as e:
+                    self.wfile.write(_encode(_error(e)))
+                    continue
+                return
+            self.wfile.write(_encode(daemon.execute(cmd, request)))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    def __init__(
+        self,
+        motor,
+        pot,
+        path=SOCKET_PATH,
+        safe=False,
+        logger=None,
+        telemetry=None,
+    ):
+        """
+        Serve commands for a motor and its pots on a Unix socket.
+
+        Parameters
+        ----------
+        motor : emc.Motor
+            The motors, owned by the daemon.
+        pot : emc.Potentiometer
+            The pots reading the motors. The acquisition thread is started
+            by ``start''.
+        path : str
+            Path of the socket, created with the mode ``SOCKET_MODE''.
+        safe : bool
+            Also handle limit switch events and stop the motors if the
+            pots show no movement while they are driven (see
+            ``emc.Controller'').
+        logger : logging.Logger
+            Logger to use. Defaults to the motor's logger.
+        telemetry : emc.telemetry.TelemetryRecorder
+            Optional recorder of the pot samples, velocities, and
+            reversals.
+
+        Raises
+        ------
+        RuntimeError
+            If another daemon is serving on ``path''.
+
+        """
+        from eigsep_motor_control.controller import Controller
+
+        self.motor = motor
+        self.pot = pot
+        self.path = str(path)
+        if logger is None:
+            logger = getattr(motor, "logger", logging.getLogger(__name__))
+        self.logger = logger
+        self.telemetry = telemetry
+        motor.attach_pot(pot)
+        pot.attach_motor(motor)
+        self.controller = Controller(
+            motor, pot, safe=safe, logger=logger, telemetry=telemetry
+        )
+        # limit checks are paused while calibrating, which drives the axes
+        # beyond the pot limits
+        self.limits_enabled = threading.Event()
+        self.limits_enabled.set()
+        self.busy = None  # name of the running goto/stow/calibrate
+        self.error = None  # last error of the control loop
+        self._lock = threading.Lock()  # serializes the client commands
+        self._cancel = threading.Event()
+        self._calibrator = None
+        self._closing = threading.Event()
+        self._control_thread = None
+        self._remove_stale_socket()
+        self.server = _Server(self.path, _Handler)
+        os.chmod(self.path, SOCKET_MODE)
+        self.server.motor_daemon = self
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(self.path)
+        except OSError:
+            os.unlink(self.path)  # left over by a daemon that died
+        else:
+            raise RuntimeError(f"A daemon is already serving {self.path}.")
+        finally:
+            s.close()
+
+    def _on_sample(self, t, v):
+        if not self.limits_enabled.is_set():
+            return
+        if not any(self.motor.velocities.values()):
+            # standing still on command is not a stall
+            self.controller.last_motion = t
+        self.controller.on_sample(t, v)
+
+    def _control(self):
+        while not self._closing.is_set():
+            try:
+                self.controller.run()
+            except Exception as e:
+                # keep serving with the motors off, the error is reported
+                # by status; wait before restarting the loop
+                self.motor.stop()
+                self.error = f"{type(e).__name__}: {e}"
+                self.logger.exception("Control loop failed, motors stopped.")
+                self._closing.wait(RESTART_DELAY)
+            if self._closing.is_set():
+                return
+            # no movement in safe mode, keep serving with the motors off
+            self.motor.stop()
+            self.controller.last_motion = self.controller.clock.time()
+
+    def start(self):
+        """Start the pot acquisition and the control loop."""
+        if self.telemetry is not None:
+            self.pot.subscribe(self.telemetry.sample)
+        self.pot.subscribe(self._on_sample)
+        self.pot.start()
+        self._control_thread = threading.Thread(
+            target=self._control, daemon=True
+        )
+        self._control_thread.start()
+
+    def serve_forever(self):
+        """
+        Start and serve the clients until ``shutdown'', then stop the
+        motors and release the socket.
+
+        """
+        if self._control_thread is None:
+            self.start()
+        self.logger.info(f"Serving on {self.path}.")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the motors, the control loop, and the pots."""
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        self._cancel.set()
+        self.server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.controller.stop()
+        if self._control_thread is not None:
+            self._control_thread.join(timeout=1)
+            self.pot.unsubscribe(self._on_sample)
+        self.pot.stop(timeout=1)
+        self.motor.stop()
+        self._record_velocity()
+
+    def shutdown(self):
+        """Make ``serve_forever'' return, from any thread."""
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def _record_velocity(self):
+        if self.telemetry is not None:
+            v = self.motor.velocities
+            self.telemetry.velocity(v["az"], v["alt"])
+
+    def execute(self, cmd, args):
+        """
+        Run a command.
+
+        Parameters
+        ----------
+        cmd : str
+            One of ``COMMANDS'' except ``subscribe''.
+        args : dict
+            Keyword arguments of the command.
+
+        Returns
+        -------
+        reply : dict
+            The result, with ``ok'' False and the error if the command
+            failed.
+
+        """
+        try:
+            if cmd not in COMMANDS or cmd == "subscribe":
+                raise ValueError(f"Invalid command {cmd}, use {COMMANDS}.")
+            reply = getattr(self, f"cmd_{cmd}")(**args)
+        except Exception as e:
+            self.logger.warning(f"{cmd} failed: {e}")
+            return _error(e)
+        return {"ok": True, **(reply or {})}
+
+    def _exclusive(self, name):
+        """Mark a long command as running, failing if another one is."""
+        with self._lock:
+            if self.busy is not None:
+                raise RuntimeError(f"Busy with {self.busy}.")
+            self.busy = name
+            self._cancel.clear()
+
+    def cmd_set_velocity(self, az=0, alt=0):
+        with self._lock:
+            if self.busy is not None:
+                raise RuntimeError(f"Busy with {self.busy}, stop it first.")
+            self.motor.set_velocity(az, alt)
+            self._record_velocity()
+        return {"velocities": dict(self.motor.velocities)}
+
+    def cmd_stop(self, motors=("az", "alt")):
+        """Stop the motors, cancelling a running goto or calibration."""
+        self._cancel.set()
+        calibrator = self._calibrator
+        if calibrator is not None:
+            calibrator.done.set()
+        with self._lock:
+            self.motor.stop(motors=motors)
+            self._record_velocity()
+        return {"velocities": dict(self.motor.velocities)}
+
+    def cmd_goto(self, az=None, alt=None, timeout=120):
+        self._exclusive("goto")
+        try:
+            results = self.motor.goto(
+                az=az, alt=alt, timeout=timeout, cancel=self._cancel
+            )
+        finally:
+            self.busy = None
+        return {"results": {m: r._asdict() for m, r in results.items()}}
+
+    def cmd_stow(self, motors=("az", "alt")):
+        from eigsep_motor_control.motion import load_motion_config
+
+        _, stow = load_motion_config()
+        if isinstance(motors, str):
+            motors = [motors]
+        return self.cmd_goto(**{m: stow[m] for m in motors})
+
+    def cmd_calibrate(self, motors=("az", "alt"), timeout=600):
+        """
+        Calibrate the pot limits (see ``emc.calibration.Calibrator''). The
+        results are returned, not saved; the client writes the config.
+
+        """
+        from eigsep_motor_control.calibration import Calibrator
+
+        calibrator = Calibrator(
+            self.motor, self.pot, motors=motors, timeout=timeout
+        )
+        self._exclusive("calibrate")
+        self._calibrator = calibrator
+        self.limits_enabled.clear()
+        try:
+            results = calibrator.run()
+        finally:
+            self.limits_enabled.set()
+            self._calibrator = None
+            self.busy = None
+        return {"results": {m: r._asdict() for m, r in results.items()}}
+
+    def cmd_status(self):
+        pot = self.pot
+        return {
+            "volts": pot.last_volts(),
+            "velocities": dict(self.motor.velocities),
+            "max_speed": self.motor.MAX_SPEED,
+            "direction": pot.direction,
+            "pot_velocity": pot.velocity,
+            "limits": {
+                m: lim.is_set()
+                for m, lim in zip(("az", "alt"), self.controller.limits)
+            },
+            "busy": self.busy,
+            "error": self.error,
+        }
+
+    def cmd_shutdown(self):
+        self.shutdown()
+
+    def stream(self, wfile, every=1, maxsize=SUBSCRIBE_QUEUE):
+        """
+        Write every ``every''-th pot sample to a client until it
+        disconnects. Samples are dropped rather than blocking the
+        acquisition thread if the client falls ``maxsize'' behind.
+
+        Raises
+        ------
+        ValueError
+            If ``every'' is not a positive integer.
+
+        """
+        if not isinstance(every, int) or every < 1:
+            raise ValueError("every must be a positive integer.")
+        samples = queue.Queue(maxsize)
+        dropped = 0
+
+        def on_sample(t, v):
+            nonlocal dropped
+            try:
+                samples.put_nowait((t, v.tolist()))
+            except queue.Full:
+                dropped += 1
+
+        self.pot.subscribe(on_sample)
+        try:
+            wfile.write(_encode({"ok": True}))
+            n = 0
+            while not self._closing.is_set():
+                try:
+                    t, v = samples.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                n += 1
+                if n % every == 0:
+                    wfile.write(_encode({"t": t, "v": v}))
+        except OSError:
+            pass  # client disconnected
+        finally:
+            self.pot.unsubscribe(on_sample)
+        if dropped:
+            self.logger.warning(f"Dropped {dropped} samples of a client.")
+
+
+class Client:
+    def __init__(self, path=SOCKET_PATH, timeout=None):
+        """
+        Connection to a ``Daemon''.
+
+        Parameters
+        ----------
+        path : str
+            Path of the daemon's socket.
+        timeout : float, optional
+            Timeout of the socket operations in seconds. Long commands
+            (goto, calibrate) block until they are done by default.
+
+        Raises
+        ------
+        ConnectionError
+            If no daemon is serving on ``path''.
+
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            self.sock.close()
+            raise ConnectionError(f"No daemon serving on {path}.") from e
+        self._file = self.sock.makefile("rwb")
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _readline(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The daemon closed the connection.")
+        return json.loads(line)
+
+    def call(self, cmd, **kwargs):
+        """
+        Send a command and wait for the reply.
+
+        Returns
+        -------
+        reply : dict
+            The reply of the daemon.
+
+        Raises
+        ------
+        ValueError, TypeError, TimeoutError, RuntimeError
+            The error of a failed command.
+
+        """
+        self._file.write(_encode({"cmd": cmd, **kwargs}))
+        self._file.flush()
+        reply = self._readline()
+        if not reply.pop("ok"):
+            raise ERRORS.get(reply["type"], RuntimeError)(reply["error"])
+        return reply
+
+    def set_velocity(self, az=0, alt=0):
+        return self.call("set_velocity", az=az, alt=alt)["velocities"]
+
+    def stop(self, motors=("az", "alt")):
+        return self.call("stop", motors=list(motors))["velocities"]
+
+    def goto(self, az=None, alt=None, timeout=120):
+        return self.call("goto", az=az, alt=alt, timeout=timeout)["results"]
+
+    def stow(self, motors=("az", "alt")):
+        return self.call("stow", motors=list(motors))["results"]
+
+    def calibrate(self, motors=("az", "alt"), timeout=600):
+        reply = self.call("calibrate", motors=list(motors), timeout=timeout)
+        return reply["results"]
+
+    def status(self):
+        return self.call("status")
+
+    def shutdown(self):
+        self.call("shutdown")
+
+    def subscribe(self, every=1):
+        """
+        Stream the pot samples. The connection is used for the stream
+        only from then on.
+
+        Yields
+        ------
+        t : float
+            Timestamp of the sample on the daemon's clock.
+        v : list of float
+            The (az, alt) voltages.
+
+        """
+        self.call("subscribe", every=every)
+        while True:
+            sample = self._readline()
+            yield sample["t"], sample["v"]
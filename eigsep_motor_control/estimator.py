@@ -0,0 +1,219 @@
+from math import erf, sqrt
+import numpy as np
+
+
+class KalmanEstimator:
+    def __init__(
+        self,
+        naxes=2,
+        q=1e-3,
+        r=1e-6,
+        tau=0.5,
+        gain=None,
+        nsigma=3.0,
+        v0=0.1,
+    ):
+        """
+        Position/velocity Kalman filter for the pots, run independently
+        (but vectorized) for each axis. Between samples the pot voltage
+        moves with the estimated velocity, which is driven by the
+        measurements only. The commanded motor velocity never biases the
+        estimate: a change of command by ``du'' widens the velocity
+        uncertainty by ``gain * du'' over ``tau'' seconds, so that the
+        filter follows a reversal quickly but a stalled pot, or one moving
+        against the command, is still reported as such.
+
+        Parameters
+        ----------
+        naxes : int
+            Number of axes (pots).
+        q : float
+            Spectral density of the velocity random walk, (V/s)^2 / s.
+        r : float
+            Variance of a pot reading in V^2.
+        tau : float
+            Response time of the pot velocity to a new motor command in
+            seconds.
+        gain : array_like, optional
+            Pot velocity in V/s per unit of commanded motor velocity, per
+            axis. Without a gain (or with zeros) the commanded velocity is
+            ignored.
+        nsigma : float
+            Number of standard deviations the velocity estimate must differ
+            from zero for a direction to be reported.
+        v0 : float
+            Initial velocity uncertainty in V/s.
+
+        """
+        self.naxes = naxes
+        self.q = q
+        self.r = r
+        self.tau = tau
+        if gain is None:
+            gain = np.zeros(naxes)
+        self.gain = np.asarray(gain, dtype=float)
+        self.nsigma = nsigma
+        self.v0 = v0
+        self.x = np.zeros((naxes, 2))  # position, velocity
+        self.P = np.zeros((naxes, 2, 2))
+        self.u = None  # last commanded velocity
+        # velocity variance of command changes not yet added to P
+        self._pending = np.zeros(naxes)
+        self._rate = np.zeros(naxes)  # of adding the pending variance
+        self.initialized = False
+
+    @classmethod
+    def from_config(cls, config, naxes=2):
+        """
+        Create an estimator from the ``kalman'' section of config.yaml. The
+        ``gain'' entry maps each axis ('az', 'alt') to its gain.
+
+        """
+        if not config:
+            return cls(naxes=naxes)
+        config = dict(config)
+        gain = config.pop("gain", None)
+        if gain is not None:
+            gain = [gain.get(m, 0.0) for m in ["az", "alt"][:naxes]]
+        return cls(naxes=naxes, gain=gain, **config)
+
+    def reset(self, z, u=None):
+        """
+        Initialize the state at a pot reading with zero velocity.
+
+        Parameters
+        ----------
+        z : array_like
+            Voltage of each pot.
+        u : array_like, optional
+            Commanded motor velocity of each axis. The initial velocity
+            uncertainty covers ``gain * u''.
+
+        """
+        self.x[:, 0] = z
+        self.x[:, 1] = 0
+        self.P[:] = 0
+        self.P[:, 0, 0] = self.r
+        self.P[:, 1, 1] = self.v0**2
+        self._pending[:] = 0
+        self._rate[:] = 0
+        self.u = None
+        if u is not None:
+            self.u = np.array(u, dtype=float)
+            self.P[:, 1, 1] += (self.gain * self.u) ** 2
+        self.initialized = True
+
+    def _command_noise(self, dt, u):
+        """
+        Velocity variance added in ``dt'' by changes of the command, spread
+        evenly over ``tau''.
+
+        """
+        if u is None or not np.any(self.gain):
+            return 0.0
+        u = np.asarray(u, dtype=float)
+        if self.u is not None and np.any(u != self.u):
+            self._pending += (self.gain * (u - self.u)) ** 2
+            if self.tau > 0:
+                self._rate = self._pending / self.tau
+        self.u = u.copy()
+        if self.tau > 0:
+            added = np.minimum(self._pending, self._rate * dt)
+        else:
+            added = self._pending.copy()
+        self._pending -= added
+        return added
+
+    def predict(self, dt, u=None):
+        """
+        Propagate the state by ``dt'' seconds.
+
+        Parameters
+        ----------
+        dt : float
+            Time step in seconds.
+        u : array_like, optional
+            Commanded motor velocity of each axis.
+
+        """
+        self.x[:, 0] += self.x[:, 1] * dt
+        # P = F P F^T + Q with F = [[1, dt], [0, 1]]
+        P = self.P
+        p00, p01, p11 = P[:, 0, 0], P[:, 0, 1], P[:, 1, 1]
+        n00 = p00 + 2 * dt * p01 + dt**2 * p11 + self.q * dt**3 / 3
+        n01 = p01 + dt * p11 + self.q * dt**2 / 2
+        n11 = p11 + self.q * dt + self._command_noise(dt, u)
+        P[:, 0, 0] = n00
+        P[:, 0, 1] = P[:, 1, 0] = n01
+        P[:, 1, 1] = n11
+
+    def update(self, z, dt, u=None):
+        """
+        Add a pot reading: propagate the state to it and correct.
+
+        Parameters
+        ----------
+        z : array_like
+            Voltage of each pot.
+        dt : float
+            Time since the previous reading in seconds.
+        u : array_like, optional
+            Commanded motor velocity of each axis.
+
+        """
+        if not self.initialized:
+            self.reset(z, u=u)
+            return
+        self.predict(dt, u=u)
+        P = self.P
+        s = P[:, 0, 0] + self.r
+        k0 = P[:, 0, 0] / s
+        k1 = P[:, 0, 1] / s
+        resid = np.asarray(z) - self.x[:, 0]
+        self.x[:, 0] += k0 * resid
+        self.x[:, 1] += k1 * resid
+        # P = (I - K H) P
+        p00, p01, p11 = P[:, 0, 0].copy(), P[:, 0, 1].copy(), P[:, 1, 1]
+        P[:, 0, 0] = (1 - k0) * p00
+        P[:, 0, 1] = P[:, 1, 0] = (1 - k0) * p01
+        P[:, 1, 1] = p11 - k1 * p01
+
+    @property
+    def position(self):
+        """Estimated voltage of each pot."""
+        return self.x[:, 0]
+
+    @property
+    def velocity(self):
+        """Estimated velocity of each pot in V/s."""
+        return self.x[:, 1]
+
+    @property
+    def velocity_sigma(self):
+        """Standard deviation of the velocity estimates in V/s."""
+        return np.sqrt(self.P[:, 1, 1])
+
+    def direction(self, threshold=0.0):
+        """
+        Direction of each pot: 1 (increasing voltage), -1 (decreasing), or
+        0 (stationary) if the velocity is not significantly different from
+        zero or below ``threshold'' (V/s).
+
+        """
+        v = self.velocity
+        moving = np.abs(v) > np.maximum(
+            self.nsigma * self.velocity_sigma, threshold
+        )
+        return np.where(moving, np.sign(v), 0).astype(int)
+
+    def confidence(self):
+        """
+        Probability that the sign of the velocity of each pot is correct,
+        between 0.5 (no information) and 1.
+
+        """
+        sigma = np.maximum(self.velocity_sigma, 1e-12)
+        return np.array(
+            [0.5 * (1 + erf(abs(v) / (s * sqrt(2))))
+             for v, s in zip(self.velocity, sigma)]
+        )
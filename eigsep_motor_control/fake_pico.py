@@ -0,0 +1,257 @@
+"""
+Emulator of the Pico pot reader (scripts/main.py) on a pseudo-terminal. It
+streams binary frames (see ``protocol'') and obeys the host commands, so
+that ``Potentiometer'' can be run against it through its serial port:
+
+    python -m eigsep_motor_control.fake_pico --rate 500
+    python scripts/run.py --pot --port /dev/pts/N
+
+The pots sweep back and forth between two voltages (triangle waves in
+antiphase for az and alt). Noise, timing jitter, dropped bytes, and bursty
+delivery can be added to load-test the acquisition path.
+
+"""
+
+from argparse import ArgumentParser
+import os
+import pty
+import select
+import threading
+import time
+import tty
+import numpy as np
+
+from eigsep_motor_control import protocol
+from eigsep_motor_control.serial_params import (
+    EMIT_RATE,
+    INT_LEN,
+    MAX_INT_LEN,
+    SAMPLE_RATE,
+)
+
+NBITS = 16
+VMAX = 3.3
+
+
+class FakePico:
+    def __init__(
+        self,
+        rate=EMIT_RATE,
+        int_len=INT_LEN,
+        volts=(0.5, 2.8),
+        period=20.0,
+        noise=0.0,
+        jitter=0.0,
+        drop=0.0,
+        burst=1,
+        seed=None,
+    ):
+        """
+        Open a pseudo-terminal and emulate the Pico on it.
+
+        Parameters
+        ----------
+        rate : int
+            Frames per second, as set by the 'R' command.
+        int_len : int
+            Number of ADC samples summed per frame, as set by the 'I'
+            command.
+        volts : tuple
+            Minimum and maximum pot voltage of the sweep.
+        period : float
+            Period of the sweep in seconds.
+        noise : float
+            Standard deviation of the Gaussian noise of each reading in
+            volts.
+        jitter : float
+            Each frame is written a uniform random time up to ``jitter''
+            seconds after its slot in the absolute schedule of ``rate''
+            frames per second, so the delays do not accumulate.
+        drop : float
+            Probability of dropping each byte.
+        burst : int
+            Frames are held and written together in bursts of this many.
+        seed : int, optional
+            Seed of the random number generator.
+
+        """
+        if not 0 < rate <= SAMPLE_RATE:
+            raise ValueError(f"Rate must be 1-{SAMPLE_RATE} Hz.")
+        if not 1 <= int_len <= MAX_INT_LEN:
+            raise ValueError(f"Integration length must be 1-{MAX_INT_LEN}.")
+        if burst < 1:
+            raise ValueError("Burst must be at least 1 frame.")
+        self.rate = rate
+        self.int_len = int_len
+        self.volts = volts
+        self.period = period
+        self.noise = noise
+        self.jitter = jitter
+        self.drop = drop
+        self.burst = burst
+        self.rng = np.random.default_rng(seed)
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # no echo or newline translation
+        # frames are lost rather than blocking when nobody reads the port
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.nframes = 0
+        self.commands = []  # (name, value) received from the host
+        self._cmd = b""
+        self._running = threading.Event()
+        self._thread = None
+
+    def volts_at(self, t):
+        """Voltages (az, alt) of the pots at time ``t''."""
+        phase = (t / self.period) % 1
+        tri = 1 - np.abs(2 * phase - 1)  # 0 -> 1 -> 0
+        lo, hi = self.volts
+        v = lo + (hi - lo) * np.array([tri, 1 - tri])
+        if self.noise:
+            v = v + self.rng.normal(0, self.noise, 2)
+        return np.clip(v, 0, VMAX)
+
+    def frame(self, t):
+        """Encode the boxcar sums of the pot readings at time ``t''."""
+        counts = self.volts_at(t) / VMAX * (2**NBITS - 1)
+        v1, v2 = np.round(counts * self.int_len).astype(int)
+        return protocol.encode_frame(int(v1), int(v2))
+
+    def handle(self, line):
+        """Apply a command from the host, like ``handle'' in main.py."""
+        try:
+            name, value = line.split()
+            value = int(value)
+        except ValueError:
+            return
+        self.commands.append((name, value))
+        if name == protocol.CMD_INT_LEN and 1 <= value <= MAX_INT_LEN:
+            self.int_len = value
+        elif name == protocol.CMD_EMIT_RATE and 0 < value <= SAMPLE_RATE:
+            self.rate = value
+
+    def _read_commands(self, timeout):
+        """Read and apply host commands, waiting up to ``timeout''."""
+        r, _, _ = select.select([self.master], [], [], max(timeout, 0))
+        if not r:
+            return
+        try:
+            data = os.read(self.master, 1024)
+        except OSError:  # nothing to read, or the host closed the port
+            return
+        self._cmd += data
+        while b"\n" in self._cmd:
+            line, self._cmd = self._cmd.split(b"\n", 1)
+            self.handle(line.decode(errors="replace"))
+
+    def _write(self, data):
+        if self.drop:
+            keep = self.rng.random(len(data)) >= self.drop
+            data = bytes(np.frombuffer(data, dtype=np.uint8)[keep])
+        try:
+            os.write(self.master, data)
+        except BlockingIOError:
+            pass
+
+    def _delay(self):
+        """Random delay of a frame from its slot in the schedule."""
+        return self.rng.uniform(0, self.jitter) if self.jitter else 0.0
+
+    def run(self, duration=None):
+        """
+        Stream frames until ``stop'' is called or for ``duration''
+        seconds.
+
+        """
+        self._running.set()
+        t0 = time.monotonic()
+        next_emit = t0  # slot (sample time) of the next frame
+        due = next_emit + self._delay()  # when the next frame is written
+        held = []
+        while self._running.is_set():
+            now = time.monotonic()
+            if duration is not None and now - t0 >= duration:
+                break
+            self._read_commands(due - now)
+            now = time.monotonic()
+            if now < due:
+                continue
+            t_frame = next_emit
+            next_emit += 1 / self.rate
+            if now - next_emit > 1:  # fell far behind, do not catch up
+                next_emit = now
+            due = next_emit + self._delay()
+            held.append(self.frame(t_frame - t0))
+            self.nframes += 1
+            if len(held) >= self.burst:
+                self._write(b"".join(held))
+                held = []
+        self._running.clear()
+
+    def start(self):
+        """Stream frames in a background thread."""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        # wait for the thread to start so that stop() always stops it
+        while not self._running.is_set() and self._thread.is_alive():
+            time.sleep(0.001)
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="Emulate the Pico pot reader.")
+    parser.add_argument(
+        "--rate", type=int, default=EMIT_RATE, help="Frames per second."
+    )
+    parser.add_argument(
+        "--int_len", type=int, default=INT_LEN, help="Samples per frame."
+    )
+    parser.add_argument(
+        "--period", type=float, default=20.0, help="Sweep period (s)."
+    )
+    parser.add_argument(
+        "--noise", type=float, default=0.0, help="Reading noise (V)."
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Max frame delay (s)."
+    )
+    parser.add_argument(
+        "--drop", type=float, default=0.0, help="Byte drop probability."
+    )
+    parser.add_argument(
+        "--burst", type=int, default=1, help="Frames per write."
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    pico = FakePico(
+        rate=args.rate,
+        int_len=args.int_len,
+        period=args.period,
+        noise=args.noise,
+        jitter=args.jitter,
+        drop=args.drop,
+        burst=args.burst,
+        seed=args.seed,
+    )
+    print(f"Fake Pico on {pico.port}", flush=True)
+    try:
+        pico.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Sent {pico.nframes} frames.")
+        pico.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+GPIO/PWM backends for the Pololu motor driver. All backends use BCM pin
+numbers and duty cycles in percent.
+
+"""
+
+import time
+
+
+class GPIOBackend:
+    """Interface of the GPIO backends used by ``PololuMotor''."""
+
+    HIGH = 1
+    LOW = 0
+
+    def setup_output(self, pins):
+        """Configure pin(s) as outputs."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def setup_input(self, pin):
+        """Configure a pin as input."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def output(self, pin, value):
+        """Set an output pin HIGH (1) or LOW (0)."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def input(self, pin):
+        """Read an input pin."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def pwm_start(self, pin, frequency, duty_cycle=0):
+        """Start PWM on a pin at ``frequency'' Hz."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def pwm_duty_cycle(self, pin, duty_cycle):
+        """Change the duty cycle (0-100) of a running PWM."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def pwm_frequency(self, pin, frequency):
+        """Change the frequency of a running PWM."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def pwm_stop(self, pin):
+        """Stop PWM on a pin."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def cleanup(self):
+        """Release the pins."""
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+
+class RPiGPIOBackend(GPIOBackend):
+    def __init__(self):
+        """
+        Backend using RPi.GPIO. PWM is timed in software by a thread per
+        pin, which costs CPU and jitters at high frequencies.
+
+        """
+        from RPi import GPIO
+
+        self.GPIO = GPIO
+        self.HIGH = GPIO.HIGH
+        self.LOW = GPIO.LOW
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        self.pwm = {}
+
+    def setup_output(self, pins):
+        self.GPIO.setup(pins, self.GPIO.OUT)
+
+    def setup_input(self, pin):
+        self.GPIO.setup(pin, self.GPIO.IN)
+
+    def output(self, pin, value):
+        self.GPIO.output(pin, value)
+
+    def input(self, pin):
+        return self.GPIO.input(pin)
+
+    def pwm_start(self, pin, frequency, duty_cycle=0):
+        self.pwm[pin] = self.GPIO.PWM(pin, frequency)
+        self.pwm[pin].start(duty_cycle)
+
+    def pwm_duty_cycle(self, pin, duty_cycle):
+        self.pwm[pin].ChangeDutyCycle(duty_cycle)
+
+    def pwm_frequency(self, pin, frequency):
+        self.pwm[pin].ChangeFrequency(frequency)
+
+    def pwm_stop(self, pin):
+        self.pwm.pop(pin).stop()
+
+    def cleanup(self):
+        for pin in list(self.pwm):
+            self.pwm_stop(pin)
+        self.GPIO.cleanup()
+
+
+class PigpioBackend(GPIOBackend):
+
+    # range of the duty cycle of pigpio's hardware_PWM
+    DUTY_RANGE = 1_000_000
+
+    def __init__(self, host="localhost", port=8888):
+        """
+        Backend using the hardware PWM peripheral through the pigpio
+        daemon (``sudo pigpiod''). PWM is generated without CPU load or
+        jitter, but only on the hardware PWM pins (12, 13, 18, 19).
+
+        Parameters
+        ----------
+        host : str
+            Host running pigpiod.
+        port : int
+            Port of pigpiod.
+
+        """
+        import pigpio
+
+        self.pigpio = pigpio
+        self.pi = pigpio.pi(host, port)
+        if not self.pi.connected:
+            raise RuntimeError(f"Cannot connect to pigpiod at {host}:{port}.")
+        self.pwm = {}  # pin: [frequency, duty cycle]
+
+    def setup_output(self, pins):
+        if isinstance(pins, int):
+            pins = [pins]
+        for pin in pins:
+            self.pi.set_mode(pin, self.pigpio.OUTPUT)
+
+    def setup_input(self, pin):
+        self.pi.set_mode(pin, self.pigpio.INPUT)
+
+    def output(self, pin, value):
+        self.pi.write(pin, value)
+
+    def input(self, pin):
+        return self.pi.read(pin)
+
+    def _write_pwm(self, pin):
+        frequency, duty_cycle = self.pwm[pin]
+        duty = int(round(duty_cycle / 100 * self.DUTY_RANGE))
+        self.pi.hardware_PWM(pin, int(frequency), duty)
+
+    def pwm_start(self, pin, frequency, duty_cycle=0):
+        self.pwm[pin] = [frequency, duty_cycle]
+        self._write_pwm(pin)
+
+    def pwm_duty_cycle(self, pin, duty_cycle):
+        self.pwm[pin][1] = duty_cycle
+        self._write_pwm(pin)
+
+    def pwm_frequency(self, pin, frequency):
+        self.pwm[pin][0] = frequency
+        self._write_pwm(pin)
+
+    def pwm_stop(self, pin):
+        self.pwm.pop(pin)
+        self.pi.hardware_PWM(pin, 0, 0)
+
+    def cleanup(self):
+        for pin in list(self.pwm):
+            self.pwm_stop(pin)
+        self.pi.stop()
+
+
+class FakeGPIOBackend(GPIOBackend):
+    def __init__(self):
+        """
+        In-memory backend recording every call, for tests and benchmarks
+        without hardware. Inputs read HIGH unless set in ``inputs''.
+
+        Attributes
+        ----------
+        calls : list
+            (time.monotonic, method name, args) of every call.
+        pins : dict
+            Mode ('out' or 'in') of each configured pin.
+        levels : dict
+            Last value written to each output pin.
+        pwm : dict
+            [frequency, duty cycle] of each running PWM.
+
+        """
+        self.calls = []
+        self.pins = {}
+        self.levels = {}
+        self.inputs = {}
+        self.pwm = {}
+
+    def _record(self, name, *args):
+        self.calls.append((time.monotonic(), name, args))
+
+    def setup_output(self, pins):
+        self._record("setup_output", pins)
+        if isinstance(pins, int):
+            pins = [pins]
+        for pin in pins:
+            self.pins[pin] = "out"
+
+    def setup_input(self, pin):
+        self._record("setup_input", pin)
+        self.pins[pin] = "in"
+
+    def output(self, pin, value):
+        self._record("output", pin, value)
+        if self.pins.get(pin) != "out":
+            raise RuntimeError(f"Pin {pin} is not set up as an output.")
+        self.levels[pin] = value
+
+    def input(self, pin):
+        self._record("input", pin)
+        return self.inputs.get(pin, self.HIGH)
+
+    def pwm_start(self, pin, frequency, duty_cycle=0):
+        self._record("pwm_start", pin, frequency, duty_cycle)
+        self.pwm[pin] = [frequency, duty_cycle]
+
+    def pwm_duty_cycle(self, pin, duty_cycle):
+        self._record("pwm_duty_cycle", pin, duty_cycle)
+        self.pwm[pin][1] = duty_cycle
+
+    def pwm_frequency(self, pin, frequency):
+        self._record("pwm_frequency", pin, frequency)
+        self.pwm[pin][0] = frequency
+
+    def pwm_stop(self, pin):
+        self._record("pwm_stop", pin)
+        del self.pwm[pin]
+
+    def cleanup(self):
+        self._record("cleanup")
+        self.pwm.clear()
+        self.pins.clear()
+
+
+BACKENDS = {
+    "rpi": RPiGPIOBackend,
+    "pigpio": PigpioBackend,
+    "fake": FakeGPIOBackend,
+}
+
+
+def get_backend(backend):
+    """
+    Get a GPIO backend.
+
+    Parameters
+    ----------
+    backend : str or GPIOBackend
+        Name of the backend ('rpi', 'pigpio', or 'fake'), or an instance
+        which is returned as is.
+
+    Returns
+    -------
+    GPIOBackend
+
+    """
+    if isinstance(backend, GPIOBackend):
+        return backend
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown GPIO backend {backend!r}, must be one of "
+            f"{list(BACKENDS)}."
+        )
+    return cls()
@@ -1,5 +1,28 @@
+from threading import Event
 import numpy as np
-import time
+
+from eigsep_motor_control import config as emc_config
+
+
+def switch_reached(commanded, direction):
+    """
+    Whether a limit switch is reached: the pot moves against the commanded
+    direction.
+
+    Parameters
+    ----------
+    commanded : int or np.ndarray
+        Expected direction of the pot from the commanded velocity (see
+        ``emc.config.gain''), 0 if stopped.
+    direction : int or np.ndarray
+        Direction of the pot, 0 if stationary.
+
+    Returns
+    -------
+    bool or np.ndarray
+
+    """
+    return (commanded != 0) & (direction != 0) & (direction != commanded)
 
 
 def limit_switch(motor, m, pot):
@@ -27,20 +50,109 @@ def limit_switch(motor, m, pot):
 
     """
     velocity = m.velocities[motor]
-    direction = np.sign(velocity)
+    # expected direction of the pot, see emc.config.gain
+    direction = np.sign(velocity) * emc_config.polarity(pot.GAIN[motor])
     if m.limit_reversal:
         direction *= -1
-    if velocity == 0 or pot.direction[motor] == 0:
-        return False
-    #print(pot.direction, direction)
-    return (pot.direction[motor] != direction) and m.should_reverse(motor)
+    return bool(switch_reached(direction, pot.direction[motor])) and (
+        m.should_reverse(motor)
+    )
+
+
+class LimitSwitches:
+    # seconds after reversing off a released limit switch before the switch
+    # is checked again, so that the pot direction follows the new velocity
+    RELEASE_WAIT = 1
+
+    def __init__(self, m, pot, limits=None):
+        """
+        Limit switch handling of ``reverse_limit'' as a state machine that
+        is advanced by ``update'' on every pot sample and never blocks, so
+        that the control loop keeps handling pot limit reversals while a
+        released axis waits for its pot.
+
+        Parameters
+        ----------
+        m : object
+            A motor object from the Motor class
+        pot : object
+            A pot object from the Potentiometer class
+        limits : list
+            Events set while the limit switch of each motor (az, alt) is
+            reached. Created if not given.
+
+        """
+        self.m = m
+        self.pot = pot
+        if limits is None:
+            limits = [Event(), Event()]
+        self.limits = limits
+        # time each motor was reversed off its released switch, if waiting
+        self.released = {"az": None, "alt": None}
+
+    @property
+    def waiting(self):
+        """Whether a motor waits for its pot after a release reversal."""
+        return any(t is not None for t in self.released.values())
+
+    def update(self, now=None):
+        """
+        Check the limit switches of both motors on the latest pot state.
+
+        Parameters
+        ----------
+        now : float
+            Current time on the clock of the motor. Defaults to
+            ``m.clock.time()''.
+
+        Returns
+        ----------
+        limits : list
+            The updated list of limit events.
+
+        """
+        m, pot = self.m, self.pot
+        if now is None:
+            now = m.clock.time()
+        for motor, limit in zip(["az", "alt"], self.limits):
+            released = self.released[motor]
+            if released is not None:
+                if now - released < self.RELEASE_WAIT:
+                    continue
+                limit.clear()
+                # until pot.direction follows the reversal
+                if not (limit_switch(motor, m, pot) or m.limit_reversal):
+                    self.released[motor] = None
+                continue
+            if limit_switch(motor, m, pot):
+                if not limit.is_set():
+                    m.logger.warning(
+                        f"{motor}: Limit switch reached, setting event"
+                    )
+                    limit.set()
+                if pot.last_volts(motor) < 1.5 and pot.direction == -1:
+                    m.reverse(motor, True)
+                elif pot.last_volts(motor) > 1.5 and pot.direction == 1:
+                    m.reverse(motor, True)
+            # reverse if limit switch is no longer triggered but the event
+            # is set
+            elif limit.is_set():
+                m.logger.info(
+                    f"{motor}: Limit switch untriggered, reversing {motor} "
+                    "motor"
+                )
+                m.reverse(motor)
+                self.released[motor] = now
+        return self.limits
 
 
 def reverse_limit(m, pot, limits):
     """
     Check and handle the limit switch status for motors. This function checks
     whether each motor specified in the sequence has reached its limit switch
-    and manages the motor actions accordingly.
+    and manages the motor actions accordingly. After reversing a motor off a
+    released switch, it blocks until the pot follows; the control loop uses
+    the non-blocking ``LimitSwitches'' instead.
 
     Parameters
     ----------
@@ -57,24 +169,13 @@ def reverse_limit(m, pot, limits):
         The updated list of limit events after processing each motor.
 
     """
-    for motor, limit in zip(["az", "alt"], limits):
-        if limit_switch(motor, m, pot):
-            if not limit.is_set():
-                m.logger.warning(f"{motor}: Limit switch reached, setting event")
-                limit.set()
-            if pot.read_volts(motor) < 1.5 and pot.direction == -1:
-                m.reverse(motor, True)
-            elif pot.read_volts(motor) > 1.5 and pot.direction == 1:
-                m.reverse(motor, True)
-
-        # reverse if limit switch is no longer triggered but the event is set
-        elif not limit_switch(motor, m, pot) and limit.is_set():
-            m.logger.info(f"{motor}: Limit switch untriggered, reversing {motor} motor")
-            m.reverse(motor)
-            time.sleep(1)  # XXX
-            limit.clear()
-            while limit_switch(motor, m, pot) or m.limit_reversal:
-                # Continue checking if the limit is still active to ensure
-                # pot.direction is updated correctly.
-                continue
+    switches = LimitSwitches(m, pot, limits)
+    switches.update()
+    if switches.waiting:
+        m.clock.sleep(switches.RELEASE_WAIT)
+        switches.update()
+        while switches.waiting:
+            # block until the next pot sample rather than spinning
+            pot.wait_sample(timeout=1)
+            switches.update()
     return limits
@@ -0,0 +1,190 @@
+from collections import namedtuple
+from eigsep_motor_control import config as emc_config
+
+# result of a closed-loop move of one axis
+MoveResult = namedtuple(
+    "MoveResult", ["target", "settle_time", "overshoot", "error"]
+)
+
+# default goto settings, overridden by the ``goto'' section of the config
+GOTO_DEFAULTS = {
+    "ki": 0.0,
+    "kd": 0.0,
+    "min_speed": 0,  # smallest speed that moves the motor
+}
+# closed-loop bandwidth (1/s) setting the default proportional gain from the
+# motor to pot gain, kp = BANDWIDTH / |gain| speed per volt of error, with
+# the default gain of the config if the gain is 0 (not calibrated)
+BANDWIDTH = 2.0
+MAX_AWAY = 10  # samples moving away from the target before a goto aborts
+
+
+def load_motion_config():
+    """
+    Read the ``goto'' and ``stow'' sections of the config (see
+    ``emc.config''). The sign of each axis (``polarity'') and the default
+    ``kp'' are derived from the ``gain'' section; a gain of 0 gives a
+    positive polarity and the kp of ``emc.config.DEFAULT_GAIN''.
+
+    Returns
+    -------
+    goto : dict
+        Settings of the position loop: ``tol'' (V), ``settle'' (s),
+        ``max_away'' (samples), and per axis PID gains, ``min_speed'' and
+        ``polarity'' (see ``GOTO_DEFAULTS'').
+    stow : dict
+        Stow position (pot voltage) of each axis.
+
+    """
+    config = emc_config.load()
+    gain = emc_config.gain(config)
+    goto = config.get("goto", {})
+    for m in ["az", "alt"]:
+        g = abs(gain[m]) or emc_config.DEFAULT_GAIN
+        defaults = {**GOTO_DEFAULTS, "kp": BANDWIDTH / g}
+        goto[m] = {**defaults, **goto.get(m, {})}
+        goto[m]["polarity"] = emc_config.polarity(gain[m])
+    goto.setdefault("tol", 0.005)
+    goto.setdefault("settle", 0.5)
+    goto.setdefault("max_away", MAX_AWAY)
+    return goto, config.get("stow", {})
+
+
+class PID:
+    def __init__(self, kp, ki=0.0, kd=0.0, limit=None):
+        """
+        PID controller with a clamped output and integrator.
+
+        Parameters
+        ----------
+        kp : float
+            Proportional gain.
+        ki : float
+            Integral gain (per second).
+        kd : float
+            Derivative gain (seconds).
+        limit : float, optional
+            Maximum absolute output. The integrator stops accumulating while
+            the output is saturated.
+
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.limit = limit
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self._last_error = None
+        self._last_t = None
+
+    def update(self, error, t):
+        """
+        Compute the controller output.
+
+        Parameters
+        ----------
+        error : float
+            Setpoint minus measurement.
+        t : float
+            Time of the measurement in seconds.
+
+        Returns
+        -------
+        out : float
+            The control output.
+
+        """
+        if self._last_t is None:
+            dt = 0.0
+            deriv = 0.0
+        else:
+            dt = t - self._last_t
+            deriv = (error - self._last_error) / dt if dt > 0 else 0.0
+        integral = self.integral + error * dt
+        out = self.kp * error + self.ki * integral + self.kd * deriv
+        if self.limit is not None and abs(out) > self.limit:
+            out = self.limit if out > 0 else -self.limit
+        else:
+            self.integral = integral
+        self._last_error = error
+        self._last_t = t
+        return out
+
+
+class AxisMove:
+    def __init__(self, target, start, pid, tol, settle, min_speed=0):
+        """
+        Bookkeeping of a closed-loop move of one axis towards a target pot
+        voltage, including its settle time and overshoot.
+
+        Parameters
+        ----------
+        target : float
+            Target pot voltage.
+        start : float
+            Pot voltage at the start of the move.
+        pid : PID
+            Controller mapping voltage error to speed.
+        tol : float
+            The axis is in position when within ``tol'' volts of the target.
+        settle : float
+            Seconds the axis must stay in position for the move to be done.
+        min_speed : float
+            Speeds outside the tolerance are at least this large, so the
+            motor does not stall short of the target.
+
+        """
+        self.target = target
+        self.pid = pid
+        self.tol = tol
+        self.settle = settle
+        self.min_speed = min_speed
+        self.sign = 1 if target >= start else -1
+        self.overshoot = 0.0
+        self.error = target - start
+        self.t0 = None
+        self.in_band_since = None
+        # consecutive readings moving away from the target by more than
+        # the noise (a fifth of the tolerance)
+        self.away = 0
+
+    def update(self, volts, t):
+        """
+        Add a pot reading and return the speed to command.
+
+        """
+        if self.t0 is None:
+            self.t0 = t
+        last = abs(self.error)
+        self.error = self.target - volts
+        if abs(self.error) > last + self.tol / 5:
+            self.away += 1
+        else:
+            self.away = 0
+        self.overshoot = max(self.overshoot, -self.sign * self.error)
+        if abs(self.error) <= self.tol:
+            if self.in_band_since is None:
+                self.in_band_since = t
+            self.pid.reset()
+            return 0.0
+        self.in_band_since = None
+        speed = self.pid.update(self.error, t)
+        if abs(speed) < self.min_speed:
+            speed = self.min_speed if self.error > 0 else -self.min_speed
+        return speed
+
+    def settled(self, t):
+        return (
+            self.in_band_since is not None
+            and t - self.in_band_since >= self.settle
+        )
+
+    def result(self):
+        settle_time = None
+        if self.in_band_since is not None:
+            settle_time = self.in_band_since - self.t0
+        return MoveResult(
+            self.target, settle_time, self.overshoot, self.error
+        )
@@ -1,30 +1,44 @@
+from functools import partial
 import logging
-import numpy as np
-import time
 from threading import Event, Thread, Lock
-try:
-    from RPi import GPIO
-except ImportError:
-    pass
-from qwiic_scmd import QwiicScmd
+from eigsep_motor_control.clock import SYSTEM_CLOCK
 
 MOTOR_ID = {"az": 0, "alt": 1}
 # min/max speeds for each motor driver
 MIN_SPEED = {"pololu": -480, "qwiic": -255, "dummy": -250}
 MAX_SPEED = {"pololu": 480, "qwiic": 254, "dummy": 250}
 
-#XXX alt motor is wired with opposite polarity so being reversed in 
-# motor.set+velocoty
+# drivers of the hardware boards, imported on first use (see __getattr__)
+_DRIVERS = {
+    "QwiicMotor": "eigsep_motor_control.qwiic",
+    "PololuMotor": "eigsep_motor_control.pololu",
+}
+
+# the motor to pot sign of each axis (e.g., the reversed wiring of the alt
+# motor) is the sign of its ``gain'' in config.yaml, see emc.config.gain
+
 
 class Motor:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, clock=None):
+        self._velocity_out = None  # see ``bind_velocities''
         self.velocities = {"az": 0, "alt": 0}
+        # clock used for debouncing, see emc.clock
+        self.clock = SYSTEM_CLOCK if clock is None else clock
         self.debounce_interval = 5  # debounce interval in seconds
         # last reversal timestamps for motors
-        self.last_reversal_time = {
-            "az": -self.debounce_interval, "alt": -self.debounce_interval
-        }
+        self.last_reversal_time = {"az": -float("inf"), "alt": -float("inf")}
         self.limit_reversal = False
+        # single worker so that async commands reach the driver in order
+        self._executor = None
+        self.pot = None  # position feedback for goto/stow
+        # last (direction, speed) written to the driver for each motor and
+        # when; identical commands are not written again until
+        # ``resend_interval'' seconds have passed
+        self._drive_state = {}
+        self._drive_time = {}
+        self.resend_interval = 1.0
+        self.writes_issued = 0
+        self.writes_suppressed = 0
 
         # set up logging
         if logger is None:
@@ -32,14 +46,141 @@ class Motor:
             logger.basicConfig(level=logging.INFO)
         self.logger = logger
 
+    @property
+    def velocities(self):
+        """Commanded velocity of each motor."""
+        return self._velocities
+
+    @velocities.setter
+    def velocities(self, velocities):
+        self._velocities = velocities
+        out = self._velocity_out
+        if out is not None:
+            out[0], out[1] = velocities["az"], velocities["alt"]
+
+    def bind_velocities(self, out):
+        """
+        Write the commanded velocities into an array whenever they are set,
+        e.g. a row of the state arrays of ``emc.mount.MultiController''.
+
+        Parameters
+        ----------
+        out : np.ndarray
+            Array of shape (2,) receiving the velocities (az, alt), or None
+            to unbind.
+
+        """
+        self._velocity_out = out
+        if out is not None:
+            self.velocities = self.velocities
+
     def set_velocity(self, az_vel, alt_vel):
         """Starts both motors with the given velocities."""
         raise NotImplementedError("Method must be implemented by subclass.")
 
+    def _clip_speed(self, motor, v):
+        """Clip a velocity to the speed range of the driver."""
+        if v < self.MIN_SPEED:
+            v = self.MIN_SPEED
+            self.logger.warning(
+                f"Speed for {motor} motor too low. Setting to {v}."
+            )
+        elif v > self.MAX_SPEED:
+            v = self.MAX_SPEED
+            self.logger.warning(
+                f"Speed for {motor} motor too high. Setting to {v}."
+            )
+        return v
+
+    def _write_drive(self, motor, direction, speed, prev):
+        """
+        Write a drive command to the hardware. Implemented by subclasses
+        that use ``_drive''.
+
+        Parameters
+        ----------
+        motor : str
+            The motor to drive, 'az' or 'alt'.
+        direction : int
+            Driver-specific direction flag.
+        speed : int
+            Unsigned speed.
+        prev : tuple or None
+            The (direction, speed) last written, or None if unknown.
+
+        """
+        raise NotImplementedError("Method must be implemented by subclass.")
+
+    def _coalesce(self, commands):
+        """
+        Find the drive commands that must be written, i.e., those that
+        differ from the last one written to the motor or repeat it after
+        more than ``resend_interval'' seconds. The others are counted as
+        suppressed.
+
+        Parameters
+        ----------
+        commands : dict
+            Maps motors to (direction, speed).
+
+        Returns
+        -------
+        pending : dict
+            Maps the motors to write to their last written (direction,
+            speed), or None if everything must be written.
+
+        """
+        now = self.clock.time()
+        pending = {}
+        for m, (direction, speed) in commands.items():
+            # the direction does not matter when stopped
+            state = (direction if speed else None, speed)
+            prev = self._drive_state.get(m)
+            if prev == state:
+                if now - self._drive_time[m] < self.resend_interval:
+                    self.writes_suppressed += 1
+                    continue
+                prev = None  # periodic resend, write everything
+            pending[m] = prev
+        return pending
+
+    def _commit(self, commands, motors):
+        """Record that the commands of ``motors'' were written."""
+        now = self.clock.time()
+        for m in motors:
+            direction, speed = commands[m]
+            self._drive_state[m] = (direction if speed else None, speed)
+            self._drive_time[m] = now
+            self.writes_issued += 1
+
+    def _drive(self, motor, direction, speed):
+        """
+        Write a drive command unless it repeats the last one written less
+        than ``resend_interval'' seconds ago.
+
+        Returns
+        -------
+        bool
+            True if the command was written to the hardware.
+
+        """
+        commands = {motor: (direction, speed)}
+        pending = self._coalesce(commands)
+        if not pending:
+            return False
+        self._write_drive(motor, direction, speed, pending[motor])
+        self._commit(commands, pending)
+        return True
+
+    def invalidate_drive_cache(self):
+        """Force the next command of every motor to be written."""
+        self._drive_state.clear()
+        self._drive_time.clear()
+
     def should_reverse(self, motor):
         """Determine if the motor should reverse."""
         return (
-            time.time() - self.last_reversal_time[motor]
+            self.clock.time() - self.last_reversal_time[motor]
             > self.debounce_interval
         )
 
@@ -69,7 +210,7 @@ class Motor:
             raise ValueError("Invalid motor specified.")
         self.set_velocity(az_vel, alt_vel)
         if not force:
-            self.last_reversal_time[motor] = time.time()
+            self.last_reversal_time[motor] = self.clock.time()
 
     def stop(self, motors=("az", "alt")):
         """
@@ -87,168 +228,212 @@ class Motor:
         vel = self.velocities
         for m in motors:
             vel[m] = 0
+        # always write stop commands, even if the cache says stopped
+        self.invalidate_drive_cache()
         self.set_velocity(vel["az"], vel["alt"])
 
-    def stow(self, motors=("az", "alt")):
-        """Return motors to a home position."""
-        raise NotImplementedError("Stow method not implemented yet.")
+    def _run_async(self, func, *args, **kwargs):
+        """
+        Run a blocking driver call in the motor's worker thread so that
+        it does not block the event loop.
 
-    def cleanup(self):
-        self.stop()
-        # self.stow()
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="motor"
+            )
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
 
+    async def set_velocity_async(self, az_vel, alt_vel):
+        """Async version of ``set_velocity''."""
+        await self._run_async(self.set_velocity, az_vel, alt_vel)
 
-class QwiicMotor(Motor, QwiicScmd):
+    async def reverse_async(self, motor, force=False):
+        """Async version of ``reverse''."""
+        await self._run_async(self.reverse, motor, force=force)
 
-    def __init__(self, logger=None, address=None, i2c_driver=None):
-        Motor.__init__(self, logger=logger)
-        QwiicScmd.__init__(self, address=address, i2c_driver=i2c_driver)
-        self.MIN_SPEED = MIN_SPEED["qwiic"]
-        self.MAX_SPEED = MAX_SPEED["qwiic"]
-        assert self.begin(), "Initalization of SCMD failed."
-        self.enable()
+    async def stop_async(self, motors=("az", "alt")):
+        """Async version of ``stop''."""
+        await self._run_async(self.stop, motors=motors)
 
-    def set_velocity(self, az_vel, alt_vel):
-        """Sets the velocity of each motor."""
-        self.velocities = {"az": az_vel, "alt": -alt_vel}  #XXX
-        for m, v in self.velocities.items():
-            if v < self.MIN_SPEED:
-                v = self.MIN_SPEED
-                self.logger.warning(
-                    f"Speed for {m} motor too low. Setting to {v}."
-                )
-            elif v > self.MAX_SPEED:
-                v = self.MAX_SPEED
-                self.logger.warning(
-                    f"Speed for {m} motor too high. Setting to {v}."
-                )
-            speed = np.abs(v)
-            direction = 1 if v > 0 else 0
-            self.set_drive(MOTOR_ID[m], direction, speed)
-
-
-class PololuMotor(Motor):
-
-    # gpio pins for each motor (az/alt), for speed (PWM) and direction
-    PWM_PINS = {"az": 12, "alt": 13}
-    DIR_PINS = {"az": 24, "alt": 25}
-    EN_PIN = 5  # set to LOW to enable motors, HIGH to disable
-    FAULT_PIN = 6  # normally HIGH, goes LOW when there is a fault
-
-    def __init__(self, pwm_frequency=20e3, logger=None):
-        super().__init__(logger=logger)
-        self.MIN_SPEED = MIN_SPEED["pololu"]
-        self.MAX_SPEED = MAX_SPEED["pololu"]
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
-        # setup all pins as output
-        GPIO.setup(list(self.PWM_PINS.values()), GPIO.OUT)
-        GPIO.setup(list(self.DIR_PINS.values()), GPIO.OUT)
-        GPIO.setup(self.EN_PIN, GPIO.OUT)
-        # we first set the fault pin as output to ensure it is HIGH
-        GPIO.setup(self.FAULT_PIN, GPIO.OUT)
-        GPIO.output(self.FAULT_PIN, GPIO.HIGH)
-        # now we set it as input
-        GPIO.setup(self.FAULT_PIN, GPIO.IN)
-        self.enable()
-        # set up PWM for speed control
-        self.pwm = {}
-        if pwm_frequency > 50e3:
-            self.logger.warning("PWM frequency too high, setting to 50 kHz.")
-            pwm_frequency = 50e3
-        self.pwm_frequency = pwm_frequency
-        for m, pin in self.PWM_PINS.items():
-            self.pwm[m] = GPIO.PWM(pin, self.pwm_frequency)
-            self.pwm[m].start(0)
-
-    def enable(self):
-        """Enable the motor driver."""
-        GPIO.output(self.EN_PIN, GPIO.LOW)
-
-    def disable(self):
-        """Disable the motor driver."""
-        GPIO.output(self.EN_PIN, GPIO.HIGH)
-
-    def fault(self):
-        """Check if there is a fault with the motor driver."""
-        return GPIO.input(self.FAULT_PIN) == GPIO.LOW
-
-    def change_pwm_frequency(self, frequency):
-        """Change the PWM frequency of the motor driver."""
-        if frequency > 50e3:
-            raise ValueError("PWM frequency too high, max is 50 kHz.")
-        for m, pwm in self.pwm.items():
-            pwm.ChangeFrequency(frequency)
-        self.pwm_frequency = frequency
+    def attach_pot(self, pot):
+        """
+        Use a potentiometer as position feedback for ``goto'' and ``stow''.
 
-    def set_velocity(self, az_vel, alt_vel):
-        """Sets the velocity of each motor."""
-        self.velocities = {"az": az_vel, "alt": -alt_vel}  #XXX
-        for m, v in self.velocities.items():
-            if v < self.MIN_SPEED:
-                v = self.MIN_SPEED
-                self.logger.warning(
-                    f"Speed for {m} motor too low. Setting to {v}."
-                )
-            elif v > self.MAX_SPEED:
-                v = self.MAX_SPEED
-                self.logger.warning(
-                    f"Speed for {m} motor too high. Setting to {v}."
+        Parameters
+        ----------
+        pot : emc.Potentiometer
+            The potentiometer reading the motor positions.
+
+        """
+        self.pot = pot
+
+    def goto(self, az=None, alt=None, timeout=120, cancel=None):
+        """
+        Drive the motors to the given pot voltages in closed loop, using
+        the PID settings in the ``goto'' section of config.yaml. Axes
+        without a target are stopped. The move is aborted if an axis keeps
+        moving away from its target, e.g., if the sign of its ``gain'' in
+        config.yaml is wrong.
+
+        Parameters
+        ----------
+        az : float, optional
+            Target voltage of the azimuth pot.
+        alt : float, optional
+            Target voltage of the altitude pot.
+        timeout : float
+            Maximum duration of the move in seconds.
+        cancel : threading.Event, optional
+            The move is abandoned, and the motors stopped, once this is set.
+
+        Returns
+        -------
+        results : dict
+            A MoveResult (target, settle_time, overshoot, error) for each
+            axis that was moved. Settle time is in seconds from the start
+            of the move (None if the move was cancelled before the axis
+            settled), overshoot and error in volts.
+
+        Raises
+        ------
+        ValueError
+            If no potentiometer is attached or a target is outside the pot
+            voltage limits.
+        RuntimeError
+            If an axis moves away from its target for ``max_away''
+            readings (see ``emc.motion.load_motion_config'').
+        TimeoutError
+            If the axes do not settle within ``timeout'' seconds.
+
+        """
+        if self.pot is None:
+            raise ValueError("Attach a potentiometer to use goto.")
+        targets = {"az": az, "alt": alt}
+        targets = {m: v for m, v in targets.items() if v is not None}
+        if not targets:
+            return {}
+        for m, target in targets.items():
+            lo, hi = sorted(self.pot.VOLT_RANGE[m])
+            if not lo <= target <= hi:
+                raise ValueError(
+                    f"Target {target:.3f} V of {m} is outside the pot "
+                    f"limits {lo:.3f}-{hi:.3f} V."
                 )
-            speed = np.abs(v)
-            # NOTE: annoyingly, this direction convention is opposite of the
-            # other motor board
-            direction = 0 if v > 0 else 1
-            self.set_drive(m, direction, speed)
+        from eigsep_motor_control.motion import (
+            AxisMove,
+            PID,
+            load_motion_config,
+        )
 
-    def _speed2dc(self, speed):
-        """Convert speed to duty cycle for PWM."""
-        return np.abs(speed) / self.MAX_SPEED * 100
+        config, _ = load_motion_config()
+        self.pot.start()
+        start = self.pot.last_volts()
+        moves = {}
+        for m, target in targets.items():
+            c = config[m]
+            pid = PID(c["kp"], ki=c["ki"], kd=c["kd"], limit=self.MAX_SPEED)
+            moves[m] = AxisMove(
+                target,
+                start[MOTOR_ID[m]],
+                pid,
+                config["tol"],
+                config["settle"],
+                min_speed=c["min_speed"],
+            )
+        t_start = self.clock.time()
+        try:
+            while True:
+                sample = self.pot.wait_sample(timeout=1)
+                if cancel is not None and cancel.is_set():
+                    self.logger.warning("Move cancelled.")
+                    break
+                if sample is not None:
+                    t, v = sample
+                    speed = {"az": 0, "alt": 0}
+                    for m, move in moves.items():
+                        s = move.update(v[MOTOR_ID[m]], t)
+                        if move.away > config["max_away"]:
+                            raise RuntimeError(
+                                f"{m} is moving away from its target, "
+                                f"check the sign of gain.{m} in the config."
+                            )
+                        speed[m] = config[m]["polarity"] * s
+                    self.set_velocity(speed["az"], speed["alt"])
+                    if all(move.settled(t) for move in moves.values()):
+                        break
+                if self.clock.time() - t_start > timeout:
+                    raise TimeoutError(f"Move did not settle in {timeout} s.")
+        finally:
+            self.stop()
+        results = {m: move.result() for m, move in moves.items()}
+        for m, r in results.items():
+            if r.settle_time is None:
+                self.logger.info(
+                    f"{m}: stopped {r.error:+.3f} V from {r.target:.3f} V."
+                )
+                continue
+            self.logger.info(
+                f"{m}: moved to {r.target:.3f} V, settle time "
+                f"{r.settle_time:.2f} s, overshoot {r.overshoot:.4f} V."
+            )
+        return results
 
-    def set_drive(self, motor, direction, speed):
+    def stow(self, motors=("az", "alt")):
         """
-        Drive a motor at a given speed. Users should call the set_velocity
-        method, not this one.
+        Return motors to the home position in the ``stow'' section of
+        config.yaml. See ``goto''.
 
         Parameters
         ----------
-        motor : str
-            The motor to drive, must be ``az'' (azimuth) or ``alt'' (altitude)
-        direction : int
-            Direction to drive motor in, must be 0 (``forward'', i.e.,
-            increasing pot voltage) or 1 (``backward'').
-        speed : int
-            The unsigned speed to drive the motor at. Must be between 0 and
-            ``MAX_SPEED''.
+        motors : str or list of str
+            The motor(s) to stow.
 
         """
-        GPIO.output(self.DIR_PINS[motor], direction)
-        duty_cycle = self._speed2dc(speed)
-        self.pwm[motor].ChangeDutyCycle(duty_cycle)
+        if isinstance(motors, str):
+            motors = [motors]
+        from eigsep_motor_control.motion import load_motion_config
+
+        _, stow = load_motion_config()
+        return self.goto(**{m: stow[m] for m in motors})
 
     def cleanup(self):
         self.stop()
         # self.stow()
-        for pwm in self.pwm.values():
-            pwm.stop()
-        self.disable()
-        GPIO.cleanup()
+
 
 class DummyMotor(Motor):
-    def __init__(self, logger=None):
-        super().__init__(logger)
+    def __init__(self, logger=None, clock=None):
+        """
+        Simulated motors with limit switches. With the system clock, a
+        background thread steps the positions every ``update_interval''
+        seconds. With a virtual clock (see ``emc.sim.Simulator''), the
+        positions only move when ``step'' is called.
+
+        """
+        super().__init__(logger, clock=clock)
         self.MIN_SPEED = MIN_SPEED["dummy"]
         self.MAX_SPEED = MAX_SPEED["dummy"]
         self.simulated_positions = {"az": 0, "alt": 0}  # Initial positions for azimuth and altitude
         self.position_limits = {"az": (-15000, 15000), "alt": (-15000, 15000)}  # Position limits for each motor
         self.limit_reversal_time = False
+        self._check_time = self.clock.time() - 2
         self.update_thread = None
         self.running = False
 
     def start_updates(self):
         """
-        Start the background thread for updating motor positions.
+        Start the background thread for updating motor positions. Nothing
+        to do with a virtual clock, the simulator steps the motors.
         """
+        if self.clock.virtual:
+            return
         if not self.running:
             self.running = True
             self.update_thread = Thread(target=self.update_positions, daemon=True)
@@ -260,61 +445,52 @@ class DummyMotor(Motor):
         """
         if not self.running:
             self.start_updates()
+        az_vel = self._clip_speed("az", az_vel)
+        alt_vel = self._clip_speed("alt", alt_vel)
         self.velocities = {"az": az_vel, "alt": alt_vel}
-        for m, v in self.velocities.items():
-            if v < self.MIN_SPEED:
-                v = self.MIN_SPEED
-                self.logger.warning(
-                    f"Speed for {m} motor too low. Setting to {v}."
-                )
-            elif v > self.MAX_SPEED:
-                v = self.MAX_SPEED
-                self.logger.warning(
-                    f"Speed for {m} motor too high. Setting to {v}."
-                )
-            if m == "az":
-                self.velocities["az"] = v
-                az_vel = v
-            elif m == "alt":
-                self.velocities["alt"] = v
-                alt_vel = v
         self.logger.info(f"DummyMotor: Set velocities to azimuth: {az_vel} and altitude: {alt_vel}")
 
+    def step(self, dt):
+        """
+        Move the motors by their velocity times ``dt'' and handle the limit
+        switches.
+        """
+        now = self.clock.time()
+        for motor in ['az', 'alt']:
+            old_position = self.simulated_positions[motor]
+            displacement = self.velocities[motor] * dt
+            new_position = old_position + displacement
+            min_limit, max_limit = self.position_limits[motor]
+            # Check for limit switch activation
+            if (new_position <= min_limit or new_position >= max_limit) and not self.limit_reversal and not self.limit_reversal_time:
+                if now > self._check_time + 1:
+                    self.limit_reversal_time = True
+                    self._check_time = now
+            elif (new_position <= min_limit or new_position >= max_limit) and not self.limit_reversal:
+                # Reverse the velocity
+                if now > self._check_time + 1:
+                    self.reverse(motor, True)
+                    self.limit_reversal = True
+                    self.logger.info("DummyMotor: Hit limit switch, motors manually reversing.")
+                    self._check_time = now
+            elif (new_position >= min_limit and new_position <= max_limit) and self.limit_reversal:
+                if now > self._check_time + 1:
+                    self.logger.info("DummyMotor: Untriggered limit switch, motors manually reversing.")
+                    self.reverse(motor, True)
+                    self.limit_reversal = False
+                    self.limit_reversal_time = False
+                    self._check_time = now
+
+            self.simulated_positions[motor] = new_position
+
     def update_positions(self):
         """
         Continuously update the positions of the motors based on their velocities.
         This method runs in a background thread.
         """
-        check_time = time.time() - 2
         while self.running:
-            time.sleep(self.update_interval())
-            for motor in ['az', 'alt']:
-                old_position = self.simulated_positions[motor]
-                displacement = self.velocities[motor] * self.update_interval()
-                new_position = old_position + displacement
-                min_limit, max_limit = self.position_limits[motor]
-                # Check for limit switch activation
-                if (new_position <= min_limit or new_position >= max_limit) and not self.limit_reversal and not self.limit_reversal_time:
-                    if time.time() > check_time + 1:
-                        self.limit_reversal_time = True
-                        check_time = time.time()
-                elif (new_position <= min_limit or new_position >= max_limit) and not self.limit_reversal:
-                    # Reverse the velocity
-                    if time.time() > check_time + 1:
-                        self.reverse(motor, True)
-                        self.limit_reversal = True
-                        #print(self.limit_reversal)
-                        self.logger.info("DummyMotor: Hit limit switch, motors manually reversing.")
-                        check_time = time.time()
-                elif (new_position >= min_limit and new_position <= max_limit) and self.limit_reversal:
-                    if time.time() > check_time + 1:
-                        self.logger.info("DummyMotor: Untriggered limit switch, motors manually reversing.")
-                        self.reverse(motor, True)
-                        self.limit_reversal = False
-                        self.limit_reversal_time = False
-                        check_time = time.time()
-
-                self.simulated_positions[motor] = new_position
+            self.clock.sleep(self.update_interval())
+            self.step(self.update_interval())
 
     def stop_updates(self):
         """
@@ -342,3 +518,11 @@ class DummyMotor(Motor):
         self.stop_updates()
         super().cleanup()
         self.logger.info("DummyMotor: Cleaned up resources.")
+
+
+def __getattr__(name):
+    if name in _DRIVERS:
+        import importlib
+
+        return getattr(importlib.import_module(_DRIVERS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,371 @@
+"""
+Several mounts run from one host. A mount is a motor board and the pots
+reading its axes. The state of the axes of all mounts is held in NumPy
+arrays that the motors and pots write into, so the per-tick limit and
+debounce checks of ``MultiController'' are vectorized over all axes of all
+mounts without copying the state.
+
+Mounts are defined in the ``mounts'' section of the configuration (see
+``load_mounts''). Without it, there is one mount with both axes.
+
+"""
+
+import logging
+import threading
+import numpy as np
+
+from eigsep_motor_control import config as emc_config
+from eigsep_motor_control.clock import SYSTEM_CLOCK
+from eigsep_motor_control.limit_switch_hit import switch_reached
+from eigsep_motor_control.potentiometer import MOTOR_INDEX
+from eigsep_motor_control.predictor import LimitPredictor
+
+CHANNELS = tuple(MOTOR_INDEX)  # axes of a board, in pot channel order
+BOARDS = ("pololu", "qwiic", "dummy")
+MOUNT_DEFAULTS = {
+    "name": "main",
+    "board": "pololu",
+    "port": None,  # serial port of the Pico, None for the default
+    "gpio": "rpi",  # GPIO backend of a pololu board
+    "address": None,  # I2C address of a qwiic board
+    "axes": list(CHANNELS),
+}
+
+
+def load_mounts(config=None):
+    """
+    Mount definitions from the ``mounts'' section of the configuration,
+    a list of mappings with the keys of ``MOUNT_DEFAULTS'' and an optional
+    ``volt_range'' overriding the pot voltage limits of the mount.
+
+    Parameters
+    ----------
+    config : dict, optional
+        The configuration. Defaults to ``emc.config.load()''.
+
+    Returns
+    -------
+    mounts : list of dict
+        One dict per mount with all keys of ``MOUNT_DEFAULTS''.
+
+    """
+    if config is None:
+        config = emc_config.load()
+    mounts = config.get("mounts") or [{}]
+    return [{**MOUNT_DEFAULTS, **m} for m in mounts]
+
+
+class Mount:
+    def __init__(self, name, motor, pot, axes=CHANNELS, volt_range=None):
+        """
+        A motor board and its pots.
+
+        Parameters
+        ----------
+        name : str
+            Name of the mount.
+        motor : emc.Motor
+            The motors of the mount.
+        pot : emc.Potentiometer
+            The pots of the mount, attached to ``motor''.
+        axes : list of str
+            The axes that are controlled, a subset of ``CHANNELS''.
+        volt_range : dict, optional
+            Pot voltage limits of this mount, overriding the configuration.
+            Re-applied when the config file changes.
+
+        """
+        unknown = set(axes) - set(CHANNELS)
+        if unknown or not axes:
+            raise ValueError(f"Axes must be a subset of {CHANNELS}.")
+        self.name = name
+        self.motor = motor
+        self.pot = pot
+        self.axes = list(axes)
+        self.volt_range = volt_range
+        if volt_range is not None:
+            pot.VOLT_RANGE = volt_range
+            emc_config.watch(self.apply_config)
+
+    def apply_config(self, config):
+        """Keep the voltage limits of the mount after a config change."""
+        for spec in load_mounts(config):
+            if spec["name"] == self.name and "volt_range" in spec:
+                self.volt_range = spec["volt_range"]
+        self.pot.VOLT_RANGE = self.volt_range
+
+    @classmethod
+    def from_config(cls, spec, logger=None, clock=None):
+        """
+        Create the motor and the pots of a mount.
+
+        Parameters
+        ----------
+        spec : dict
+            Mount definition, see ``load_mounts''.
+        logger : logging.Logger, optional
+            Logger of the motor.
+        clock : emc.clock.VirtualClock, optional
+            Clock of a dummy mount.
+
+        """
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        board = spec["board"]
+        if board == "dummy":
+            from eigsep_motor_control.motor import DummyMotor
+            from eigsep_motor_control.potentiometer import DummyPotentiometer
+
+            motor = DummyMotor(logger=logger, clock=clock)
+            pot = DummyPotentiometer(motor)
+        else:
+            from eigsep_motor_control.potentiometer import Potentiometer
+
+            if board == "pololu":
+                from eigsep_motor_control.pololu import PololuMotor
+
+                motor = PololuMotor(logger=logger, backend=spec["gpio"])
+            elif board == "qwiic":
+                from eigsep_motor_control.qwiic import QwiicMotor
+
+                motor = QwiicMotor(logger=logger, address=spec["address"])
+            else:
+                raise ValueError(f"Invalid board {board}, use {BOARDS}.")
+            pot = Potentiometer(port=spec["port"])
+            pot.attach_motor(motor)
+        return cls(
+            spec["name"],
+            motor,
+            pot,
+            axes=spec["axes"],
+            volt_range=spec.get("volt_range"),
+        )
+
+
+class MultiController:
+    def __init__(self, mounts, safe=False, logger=None, clock=None):
+        """
+        Keep the axes of several mounts within their pot limits. The pots
+        and motors of the mounts write their state into shared (mounts,
+        channels) arrays as it changes (see ``bind''), and each ``tick''
+        checks all axes at once. ``run'' ticks when the pots publish new
+        samples.
+
+        Parameters
+        ----------
+        mounts : list of Mount
+            The mounts, with distinct names.
+        safe : bool
+            Also handle limit switch events, as ``reverse_limit'' does:
+            a limit switch is reached when the pot moves against the
+            commanded direction, and the motor is reversed when it is
+            released.
+        logger : logging.Logger
+            Logger to use.
+        clock : emc.clock.SystemClock or emc.clock.VirtualClock
+            Clock of the pot timestamps. Defaults to the clock of the first
+            motor.
+
+        """
+        self.mounts = list(mounts)
+        names = [m.name for m in self.mounts]
+        if not names or len(set(names)) != len(names):
+            raise ValueError("Mounts must have distinct names.")
+        self.safe = safe
+        self.logger = logging.getLogger(__name__) if logger is None else logger
+        if clock is None:
+            clock = getattr(self.mounts[0].motor, "clock", SYSTEM_CLOCK)
+        self.clock = clock
+        # one entry per controlled axis of all mounts
+        self.axes = [(i, a) for i, m in enumerate(self.mounts) for a in m.axes]
+        self.mount_index = np.array([i for i, _ in self.axes])
+        self.channel = np.array([MOTOR_INDEX[a] for _, a in self.axes])
+        n = len(self.axes)
+        self.debounce = np.array(
+            [self.mounts[i].motor.debounce_interval for i, _ in self.axes],
+            dtype=float,
+        )
+        self.last_reversal = np.full(n, -np.inf)
+        self.limit = np.zeros(n, dtype=bool)  # limit switch reached
+        self.reversals = np.zeros(n, dtype=int)
+        # state per mount and pot channel: written by the pots and motors
+        shape = (len(self.mounts), len(CHANNELS))
+        self.volts = np.zeros(shape)
+        self.pot_velocity = np.zeros(shape)
+        self.direction = np.zeros(shape, dtype=int)
+        self.velocities = np.zeros(shape)
+        # set from the configuration by ``load_limits''
+        self.vmin = np.zeros(shape)
+        self.vmax = np.zeros(shape)
+        self.horizon = np.zeros(shape)
+        self.gain_sign = np.ones(shape)
+        self.load_limits()
+        self._writers = []
+        # notified by the pot writers, see ``run''
+        self._new_sample = threading.Condition()
+        self._fresh = False
+        self._stop = threading.Event()
+        self.bind()
+        emc_config.watch(self.apply_config)
+
+    def bind(self):
+        """
+        Make the motors write their commanded velocities and the pots
+        write every sample into the state arrays.
+
+        """
+        for i, m in enumerate(self.mounts):
+            m.motor.bind_velocities(self.velocities[i])
+            writer = self._writer(i, m.pot)
+            m.pot.subscribe(writer)
+            self._writers.append((m.pot, writer))
+            if len(m.pot.history):
+                writer(None, m.pot.history.newest)
+
+    def unbind(self):
+        """Stop writing into the state arrays."""
+        for m in self.mounts:
+            m.motor.bind_velocities(None)
+        for pot, writer in self._writers:
+            pot.unsubscribe(writer)
+        self._writers = []
+
+    def _writer(self, i, pot):
+        """Subscriber of the pots of mount ``i'' writing its row."""
+
+        def write(t, v):
+            velocity, direction = pot.motion()
+            self.volts[i] = v
+            self.pot_velocity[i] = velocity
+            self.direction[i] = direction
+            with self._new_sample:
+                self._fresh = True
+                self._new_sample.notify()
+
+        return write
+
+    def load_limits(self):
+        """Copy the voltage limits, horizons, and gain signs of the pots."""
+        for i, m in enumerate(self.mounts):
+            pot = m.pot
+            pred = pot.predictor
+            for j, a in enumerate(CHANNELS):
+                self.vmin[i, j], self.vmax[i, j] = pot.VOLT_RANGE[a]
+                self.horizon[i, j] = pred.horizon(a)
+                self.gain_sign[i, j] = emc_config.polarity(pot.GAIN[a])
+
+    def apply_config(self, config):
+        """
+        Reload the limits after a config change, once the pots and mounts
+        applied it (the config watcher calls its subscribers in order).
+
+        """
+        self.load_limits()
+
+    def check(self, now):
+        """
+        Vectorized limit checks of all axes on the state arrays, with the
+        logic of ``Potentiometer._trigger_reverse'' and
+        ``limit_switch_hit.limit_switch''.
+
+        Parameters
+        ----------
+        now : float
+            Current time on ``clock''.
+
+        Returns
+        -------
+        reverse : np.ndarray
+            Axes to reverse at their pot limits, as ``_trigger_reverse''.
+        hit : np.ndarray
+            Axes whose limit switch was just reached (safe mode).
+        release : np.ndarray
+            Axes whose limit switch was released, to be reversed (safe
+            mode).
+
+        """
+        idx = (self.mount_index, self.channel)
+        direction = self.direction[idx]
+        ttl = LimitPredictor.time_to_limit(
+            self.volts[idx], self.pot_velocity[idx], self.vmin[idx],
+            self.vmax[idx]
+        )
+        debounced = now - self.last_reversal > self.debounce
+        reverse = (direction != 0) & (ttl <= self.horizon[idx]) & debounced
+        n = len(self.axes)
+        hit = release = np.zeros(n, dtype=bool)
+        if self.safe:
+            # limit_reversal is only set by the simulated motors
+            flip = np.array(
+                [-1 if m.motor.limit_reversal else 1 for m in self.mounts]
+            )
+            commanded = np.sign(self.velocities) * self.gain_sign
+            commanded = (commanded * flip[:, None])[idx]
+            switch = switch_reached(commanded, direction) & debounced
+            hit = switch & ~self.limit
+            release = ~switch & self.limit & debounced
+        return reverse, hit, release
+
+    def tick(self, now=None):
+        """
+        Check all axes and reverse those at their limits.
+
+        Returns
+        -------
+        reversed : list of tuple
+            (mount name, axis) of the reversed axes.
+
+        """
+        if now is None:
+            now = self.clock.time()
+        reverse, hit, release = self.check(now)
+        for k in np.flatnonzero(hit):
+            i, a = self.axes[k]
+            self.logger.warning(f"{self.mounts[i].name} {a}: limit switch.")
+        self.limit |= hit
+        self.limit &= ~release
+        out = []
+        for k in np.flatnonzero(reverse | release):
+            i, a = self.axes[k]
+            motor = self.mounts[i].motor
+            motor.reverse(a, force=True)
+            motor.last_reversal_time[a] = now
+            self.last_reversal[k] = now
+            self.reversals[k] += 1
+            out.append((self.mounts[i].name, a))
+        if out:
+            self.logger.info(f"Reversed {out}.")
+        return out
+
+    def run(self, timeout=1):
+        """
+        Start the pot acquisition of the mounts and call ``tick'' whenever
+        the pots publish new samples, until ``stop''. Samples published
+        during a tick are checked together by the next one.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds without samples after which ``tick'' is called anyway,
+            e.g., to release debounced limit switches of stalled pots.
+
+        """
+        self._stop.clear()
+        if not self.clock.virtual:
+            for m in self.mounts:
+                m.pot.start()
+        while True:
+            with self._new_sample:
+                self._new_sample.wait_for(
+                    lambda: self._fresh or self._stop.is_set(), timeout
+                )
+                self._fresh = False
+            if self._stop.is_set():
+                break
+            self.tick()
+
+    def stop(self):
+        """Make ``run'' exit."""
+        self._stop.set()
+        with self._new_sample:
+            self._new_sample.notify_all()
@@ -0,0 +1,128 @@
+"""
+Motors driven by a Pololu dual motor driver on the GPIO pins, through one
+of the backends of ``emc.gpio''.
+
+"""
+
+from eigsep_motor_control.gpio import get_backend
+from eigsep_motor_control.motor import MAX_SPEED, MIN_SPEED, Motor
+
+
+class PololuMotor(Motor):
+
+    # gpio pins for each motor (az/alt), for speed (PWM) and direction
+    PWM_PINS = {"az": 12, "alt": 13}
+    DIR_PINS = {"az": 24, "alt": 25}
+    EN_PIN = 5  # set to LOW to enable motors, HIGH to disable
+    FAULT_PIN = 6  # normally HIGH, goes LOW when there is a fault
+
+    def __init__(self, pwm_frequency=20e3, logger=None, backend="rpi"):
+        """
+        Motors driven by a Pololu dual motor driver on the GPIO pins.
+
+        Parameters
+        ----------
+        pwm_frequency : float
+            PWM frequency in Hz, at most 50 kHz.
+        logger : logging.Logger
+            Logger to use.
+        backend : str or emc.gpio.GPIOBackend
+            GPIO backend: 'rpi' (RPi.GPIO, software PWM), 'pigpio'
+            (hardware PWM through pigpiod), 'fake' (in-memory, no
+            hardware), or a backend instance.
+
+        """
+        super().__init__(logger=logger)
+        self.MIN_SPEED = MIN_SPEED["pololu"]
+        self.MAX_SPEED = MAX_SPEED["pololu"]
+        self.gpio = get_backend(backend)
+        # setup all pins as output
+        self.gpio.setup_output(list(self.PWM_PINS.values()))
+        self.gpio.setup_output(list(self.DIR_PINS.values()))
+        self.gpio.setup_output(self.EN_PIN)
+        # we first set the fault pin as output to ensure it is HIGH
+        self.gpio.setup_output(self.FAULT_PIN)
+        self.gpio.output(self.FAULT_PIN, self.gpio.HIGH)
+        # now we set it as input
+        self.gpio.setup_input(self.FAULT_PIN)
+        self.enable()
+        # set up PWM for speed control
+        if pwm_frequency > 50e3:
+            self.logger.warning("PWM frequency too high, setting to 50 kHz.")
+            pwm_frequency = 50e3
+        self.pwm_frequency = pwm_frequency
+        for pin in self.PWM_PINS.values():
+            self.gpio.pwm_start(pin, self.pwm_frequency, 0)
+
+    def enable(self):
+        """Enable the motor driver."""
+        self.gpio.output(self.EN_PIN, self.gpio.LOW)
+
+    def disable(self):
+        """Disable the motor driver."""
+        self.gpio.output(self.EN_PIN, self.gpio.HIGH)
+
+    def fault(self):
+        """Check if there is a fault with the motor driver."""
+        return self.gpio.input(self.FAULT_PIN) == self.gpio.LOW
+
+    def change_pwm_frequency(self, frequency):
+        """Change the PWM frequency of the motor driver."""
+        if frequency > 50e3:
+            raise ValueError("PWM frequency too high, max is 50 kHz.")
+        for pin in self.PWM_PINS.values():
+            self.gpio.pwm_frequency(pin, frequency)
+        self.pwm_frequency = frequency
+
+    def set_velocity(self, az_vel, alt_vel):
+        """Sets the velocity of each motor."""
+        self.velocities = {"az": az_vel, "alt": alt_vel}
+        for m, v in self.velocities.items():
+            v = self._clip_speed(m, v)
+            speed = abs(v)
+            # NOTE: annoyingly, this direction convention is opposite of the
+            # other motor board
+            direction = 0 if v > 0 else 1
+            self._drive(m, direction, speed)
+
+    def _write_drive(self, motor, direction, speed, prev):
+        """Write only the direction pin and/or duty cycle that changed."""
+        if prev is None or prev[0] != direction:
+            self.gpio.output(self.DIR_PINS[motor], direction)
+        if prev is None or prev[1] != speed:
+            self.gpio.pwm_duty_cycle(
+                self.PWM_PINS[motor], self._speed2dc(speed)
+            )
+
+    def _speed2dc(self, speed):
+        """Convert speed to duty cycle for PWM."""
+        return abs(speed) / self.MAX_SPEED * 100
+
+    def set_drive(self, motor, direction, speed):
+        """
+        Drive a motor at a given speed. Users should call the set_velocity
+        method, not this one.
+
+        Parameters
+        ----------
+        motor : str
+            The motor to drive, must be ``az'' (azimuth) or ``alt'' (altitude)
+        direction : int
+            Direction to drive motor in, must be 0 (``forward'', i.e.,
+            increasing pot voltage) or 1 (``backward'').
+        speed : int
+            The unsigned speed to drive the motor at. Must be between 0 and
+            ``MAX_SPEED''.
+
+        """
+        self.gpio.output(self.DIR_PINS[motor], direction)
+        duty_cycle = self._speed2dc(speed)
+        self.gpio.pwm_duty_cycle(self.PWM_PINS[motor], duty_cycle)
+
+    def cleanup(self):
+        self.stop()
+        # self.stow()
+        for pin in self.PWM_PINS.values():
+            self.gpio.pwm_stop(pin)
+        self.disable()
+        self.gpio.cleanup()
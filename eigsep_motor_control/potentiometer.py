@@ -1,11 +1,25 @@
 import logging
 import numpy as np
-from pathlib import Path
 import serial
 import time
-from threading import Event, Thread, Lock
-import yaml
-from eigsep_motor_control.serial_params import BAUDRATE, INT_LEN
+from threading import Condition, Event, Thread, Lock, RLock
+from eigsep_motor_control import config as emc_config
+from eigsep_motor_control import protocol
+from eigsep_motor_control.clock import SYSTEM_CLOCK
+from eigsep_motor_control.estimator import KalmanEstimator
+from eigsep_motor_control.predictor import LimitPredictor
+from eigsep_motor_control.ring_buffer import RingBuffer
+from eigsep_motor_control.serial_params import (
+    BAUDRATE,
+    EMIT_RATE,
+    INT_LEN,
+    MAX_INT_LEN,
+    SAMPLE_RATE,
+)
+
+
+# column of each pot in the voltage arrays
+MOTOR_INDEX = {"az": 0, "alt": 1}
 
 
 class Potentiometer:
@@ -15,55 +29,200 @@ class Potentiometer:
 
     # serial connection constants (BAUDRATE defined in main.py)
     PORT = "/dev/ttyACM0"
+    TIMEOUT = 0.1  # read timeout in seconds
+    DIRECTION_WINDOW = 4  # seconds of history used to find the direction
+    clock = SYSTEM_CLOCK  # timestamps of published samples
+    VOLT_RANGE_KEY = "volt_range"  # config section of the voltage limits
 
-    def __init__(self):
+    def __init__(self, port=None):
         """
         Class for reading voltages from the potentiometers.
 
-        """
-        self.ser = serial.Serial(port=self.PORT, baudrate=BAUDRATE)
-        self.ser.reset_input_buffer()
+        Parameters
+        ----------
+        port : str, optional
+            Serial port of the Pico. Defaults to ``PORT''. Use the port
+            printed by ``python -m eigsep_motor_control.fake_pico'' to run
+            against the emulator.
 
-        # voltage range of the pots
-        path = Path(__file__).parent / "config.yaml"
-        with open(path, "r") as f:
-            config = yaml.safe_load(f)
-        self.VOLT_RANGE = config["volt_range"]
+        """
+        self.port = self.PORT if port is None else port
+        self.ser = serial.Serial(
+            port=self.port, baudrate=BAUDRATE, timeout=self.TIMEOUT
+        )
+        # undecoded bytes and decoded frames not yet consumed
+        self._rx = bytearray()
+        self._pending = np.zeros((0, 2), dtype=np.int32)
+        self._flush_input()
+        # the Pico streams at its default settings after reset
+        self.int_len = INT_LEN
+        self.emit_rate = EMIT_RATE
+
+        # voltage range of the pots, updated when the config file changes
+        config = emc_config.load()
+        self.VOLT_RANGE = config[self.VOLT_RANGE_KEY]
+        self.predictor = LimitPredictor.from_config(config.get("predictive"))
+        self._init_estimator(config)
+        self.motor = None  # commanded velocities feed the estimator
+        # pot velocity (V/s) below which the pot is considered stationary
         self.POT_ZERO_THRESHOLD = 0.0015
 
         # voltage measurements (az, alt)
-        size = 5  # number of measurements to store XXX
-        self.volts = np.zeros((size, 2))
+        self._init_history(self._window_size())
+        self.reset_volt_readings()
+        emc_config.watch(self.apply_config)
+
+    def _init_estimator(self, config):
+        """
+        Create the estimator with the motor to pot gain (see
+        ``emc.config.gain'') as gain of its control input.
+
+        """
+        self.GAIN = self._config_gain(config)
+        kalman = {**(config.get("kalman") or {}), "gain": self.GAIN}
+        self.estimator = KalmanEstimator.from_config(kalman)
+
+    def _init_history(self, size):
+        """
+        Set up the voltage history and the state shared with the
+        acquisition thread.
+
+        Parameters
+        ----------
+        size : int
+            Number of measurements to store.
+
+        """
+        self.size = size
+        self.history = RingBuffer(self.size, 2)
+        # guards the history and the latest sample
+        self._lock = RLock()
+        self._new_sample = Condition(self._lock)
+        self.sample = None  # latest (timestamp, volts)
+        self._last_t = None  # timestamp of the last recorded reading
+        self._subscribers = []
+        self._monitor = None  # subscriber of ``monitor''
+        self._acquiring = Event()
+        self._acq_thread = None
+        self._bulk = True
+
+    def _window_size(self):
+        """Number of readings spanning ``DIRECTION_WINDOW'' seconds."""
+        return max(2, int(round(self.DIRECTION_WINDOW * self.emit_rate)) + 1)
+
+    def _flush_input(self):
+        """Discard unread bytes and frames."""
+        self.ser.reset_input_buffer()
+        self._rx.clear()
+        self._pending = self._pending[:0]
+
+    def _send_command(self, cmd, value):
+        """Send a command to the Pico (see ``protocol.encode_command'')."""
+        self.ser.write(protocol.encode_command(cmd, value))
+        self.ser.flush()
+
+    def set_integration_length(self, int_len):
+        """
+        Set the number of ADC samples the Pico averages per reading. Longer
+        integration lowers the noise at the cost of lag.
+
+        Parameters
+        ----------
+        int_len : int
+            Number of samples in the boxcar average, at most
+            ``MAX_INT_LEN''. The Pico samples at ``SAMPLE_RATE'' Hz.
+
+        """
+        if not 1 <= int_len <= MAX_INT_LEN:
+            raise ValueError(f"Integration length must be 1-{MAX_INT_LEN}.")
+        running = self._acquiring.is_set()
+        self.stop()
+        self._send_command(protocol.CMD_INT_LEN, int_len)
+        self.int_len = int(int_len)
+        # the Pico refills its boxcar before sending again, wait so that
+        # frames summed over the old length are flushed
+        time.sleep(int_len / SAMPLE_RATE + 2 / self.emit_rate)
+        self._flush_input()
         self.reset_volt_readings()
+        if running:
+            self.start(bulk=self._bulk)
+
+    def set_emit_rate(self, rate):
+        """
+        Set the number of frames per second sent by the Pico. The voltage
+        history is resized to keep spanning ``DIRECTION_WINDOW'' seconds.
+
+        Parameters
+        ----------
+        rate : int
+            Frames per second, at most ``SAMPLE_RATE''.
+
+        """
+        if not 0 < rate <= SAMPLE_RATE:
+            raise ValueError(f"Emit rate must be positive, <= {SAMPLE_RATE}.")
+        running = self._acquiring.is_set()
+        self.stop()
+        self._send_command(protocol.CMD_EMIT_RATE, rate)
+        self.emit_rate = rate
+        time.sleep(2 / rate)
+        self._flush_input()
+        with self._lock:
+            self.size = self._window_size()
+            self.history = RingBuffer(self.size, 2)
+        self.reset_volt_readings()
+        if running:
+            self.start(bulk=self._bulk)
+
+    @property
+    def volts(self):
+        """
+        The last ``self.size'' voltage readings in chronological order,
+        shape (size, 2). Column 0 is azimuth and column 1 is altitude.
+
+        """
+        with self._lock:
+            return self.history.values
 
     @property
     def vdiff(self):
         """
-        Find the difference between the last ``self.size'' voltage readings
-        of each pot.
+        Find the mean rate of change of the voltage of each pot over the
+        last ``self.size'' readings. This is computed in constant time from
+        the oldest and newest readings in the history.
 
         Returns
         -------
         dict
-            A dictionary containing the differences in voltage readings between
-            the last two measurements for each pot. Keys are 'az' and 'alt'.
+            A dictionary containing the mean voltage difference per second
+            for each pot. Keys are 'az' and 'alt'.
 
         """
-        az, alt = np.diff(self.volts, axis=0).T
-        return {"az": az, "alt": alt}
+        with self._lock:
+            az, alt = self.history.slope * self.emit_rate
+        return {"az": float(az), "alt": float(alt)}
 
     @property
     def direction(self):
         """
-        Determines direction of az/alt motors based on last ``self.size''
-        voltage readings of the respective pot.
+        Determines direction of az/alt motors from the Kalman estimate of
+        the velocity of the respective pot. The direction is 0 unless the
+        velocity is significantly different from zero (see
+        ``KalmanEstimator.direction'') and above ``POT_ZERO_THRESHOLD''.
+
+        """
+        with self._lock:
+            az, alt = self.estimator.direction(self.POT_ZERO_THRESHOLD)
+        return {"az": int(az), "alt": int(alt)}
+
+    @property
+    def diff_direction(self):
+        """
+        Determines direction of az/alt motors based on the mean difference
+        of the last ``self.size'' voltage readings of the respective pot.
 
         """
-        # XXX might need to adjust the size so that we can pick up change
-        # of direction quickly enough
         d = {}
-        for k, v in self.vdiff.items():
-            x = np.mean(v)
+        for k, x in self.vdiff.items():
             # the pot is considered stationary if changes are below threshold
             if np.abs(x) < self.POT_ZERO_THRESHOLD:
                 d[k] = 0
@@ -71,6 +230,114 @@ class Potentiometer:
                 d[k] = int(np.sign(x))
         return d
 
+    @property
+    def velocity(self):
+        """Kalman estimate of the velocity (V/s) of each pot."""
+        with self._lock:
+            az, alt = self.estimator.velocity
+        return {"az": float(az), "alt": float(alt)}
+
+    def motion(self):
+        """
+        Kalman estimates of the velocity (V/s) and the direction (see
+        ``direction'') of both pots, taken together.
+
+        Returns
+        -------
+        velocity : np.ndarray
+            Velocity of the az and alt pots.
+        direction : np.ndarray
+            Direction of the az and alt pots.
+
+        """
+        with self._lock:
+            velocity = self.estimator.velocity.copy()
+            direction = self.estimator.direction(self.POT_ZERO_THRESHOLD)
+        return velocity, direction
+
+    @property
+    def confidence(self):
+        """
+        Probability that the sign of the estimated velocity of each pot is
+        correct, between 0.5 and 1.
+
+        """
+        with self._lock:
+            az, alt = self.estimator.confidence()
+        return {"az": float(az), "alt": float(alt)}
+
+    def attach_motor(self, motor):
+        """
+        Use the commanded velocities of a motor as control input of the
+        estimator.
+
+        Parameters
+        ----------
+        motor : emc.Motor
+            The motor driving the pots.
+
+        """
+        self.motor = motor
+
+    def _record(self, v, t=None):
+        """
+        Add voltage readings to the history and the estimator. The time
+        step of the estimator is the time since the previous call spread
+        evenly over the readings, so that dropped frames and host stalls
+        do not distort the pot velocity.
+
+        Parameters
+        ----------
+        v : np.ndarray
+            The readings, shape (N, 2) in chronological order.
+        t : float, optional
+            Timestamp (see ``clock'') of the last reading. Defaults to now.
+
+        """
+        if t is None:
+            t = self.clock.time()
+        u = None
+        if self.motor is not None:
+            vel = self.motor.velocities
+            u = np.array([vel["az"], vel["alt"]], dtype=float)
+        with self._lock:
+            if self._last_t is None or t <= self._last_t or not len(v):
+                dt = 1 / self.emit_rate
+            else:
+                dt = (t - self._last_t) / len(v)
+            if len(v):
+                self._last_t = t
+            self.history.extend(v)
+            for vi in v:
+                self.estimator.update(vi, dt, u=u)
+
+    def apply_config(self, config):
+        """
+        Use the voltage limits and lead times of a new configuration.
+        Called by the config watcher (see ``emc.config.watch'') when the
+        config file changes.
+
+        Parameters
+        ----------
+        config : dict
+            The validated configuration.
+
+        """
+        volt_range = config[self.VOLT_RANGE_KEY]
+        lead_time = LimitPredictor.from_config(
+            config.get("predictive")
+        ).lead_time
+        gain = self._config_gain(config)
+        with self._lock:
+            self.VOLT_RANGE = volt_range
+            self.predictor.lead_time = lead_time
+            self.GAIN = gain
+            self.estimator.gain = np.array([gain["az"], gain["alt"]])
+        logging.info(f"New pot voltage limits: {volt_range}.")
+
+    def _config_gain(self, config):
+        return emc_config.gain(config)
+
     def bit2volt(self, analog_value):
         """
         Converts an analog value from bits to volts.
@@ -90,6 +357,39 @@ class Potentiometer:
         voltage = (self.VMAX / res) * analog_value
         return voltage
 
+    def _read_frames(self, deadline=None):
+        """
+        Read all bytes waiting on the serial port and decode all complete
+        frames. If no complete frame is available, keep reading until one
+        arrives or the deadline passes.
+
+        Parameters
+        ----------
+        deadline : float, optional
+            time.monotonic value after which to give up waiting for a
+            frame. Blocks until a frame is decoded if None. The deadline is
+            checked between reads, so it may be exceeded by up to
+            ``TIMEOUT''.
+
+        Returns
+        -------
+        data : np.ndarray
+            The summed analog values of the decoded frames, shape (N, 2).
+            Empty if the deadline passed before a frame was decoded.
+
+        """
+        while True:
+            nbytes = self.ser.in_waiting
+            if nbytes == 0:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return np.zeros((0, 2), dtype=np.int32)
+                # wait for the rest of a frame (bounded by the port timeout)
+                nbytes = protocol.FRAME_SIZE - len(self._rx)
+            self._rx.extend(self.ser.read(nbytes))
+            data, self._rx = protocol.decode_frames(self._rx)
+            if len(data):
+                return data
+
     def read_analog(self):
         """
         Read the analog values of the pots.
@@ -97,14 +397,46 @@ class Potentiometer:
         Returns
         -------
         data : np.ndarray
-            The analog values of the pots averaged over INT_LEN
+            The analog values of the pots averaged over ``self.int_len''
             measurements. The first value is associated with the azimuth
             pot, the second value is the altitude pot.
 
         """
-        data = self.ser.readline().decode("utf-8").strip()
-        data = [int(d) for d in data.split()]
-        return np.array(data) / INT_LEN
+        while len(self._pending) == 0:
+            self._pending = self._read_frames()
+        data = self._pending[0]
+        self._pending = self._pending[1:]
+        return data / self.int_len
+
+    def read_analog_batch(self, timeout=None):
+        """
+        Read all frames waiting on the serial port in one call, so that a
+        backlog built up while the host was busy is drained at once.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time in seconds to wait for a frame if none is waiting.
+            Use 0 for a non-blocking read. Waits until a frame arrives if
+            None.
+
+        Returns
+        -------
+        data : np.ndarray
+            The analog values of the pots averaged over ``self.int_len''
+            measurements, shape (N, 2) in chronological order. N may be 0
+            if the timeout expires.
+
+        """
+        if len(self._pending) or timeout is not None:
+            deadline = time.monotonic() + (timeout or 0)
+        else:
+            deadline = None
+        data = self._read_frames(deadline=deadline)
+        if len(self._pending):
+            data = np.concatenate((self._pending, data))
+            self._pending = self._pending[:0]
+        return data / self.int_len
 
     def read_volts(self, motor=None):
         """
@@ -126,7 +458,7 @@ class Potentiometer:
 
         """
         v = self.bit2volt(self.read_analog())
-        self.volts = np.concatenate((self.volts[1:], v[None]), axis=0)
+        self._record(v[None])
         if motor == "az":
             return v[0]
         elif motor == "alt":
@@ -134,20 +466,50 @@ class Potentiometer:
         else:
             return v
 
+    def read_volts_batch(self, timeout=None):
+        """
+        Read all waiting voltages at once (see ``read_analog_batch'') and add
+        them to the voltage history in bulk.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time in seconds to wait for a frame if none is waiting.
+            Use 0 for a non-blocking read. Waits until a frame arrives if
+            None.
+
+        Returns
+        -------
+        v : np.ndarray
+            The voltage readings, shape (N, 2) in chronological order.
+
+        """
+        v = self.bit2volt(self.read_analog_batch(timeout=timeout))
+        self._record(v)
+        return v
+
     def reset_volt_readings(self):
         """
-        Read pot voltages quickly in succesion to reset the buffer. This
-        is useful to get meaningful derivatives.
+        Refill the voltage history with fresh readings. This is useful to
+        get meaningful derivatives.
 
         """
-        for i in range(self.volts.shape[0]):
-            _ = self.read_volts()
-            time.sleep(0.05)
+        with self._lock:
+            self.history.clear()
+            self.estimator.initialized = False
+            self._last_t = None
+        while len(self.history) < self.size:
+            if self._acquiring.is_set():
+                self.wait_sample(timeout=self.TIMEOUT)
+            else:
+                self.read_volts_batch(timeout=self.TIMEOUT)
 
     def _trigger_reverse(self, motor, volt_reading):
         """
-        Continuously monitor the voltage levels of one pot to see if motor
-        reaches its limit.
+        Check if the motor must be reversed to keep the pot within its
+        voltage limits. The pot velocity is extrapolated so that the motor
+        is reversed ahead of the limit by the horizon of ``self.predictor''
+        (no earlier than at the limit if the horizon is zero).
 
         Parameters
         ----------
@@ -159,21 +521,193 @@ class Potentiometer:
         """
         vmin, vmax = self.VOLT_RANGE[motor]
         d = self.direction[motor]
+        if d == 0:
+            return False
+        velocity = self.velocity[motor]
+        if not self.predictor.should_reverse(
+            motor, volt_reading, velocity, vmin, vmax
+        ):
+            return False
+        limit = "max" if d > 0 else "min"
         # check if the current voltage is outside the limits
-        if d > 0 and volt_reading >= vmax:
-            logging.warning(f"Pot {motor} at max voltage.")
-            return True
-        elif d < 0 and volt_reading <= vmin:
-            logging.warning(f"Pot {motor} at min voltage.")
-            return True
+        if (d > 0 and volt_reading >= vmax) or (
+            d < 0 and volt_reading <= vmin
+        ):
+            logging.warning(f"Pot {motor} at {limit} voltage.")
         else:
-            return False
+            ttl = self.predictor.time_to_limit(
+                volt_reading, velocity, vmin, vmax
+            )
+            logging.warning(
+                f"Pot {motor} predicted to reach {limit} voltage in "
+                f"{ttl:.2f} s."
+            )
+        return True
+
+    def last_volts(self, motor=None):
+        """
+        Return the latest voltage reading without reading the serial port.
+
+        Parameters
+        -------
+        motor : str, optional
+            The motor identifier ('az' or 'alt'). If no motor is specified,
+            the voltage of both pots is returned.
+
+        Returns
+        -------
+        v : float or np.ndarray
+            The latest voltage reading for the specified motor, or an array
+            of voltages if ``motor'' is None.
+
+        """
+        with self._lock:
+            v = self.history.newest.copy()
+        if motor == "az":
+            return v[0]
+        elif motor == "alt":
+            return v[1]
+        else:
+            return v
+
+    def subscribe(self, callback):
+        """
+        Register a function to be called for every sample published by the
+        acquisition thread.
+
+        Parameters
+        ----------
+        callback : callable
+            Called as ``callback(t, v)'' from the acquisition thread, where
+            ``t'' is the timestamp of the sample on ``self.clock'' and ``v''
+            the array of (az, alt) voltages. Callbacks should return quickly.
+
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Remove a function registered with ``subscribe''."""
+        with self._lock:
+            self._subscribers.remove(callback)
+
+    def _publish(self, t, v):
+        """Update the latest sample and notify waiters and subscribers."""
+        with self._lock:
+            self.sample = (t, v)
+            self._new_sample.notify_all()
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(t, v)
+
+    def wait_sample(self, timeout=None):
+        """
+        Block until the acquisition thread publishes a new sample.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds. Waits forever if None.
+
+        Returns
+        -------
+        sample : tuple or None
+            The new (timestamp, volts) sample, or None on timeout.
+
+        """
+        with self._lock:
+            last = self.sample
+            self._new_sample.wait_for(lambda: self.sample is not last, timeout)
+            if self.sample is last:
+                return None
+            return self.sample
+
+    def _acquire(self, bulk):
+        """Read frames from the pots and publish them until stopped."""
+        while self._acquiring.is_set():
+            v = self.read_volts_batch(timeout=self.TIMEOUT)
+            if not len(v):
+                continue
+            t = self._last_t
+            if bulk:
+                self._publish(t, v[-1])
+            else:
+                for vi in v:
+                    self._publish(t, vi)
+
+    @property
+    def acquiring(self):
+        """
+        Whether an acquisition thread reads the port, including one that
+        did not exit in time on ``stop''.
+
+        """
+        return self._acquiring.is_set() or self._acq_thread is not None
+
+    def start(self, bulk=True):
+        """
+        Start the background thread that owns the serial port. It reads
+        every frame and updates the voltage history with them.
+
+        Parameters
+        ----------
+        bulk : bool
+            If True, all frames waiting on the port are added to the history
+            at once and only the latest one is published to the
+            subscribers, so that decisions are made on the current pot
+            position even after the host stalls. If False, every frame is
+            published.
+
+        Raises
+        ------
+        RuntimeError
+            If the thread of a previous ``stop'' that timed out is still
+            reading the port.
+
+        """
+        if self._acquiring.is_set():
+            return
+        if self._acq_thread is not None:
+            self.stop(timeout=self.TIMEOUT)
+            if self._acq_thread is not None:
+                raise RuntimeError("The previous acquisition thread hangs.")
+        self._bulk = bulk
+        self._acquiring.set()
+        self._acq_thread = Thread(
+            target=self._acquire, args=(bulk,), daemon=True
+        )
+        self._acq_thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the acquisition thread.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time in seconds to wait for the thread to exit. The
+            thread is kept (and a warning logged) if it is still running,
+            so that ``start'' does not run a second reader on the port.
+
+        """
+        self._acquiring.clear()
+        thread = self._acq_thread
+        if thread is None:
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            logging.warning("Pot acquisition thread did not stop in time.")
+        else:
+            self._acq_thread = None
 
     def monitor(self, az_event, alt_event):
         """
-        Continuously monitor the voltage levels of the 'az' (azimuth) and 'alt'
-        (altitude) motors and checks these against predefined voltage ranges to
-        trigger events if voltage limits are reached.
+        Monitor the voltage levels of the 'az' (azimuth) and 'alt' (altitude)
+        pots on every sample and check these against predefined voltage
+        ranges to trigger events if voltage limits are reached. This
+        subscribes to the acquisition thread and starts it if needed. A
+        later call replaces the events of an earlier one, and stops the
+        monitoring if both are None.
 
         Parameters
         ----------
@@ -183,6 +717,10 @@ class Potentiometer:
             An event triggered when the altitude motor reaches its limit.
 
         """
+        with self._lock:
+            previous, self._monitor = self._monitor, None
+        if previous is not None:
+            self.unsubscribe(previous)
         names = []
         events = []
         if az_event is not None:
@@ -195,58 +733,129 @@ class Potentiometer:
         if not names:
             return
 
-        while True:
+        def check_limits(t, v):
             for m, event in zip(names, events):
-                v = self.read_volts(motor=m)
-                logging.info(f"{m}: {v:.3f} V ")
-                trigger = self._trigger_reverse(m, v)
+                trigger = self._trigger_reverse(m, v[MOTOR_INDEX[m]])
                 if trigger:
                     event.set()
-                    # self.reset_volt_readings()
+
+        self._monitor = check_limits
+        self.subscribe(check_limits)
+        self.start()
+
 
 class DummyPotentiometer(Potentiometer):
-    def __init__(self, motor_system):
+
+    VOLT_RANGE_KEY = "dummy_volt_range"
+    # a motor speed of 1 moves the pot by 2 ADC counts per second
+    DUMMY_GAIN = 2 * Potentiometer.VMAX / (2**Potentiometer.NBITS - 1)
+
+    def __init__(self, motor_system, clock=None):
+        """
+        Simulated pots following the velocities of a (dummy) motor. With the
+        system clock, a background thread updates the pot values. With a
+        virtual clock (see ``emc.sim.Simulator''), they only change when
+        ``step'' is called. Defaults to the clock of the motor.
+
+        """
         # Manually initialize attributes needed from the base class
         self.lock = Lock()
-        path = Path(__file__).parent / "config.yaml"
-        with open(path, "r") as f:
-            config = yaml.safe_load(f)
-        self.VOLT_RANGE = config["dummy_volt_range"]
-        self.POT_ZERO_THRESHOLD = 0.001
+        if clock is None:
+            clock = getattr(motor_system, "clock", SYSTEM_CLOCK)
+        self.clock = clock
+        config = emc_config.load()
+        self.VOLT_RANGE = config[self.VOLT_RANGE_KEY]
+        self.predictor = LimitPredictor.from_config(config.get("predictive"))
+        self._init_estimator(config)
+        # the simulated pots move at constant velocity between commands and
+        # are noiseless up to the ADC resolution
+        self.estimator.q = 1e-4
+        self.estimator.r = (self.VMAX / (2**self.NBITS - 1)) ** 2 / 12
+        self.emit_rate = 2  # one reading per 0.5 s
+        self.POT_ZERO_THRESHOLD = 0.002
         # Voltage measurements (az, alt)
-        size = 2  # Number of measurements to store
-        self.volts = np.zeros((size, 2))
+        self._init_history(2)  # Number of measurements to store
         self.motor_system = motor_system
+        self.motor = motor_system
         self.simulated_pots = {"az": 32768, "alt": 32768}  # Initial simulated mid-range pot values
-        self.update_thread = Thread(target=self.update_pot_values, daemon=True)
-        self.update_thread.start()
+        if not self.clock.virtual:
+            self.update_thread = Thread(
+                target=self.update_pot_values, daemon=True
+            )
+            self.update_thread.start()
         self.reset_volt_readings()
-        #print("DummyPotentiometer initialized with attributes:")
-        #print(f"VOLT_RANGE: {self.VOLT_RANGE}")
-        #print(f"POT_ZERO_THRESHOLD: {self.POT_ZERO_THRESHOLD}")
-        #print(f"volts: {self.volts}")
-        #print(f"simulated_pots: {self.simulated_pots}")
+        emc_config.watch(self.apply_config)
+
+    def _config_gain(self, config):
+        return {"az": self.DUMMY_GAIN, "alt": self.DUMMY_GAIN}
 
+    def step(self, dt):
+        """
+        Move the simulated pot values with the motor velocities for ``dt''
+        seconds. A motor speed of 1 moves the pot by 2 ADC counts per
+        second.
+        """
+        with self.lock:
+            for motor, speed in self.motor_system.velocities.items():
+                new_value = self.simulated_pots[motor] + speed * dt / 0.5
+                # Clamp the values to stay within 16-bit range
+                self.simulated_pots[motor] = max(0, min(65535, new_value))
 
     def update_pot_values(self):
         """
         Continuously updates the simulated pot values based on motor velocities.
         """
         while True:
-            time.sleep(0.5)  # Update frequency, adjust as needed
-            with self.lock:
-                for motor, speed in self.motor_system.velocities.items():
-                    direction = np.sign(speed)
-                    change = direction * np.abs(speed)
-                    new_value = self.simulated_pots[motor] + change
-                    # Clamp the values to stay within 16-bit range
-                    self.simulated_pots[motor] = max(0, min(65535, new_value))
+            self.clock.sleep(0.5)  # Update frequency, adjust as needed
+            self.step(0.5)
+
+    def _analog(self):
+        """The current simulated analog values (az, alt)."""
+        with self.lock:
+            return np.array(
+                [self.simulated_pots["az"], self.simulated_pots["alt"]]
+            )
 
     def read_analog(self):
         """
         Simulate the reading of analog values from the pots based on current simulated values.
         """
-        time.sleep(0.5)
-        with self.lock:
-            simulated_values = np.array([self.simulated_pots["az"], self.simulated_pots["alt"]])
-        return simulated_values
+        self.clock.sleep(1 / self.emit_rate)
+        return self._analog()
+
+    def emit(self):
+        """
+        Take a reading now and publish it to the subscribers, as the
+        acquisition thread does. Used by the simulator.
+
+        Returns
+        -------
+        v : np.ndarray
+            The voltages (az, alt).
+
+        """
+        v = self.bit2volt(self._analog())
+        t = self.clock.time()
+        self._record(v[None], t=t)
+        self._publish(t, v)
+        return v
+
+    def wait_sample(self, timeout=None):
+        """
+        Wait for the next sample. Without the acquisition thread and with a
+        virtual clock, this sleeps on the clock for one sample interval,
+        letting the simulator publish the sample.
+        """
+        if self._acquiring.is_set() or not self.clock.virtual:
+            return super().wait_sample(timeout=timeout)
+        last = self.sample
+        self.clock.sleep(1 / self.emit_rate)
+        if self.sample is last:
+            return None
+        return self.sample
+
+    def read_analog_batch(self, timeout=None):
+        """
+        Simulate a bulk read; the dummy pots produce one reading per call.
+        """
+        return self.read_analog()[None]
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class LimitPredictor:
+    def __init__(self, lead_time=None, alpha=0.2):
+        """
+        Predict when a pot will cross its voltage limits so that motors can
+        be reversed early enough to cover the latency between the pot
+        reading and the reversal taking effect.
+
+        Parameters
+        ----------
+        lead_time : dict
+            Seconds before the predicted limit crossing at which to reverse,
+            per axis ('az', 'alt'). Missing axes default to 0, i.e., reverse
+            only once the limit is reached.
+        alpha : float
+            Weight of new measurements in the running average of the
+            pipeline latency (see ``observe_latency'').
+
+        """
+        if lead_time is None:
+            lead_time = {}
+        self.lead_time = {m: lead_time.get(m, 0.0) for m in ["az", "alt"]}
+        self.alpha = alpha
+        # running average of the measured pot -> reversal latency
+        self.latency = {"az": 0.0, "alt": 0.0}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a predictor from the ``predictive'' section of config.yaml,
+        which maps each axis to its settings (``lead_time'' in seconds).
+
+        """
+        if not config:
+            return cls()
+        lead_time = {m: c.get("lead_time", 0.0) for m, c in config.items()}
+        return cls(lead_time=lead_time)
+
+    def observe_latency(self, motor, latency):
+        """
+        Update the running average of the measured latency between a pot
+        reading and the reversal of the motor.
+
+        Parameters
+        ----------
+        motor : str
+            The axis, 'az' or 'alt'.
+        latency : float
+            Measured latency in seconds.
+
+        """
+        old = self.latency[motor]
+        self.latency[motor] = old + self.alpha * (latency - old)
+
+    @staticmethod
+    def time_to_limit(volts, velocity, vmin, vmax):
+        """
+        Time until the pot reaches the limit it is moving towards.
+
+        Parameters
+        ----------
+        volts : float or np.ndarray
+            Current pot voltage.
+        velocity : float or np.ndarray
+            Pot velocity in V/s.
+        vmin : float or np.ndarray
+            Lower voltage limit.
+        vmax : float or np.ndarray
+            Upper voltage limit.
+
+        Returns
+        -------
+        ttl : float or np.ndarray
+            Time to the limit in seconds. Zero or negative if the limit has
+            already been passed, infinite if the pot is not moving.
+
+        """
+        velocity = np.asarray(velocity, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ttl = np.where(
+                velocity > 0,
+                (vmax - volts) / velocity,
+                np.where(velocity < 0, (vmin - volts) / velocity, np.inf),
+            )
+        return ttl[()]  # a scalar for scalar input
+
+    def horizon(self, motor):
+        """Seconds ahead of the limit at which ``motor'' is reversed."""
+        return self.lead_time[motor] + self.latency[motor]
+
+    def should_reverse(self, motor, volts, velocity, vmin, vmax):
+        """
+        Whether the motor must be reversed now to stay within the limits.
+
+        Returns
+        -------
+        bool
+            True if the predicted time to the limit is within the horizon
+            (configured lead time plus measured latency).
+
+        """
+        ttl = self.time_to_limit(volts, velocity, vmin, vmax)
+        return ttl <= self.horizon(motor)
@@ -0,0 +1,157 @@
+"""
+Binary framing of the pot readings sent by the Pico (see scripts/main.py),
+and the commands the host sends back.
+
+Each frame is ``SYNC + payload + crc``, where the payload is the pair of
+summed ADC readings (az, alt) packed as little-endian int32 and the crc is
+a CRC-8 (polynomial 0x07) over the payload bytes. The decoder works on
+arbitrary chunks of the byte stream, parses all complete frames at once and
+resynchronizes on the sync word after corrupted or dropped bytes.
+
+"""
+
+import struct
+import numpy as np
+
+SYNC = b"\xa5\x5a"
+PAYLOAD_FMT = "<ii"
+PAYLOAD_SIZE = struct.calcsize(PAYLOAD_FMT)
+FRAME_SIZE = len(SYNC) + PAYLOAD_SIZE + 1
+CRC_POLY = 0x07
+
+# host -> Pico commands, sent as ASCII lines "<cmd> <value>\n"
+CMD_INT_LEN = "I"  # number of samples in the boxcar average
+CMD_EMIT_RATE = "R"  # frames per second
+
+
+def _crc8_table(poly=CRC_POLY):
+    table = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ poly) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[i] = crc
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+    """
+    Compute the CRC-8 of a bytes-like object.
+
+    Parameters
+    ----------
+    data : bytes
+        The data to compute the checksum of.
+
+    Returns
+    -------
+    crc : int
+        The checksum.
+
+    """
+    crc = 0
+    for b in data:
+        crc = int(CRC8_TABLE[crc ^ b])
+    return crc
+
+
+def encode_frame(v1, v2):
+    """
+    Encode a pair of pot readings as a binary frame.
+
+    Parameters
+    ----------
+    v1 : int
+        Summed analog value of the azimuth pot.
+    v2 : int
+        Summed analog value of the altitude pot.
+
+    Returns
+    -------
+    frame : bytes
+        The encoded frame.
+
+    """
+    payload = struct.pack(PAYLOAD_FMT, int(v1), int(v2))
+    return SYNC + payload + bytes([crc8(payload)])
+
+
+def decode_frames(buf):
+    """
+    Decode all complete frames in a chunk of the serial byte stream.
+
+    Parameters
+    ----------
+    buf : bytes or bytearray
+        Raw bytes read from the serial port, possibly starting or ending in
+        the middle of a frame.
+
+    Returns
+    -------
+    data : np.ndarray
+        The decoded readings, shape (N, 2). Column 0 is azimuth and column 1
+        is altitude.
+    remainder : bytearray
+        Trailing bytes that may hold the start of an incomplete frame. These
+        should be prepended to the next chunk read from the port.
+
+    """
+    b = np.frombuffer(bytes(buf), dtype=np.uint8)
+    n = b.size
+    empty = np.zeros((0, 2), dtype=np.int32)
+    if n < FRAME_SIZE:
+        return empty, bytearray(buf)
+
+    # candidate frame starts are all sync words followed by a full frame
+    starts = np.flatnonzero((b[:-1] == SYNC[0]) & (b[1:] == SYNC[1]))
+    starts = starts[starts <= n - FRAME_SIZE]
+    frames = b[starts[:, None] + np.arange(FRAME_SIZE)]
+    crc = np.zeros(starts.size, dtype=np.uint8)
+    for i in range(len(SYNC), len(SYNC) + PAYLOAD_SIZE):
+        crc = CRC8_TABLE[crc ^ frames[:, i]]
+    valid = np.flatnonzero(crc == frames[:, -1])
+    # a sync word inside a valid frame must not start another frame
+    if np.any(np.diff(starts[valid]) < FRAME_SIZE):
+        keep = []
+        end = 0
+        for i in valid:
+            if starts[i] >= end:
+                keep.append(i)
+                end = starts[i] + FRAME_SIZE
+        valid = np.array(keep, dtype=int)
+
+    if valid.size:
+        end = starts[valid[-1]] + FRAME_SIZE
+        payload = frames[valid, len(SYNC) : len(SYNC) + PAYLOAD_SIZE]
+        data = np.ascontiguousarray(payload).view("<i4").reshape(-1, 2)
+    else:
+        end = 0
+        data = empty
+    remainder = bytearray(buf[max(end, n - FRAME_SIZE + 1) :])
+    return data, remainder
+
+
+def encode_command(cmd, value):
+    """
+    Encode a command for the Pico.
+
+    Parameters
+    ----------
+    cmd : str
+        The command, e.g. ``CMD_INT_LEN'' or ``CMD_EMIT_RATE''.
+    value : int
+        The value to set.
+
+    Returns
+    -------
+    line : bytes
+        The encoded command.
+
+    """
+    return f"{cmd} {int(value)}\n".encode("ascii")
@@ -0,0 +1,73 @@
+"""
+Motors driven by a SparkFun Qwiic motor driver (SCMD) over I2C. Imported
+on first use of ``emc.QwiicMotor'', so that ``qwiic_scmd'' is only loaded
+by programs using this board.
+
+"""
+
+from qwiic_scmd import QwiicScmd
+from eigsep_motor_control.motor import MAX_SPEED, MIN_SPEED, MOTOR_ID, Motor
+
+
+class QwiicMotor(Motor, QwiicScmd):
+
+    def __init__(
+        self, logger=None, address=None, i2c_driver=None, batch=True
+    ):
+        """
+        Motors driven by a SparkFun Qwiic motor driver (SCMD) over I2C.
+
+        Parameters
+        ----------
+        logger : logging.Logger
+            Logger to use.
+        address : int
+            I2C address of the driver. Defaults to the SCMD default.
+        i2c_driver : qwiic_i2c.I2CDriver
+            I2C bus to use. Defaults to the bus of the platform.
+        batch : bool
+            Write the drive registers of both motors in one block write
+            when both change, so they update together in one transaction.
+
+        """
+        Motor.__init__(self, logger=logger)
+        QwiicScmd.__init__(self, address=address, i2c_driver=i2c_driver)
+        self.MIN_SPEED = MIN_SPEED["qwiic"]
+        self.MAX_SPEED = MAX_SPEED["qwiic"]
+        self.batch = batch
+        assert self.begin(), "Initalization of SCMD failed."
+        self.enable()
+
+    @staticmethod
+    def _drive_value(direction, speed):
+        """Drive register value, as computed by ``QwiicScmd.set_drive''."""
+        level = int(round((speed + 1 - direction) / 2))
+        return level * direction + level * (direction - 1) + 128
+
+    def set_velocity(self, az_vel, alt_vel):
+        """Sets the velocity of each motor."""
+        self.velocities = {"az": az_vel, "alt": alt_vel}
+        commands = {}
+        for m, v in self.velocities.items():
+            v = self._clip_speed(m, v)
+            speed = abs(v)
+            direction = 1 if v > 0 else 0
+            commands[m] = (direction, speed)
+        pending = self._coalesce(commands)
+        if not pending:
+            return
+        if self.batch and len(pending) > 1:
+            # the drive registers are consecutive in MOTOR_ID order
+            motors = sorted(pending, key=MOTOR_ID.get)
+            self._i2c.writeBlock(
+                self.address,
+                self.SCMD_MA_DRIVE + MOTOR_ID[motors[0]],
+                [self._drive_value(*commands[m]) for m in motors],
+            )
+        else:
+            for m in pending:
+                self._write_drive(m, *commands[m], pending[m])
+        self._commit(commands, pending)
+
+    def _write_drive(self, motor, direction, speed, prev):
+        self.set_drive(MOTOR_ID[motor], direction, speed)
@@ -0,0 +1,465 @@
+"""
+Offline replay of recorded pot samples (see ``emc.telemetry'') through
+the limit logic: ``Potentiometer.direction'', ``_trigger_reverse'' and
+``limit_switch_hit.LimitSwitches'', driven by the ``Controller'' on a
+virtual clock with a stand-in motor. Replays run as fast as the host
+allows, so the parameters of the logic can be tuned against field data by
+sweeping a grid of them over a process pool (see ``sweep'').
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import logging
+from pathlib import Path
+import time
+import numpy as np
+
+from eigsep_motor_control import config as emc_config
+from eigsep_motor_control import telemetry
+from eigsep_motor_control.clock import VirtualClock
+from eigsep_motor_control.controller import Controller
+from eigsep_motor_control.motor import Motor
+from eigsep_motor_control.potentiometer import MOTOR_INDEX, Potentiometer
+from eigsep_motor_control.predictor import LimitPredictor
+from eigsep_motor_control.ring_buffer import RingBuffer
+
+# parameters that can be set in a replay, see ``Replay.set_params''
+PARAMS = ("POT_ZERO_THRESHOLD", "size", "debounce_interval", "VOLT_RANGE")
+
+
+class ReplayMotor(Motor):
+
+    MIN_SPEED = -np.inf
+    MAX_SPEED = np.inf
+
+    def __init__(self, clock, logger=None, follow=True):
+        """
+        Stand-in motor recording the reversal decisions of the limit logic.
+
+        Parameters
+        ----------
+        clock : emc.clock.VirtualClock
+            Clock of the replay.
+        logger : logging.Logger
+            Logger to use.
+        follow : bool
+            If True, the velocities follow the recording (see
+            ``Replay.apply'') and reversals are only recorded. If False,
+            reversals flip the commanded velocity.
+
+        """
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        super().__init__(logger=logger, clock=clock)
+        self.follow = follow
+        self.decisions = []  # (time, motor, forced)
+
+    def set_velocity(self, az_vel, alt_vel):
+        self.velocities = {"az": az_vel, "alt": alt_vel}
+
+    def reverse(self, motor, force=False):
+        if not self.should_reverse(motor) and not force:
+            return
+        self.decisions.append((self.clock.time(), motor, force))
+        if not self.follow:
+            vel = dict(self.velocities)
+            vel[motor] = -vel[motor]
+            self.velocities = vel
+        if not force:
+            self.last_reversal_time[motor] = self.clock.time()
+
+
+class ReplayPotentiometer(Potentiometer):
+    def __init__(self, clock, emit_rate, volt_range=None):
+        """
+        Pots publishing recorded samples instead of reading the Pico.
+
+        Parameters
+        ----------
+        clock : emc.clock.VirtualClock
+            Clock of the replay; it is moved to the timestamp of each
+            sample.
+        emit_rate : float
+            Sample rate of the recording in Hz.
+        volt_range : dict, optional
+            Voltage limits of the pots. Defaults to ``volt_range'' of the
+            configuration (see ``emc.config'').
+
+        """
+        self.clock = clock
+        config = emc_config.load()
+        if volt_range is None:
+            volt_range = config["volt_range"]
+        self.VOLT_RANGE = volt_range
+        self.predictor = LimitPredictor.from_config(config.get("predictive"))
+        self._init_estimator(config)
+        self.motor = None
+        self.POT_ZERO_THRESHOLD = 0.0015
+        self.int_len = 1
+        self.emit_rate = emit_rate
+        self._init_history(self._window_size())
+
+    def resize(self, size):
+        """Set the number of readings kept in the history."""
+        with self._lock:
+            self.size = size
+            self.history = RingBuffer(size, 2)
+
+    def feed(self, t, v):
+        """Record a sample and publish it to the subscribers."""
+        self._record(v[None], t=t)
+        self._publish(t, v)
+
+    def wait_sample(self, timeout=None):
+        """Sleep on the clock for one sample interval (see ``Replay'')."""
+        last = self.sample
+        self.clock.sleep(1 / self.emit_rate)
+        if self.sample is last:
+            return None
+        return self.sample
+
+
+class EndOfRecording(Exception):
+    """Raised when the limit logic waits for samples past the recording."""
+
+
+class _Events:
+    """Collects the reversals and limit switch events of the controller."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.reversals = []
+        self.limits = []
+
+    def reversal(self, motor, latency, velocity, t=None):
+        self.reversals.append((self.clock.time(), motor))
+
+    def limit(self, motor, state, t=None):
+        self.limits.append((self.clock.time(), motor, bool(state)))
+
+
+class Replay:
+    def __init__(
+        self,
+        times,
+        volts,
+        events=None,
+        velocities=(1, 1),
+        motors=("az", "alt"),
+        safe=True,
+        params=None,
+        logger=None,
+    ):
+        """
+        Replay pot samples through the limit logic of a ``Controller''.
+        Sleeps of the logic (e.g., in ``reverse_limit'') consume samples
+        instead of time.
+
+        Parameters
+        ----------
+        times : array_like
+            Sample timestamps in seconds, increasing.
+        volts : array_like
+            Pot voltages (az, alt), shape (N, 2).
+        events : np.ndarray, optional
+            Telemetry records of kind 'velocity' and 'reversal'. The
+            commanded velocities follow them, and the recorded reversals
+            are compared to the decisions of the replay. Without events,
+            the stand-in motor starts at ``velocities'' and reverses as
+            the logic decides.
+        velocities : tuple
+            Initial (az, alt) velocities if there are no velocity events.
+        motors : list of str
+            The motors reversed at the pot limits.
+        safe : bool
+            Also run the limit switch logic (``LimitSwitches'').
+        params : dict, optional
+            Parameters of the logic, see ``set_params''.
+        logger : logging.Logger
+            Logger of the motor and the controller.
+
+        """
+        self.times = np.asarray(times, dtype=float)
+        self.volts = np.asarray(volts, dtype=float)
+        if len(self.times) < 2 or self.volts.shape != (len(self.times), 2):
+            raise ValueError("Need at least two samples of shape (N, 2).")
+        if events is None:
+            events = np.zeros(0, dtype=telemetry.RECORD_DTYPE)
+        self.events = np.sort(events, order="t")
+        self.clock = VirtualClock(t0=self.times[0])
+        self.clock.on_sleep = self.advance
+        follow = bool(np.any(self.events["kind"] == telemetry.VELOCITY))
+        self.motor = ReplayMotor(self.clock, logger=logger, follow=follow)
+        if not follow:
+            self.motor.set_velocity(*velocities)
+        emit_rate = 1 / np.median(np.diff(self.times))
+        self.pot = ReplayPotentiometer(self.clock, emit_rate)
+        self.pot.attach_motor(self.motor)
+        self.log = _Events(self.clock)
+        self.controller = Controller(
+            self.motor,
+            self.pot,
+            motors=motors,
+            safe=safe,
+            stall_timeout=np.inf,
+            logger=logger,
+            telemetry=self.log,
+        )
+        self.pot.subscribe(self.controller.on_sample)
+        self.set_params(params or {})
+        self._next = 0  # index of the next sample
+        self._next_event = 0
+
+    def set_params(self, params):
+        """
+        Set parameters of the limit logic.
+
+        Parameters
+        ----------
+        params : dict
+            Any of ``POT_ZERO_THRESHOLD'' (pot velocity in V/s below which
+            a pot is stationary), ``size'' (readings in the pot history,
+            used by ``vdiff''; ``direction'' comes from the Kalman
+            estimator), ``debounce_interval'' (seconds between reversals
+            of a motor) and ``VOLT_RANGE'' (dict of the pot voltage
+            limits).
+
+        """
+        unknown = set(params) - set(PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown replay parameters: {sorted(unknown)}.")
+        if "POT_ZERO_THRESHOLD" in params:
+            self.pot.POT_ZERO_THRESHOLD = params["POT_ZERO_THRESHOLD"]
+        if "size" in params:
+            self.pot.resize(int(params["size"]))
+        if "debounce_interval" in params:
+            self.motor.debounce_interval = params["debounce_interval"]
+        if "VOLT_RANGE" in params:
+            self.pot.VOLT_RANGE = params["VOLT_RANGE"]
+
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        """
+        Replay telemetry records (see ``emc.telemetry.read_all'').
+
+        Parameters
+        ----------
+        records : np.ndarray
+            Records with dtype ``telemetry.RECORD_DTYPE''.
+        kwargs : dict
+            Passed to ``Replay''.
+
+        """
+        samples = records[records["kind"] == telemetry.SAMPLE]
+        kinds = (telemetry.VELOCITY, telemetry.REVERSAL)
+        events = records[np.isin(records["kind"], kinds)]
+        return cls(samples["t"], samples["values"], events=events, **kwargs)
+
+    def apply(self, event):
+        """Set the commanded velocities from a recorded event."""
+        vel = self.motor.velocities
+        if event["kind"] == telemetry.VELOCITY:
+            vel["az"], vel["alt"] = event["values"]
+        elif event["kind"] == telemetry.REVERSAL:
+            m = list(MOTOR_INDEX)[event["motor"]]
+            vel[m] = event["values"][1]
+
+    def _feed(self):
+        """Publish the next sample and apply the events preceding it."""
+        t = self.times[self._next]
+        while (
+            self._next_event < len(self.events)
+            and self.events["t"][self._next_event] <= t
+        ):
+            if self.motor.follow:
+                self.apply(self.events[self._next_event])
+            self._next_event += 1
+        self.clock.advance(t - self.clock.time())
+        self.pot.feed(t, self.volts[self._next])
+        self._next += 1
+
+    def advance(self, seconds):
+        """
+        Publish the samples of the next ``seconds'' of the recording. The
+        events they post are handled by ``run''.
+
+        """
+        if self._next >= len(self.times):
+            raise EndOfRecording
+        end = self.clock.time() + seconds
+        while self._next < len(self.times) and self.times[self._next] <= end:
+            self._feed()
+        self.clock.advance(max(end - self.clock.time(), 0))
+
+    def run(self):
+        """
+        Replay all samples.
+
+        Returns
+        -------
+        result : dict
+            See ``summary''.
+
+        """
+        t0 = time.perf_counter()
+        queue = self.controller.queue
+        try:
+            while self._next < len(self.times):
+                self._feed()
+                while not queue.empty():
+                    self.controller.handle(*self.controller.get(timeout=0))
+        except EndOfRecording:
+            pass
+        self.elapsed = time.perf_counter() - t0
+        return self.summary()
+
+    def summary(self, window=None):
+        """
+        Reversal decisions of the replay and their timing relative to the
+        recorded reversals.
+
+        Parameters
+        ----------
+        window : float, optional
+            Maximum time in seconds between a decision and a recorded
+            reversal of the same motor for them to match. Defaults to the
+            debounce interval.
+
+        Returns
+        -------
+        result : dict
+            ``reversals'' (decisions per motor, excluding forced limit
+            switch reversals), ``forced'' (forced reversals per motor),
+            ``decisions'' (list of (time, motor, forced)), ``limits''
+            (limit switch events as (time, motor, set)), and, if the
+            recording has reversals, ``recorded'' (per motor), ``lag''
+            (median seconds from the recorded to the matching replay
+            reversal, negative if the replay reverses earlier),
+            ``missed'' and ``spurious''. Also ``samples'', ``duration''
+            (recorded seconds) and ``elapsed'' (wall seconds).
+
+        """
+        if window is None:
+            window = self.motor.debounce_interval
+        decisions = self.motor.decisions
+        result = {
+            "reversals": {m: 0 for m in MOTOR_INDEX},
+            "forced": {m: 0 for m in MOTOR_INDEX},
+            "decisions": list(decisions),
+            "limits": list(self.log.limits),
+            "samples": self._next,
+            "duration": float(self.times[self._next - 1] - self.times[0]),
+            "elapsed": getattr(self, "elapsed", None),
+        }
+        for _, m, forced in decisions:
+            result["forced" if forced else "reversals"][m] += 1
+        recorded = self.events[self.events["kind"] == telemetry.REVERSAL]
+        if not len(recorded):
+            return result
+        result.update(recorded={}, lag={}, missed={}, spurious={})
+        for m, i in MOTOR_INDEX.items():
+            rec = recorded["t"][recorded["motor"] == i]
+            ours = np.array([t for t, mi, f in decisions if mi == m and not f])
+            lags = []
+            used = set()
+            for tr in rec:
+                if not len(ours):
+                    break
+                j = int(np.argmin(np.abs(ours - tr)))
+                if abs(ours[j] - tr) <= window and j not in used:
+                    used.add(j)
+                    lags.append(ours[j] - tr)
+            result["recorded"][m] = len(rec)
+            result["lag"][m] = float(np.median(lags)) if lags else None
+            result["missed"][m] = len(rec) - len(lags)
+            result["spurious"][m] = len(ours) - len(used)
+        return result
+
+
+def replay(records, params=None, quiet=True, **kwargs):
+    """
+    Replay telemetry records with the given parameters.
+
+    Parameters
+    ----------
+    records : np.ndarray or str or pathlib.Path
+        Telemetry records or the directory of the telemetry files.
+    params : dict, optional
+        Parameters of the limit logic, see ``Replay.set_params''.
+    quiet : bool
+        Suppress the warnings logged on each limit crossing.
+    kwargs : dict
+        Passed to ``Replay''.
+
+    Returns
+    -------
+    result : dict
+        See ``Replay.summary''.
+
+    """
+    if isinstance(records, (str, Path)):
+        records = telemetry.read_all(records)
+    r = Replay.from_records(records, params=params, **kwargs)
+    if quiet:
+        logging.disable(logging.WARNING)
+    try:
+        return r.run()
+    finally:
+        if quiet:
+            logging.disable(logging.NOTSET)
+
+
+def _replay_one(args):
+    records, params, kwargs = args
+    return params, replay(records, params=params, **kwargs)
+
+
+def grid(**values):
+    """
+    Parameter sets of a grid, e.g.,
+    ``grid(size=[5, 9], debounce_interval=[2, 5])''.
+
+    Returns
+    -------
+    params : list of dict
+        One dict per combination of the values.
+
+    """
+    keys = list(values)
+    return [
+        dict(zip(keys, combo)) for combo in itertools.product(*values.values())
+    ]
+
+
+def sweep(records, params, processes=None, **kwargs):
+    """
+    Replay the same recording with many parameter sets in parallel.
+
+    Parameters
+    ----------
+    records : np.ndarray or str or pathlib.Path
+        Telemetry records or the directory of the telemetry files.
+    params : list of dict
+        The parameter sets, e.g., from ``grid''.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs. Use 1
+        to replay in this process.
+    kwargs : dict
+        Passed to ``replay''.
+
+    Returns
+    -------
+    results : list of tuple
+        (params, result) in the order of ``params''.
+
+    """
+    if isinstance(records, (str, Path)):
+        records = telemetry.read_all(records)
+    # a plain array, not a memmap of the files, is sent to the workers
+    records = np.array(records)
+    jobs = [(records, p, kwargs) for p in params]
+    if processes == 1:
+        return [_replay_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_replay_one, jobs))
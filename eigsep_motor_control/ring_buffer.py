@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, size, ncols):
+        """
+        Fixed-size circular buffer of measurements that is updated in place
+        and keeps running statistics, so that the mean and the average slope
+        over the window are available in O(1) regardless of the size.
+
+        Parameters
+        ----------
+        size : int
+            Number of measurements (rows) to store.
+        ncols : int
+            Number of values per measurement (e.g., 2 for az/alt).
+
+        """
+        if size < 2:
+            raise ValueError("Size must be at least 2.")
+        self.size = size
+        self.buf = np.zeros((size, ncols))
+        self.count = 0  # number of valid rows
+        self._head = 0  # index of the next row to write
+        self._sum = np.zeros(ncols)
+        self._slope = np.zeros(ncols)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def append(self, x):
+        """
+        Add a measurement to the buffer, overwriting the oldest one if the
+        buffer is full.
+
+        Parameters
+        ----------
+        x : array_like
+            The measurement, shape (ncols,).
+
+        """
+        row = self.buf[self._head]
+        if self.full:
+            self._sum -= row
+        else:
+            self.count += 1
+        row[:] = x
+        self._sum += row
+        self._head = (self._head + 1) % self.size
+        if self._head == 0:
+            # resum once per wrap to avoid accumulating rounding errors
+            np.sum(self.buf, axis=0, out=self._sum)
+
+    def extend(self, xs):
+        """
+        Add several measurements to the buffer at once.
+
+        Parameters
+        ----------
+        xs : array_like
+            The measurements in chronological order, shape (N, ncols).
+
+        """
+        xs = np.asarray(xs)
+        n = len(xs)
+        if n == 0:
+            return
+        if n >= self.size:
+            self.buf[:] = xs[-self.size :]
+            self.count = self.size
+            self._head = 0
+            np.sum(self.buf, axis=0, out=self._sum)
+            return
+        idx = (self._head + np.arange(n)) % self.size
+        # rows currently holding measurements that will be overwritten
+        old = idx[idx < self.count]
+        if old.size:
+            self._sum -= self.buf[old].sum(axis=0)
+        self.buf[idx] = xs
+        self._sum += xs.sum(axis=0)
+        self.count = min(self.size, self.count + n)
+        wrapped = self._head + n >= self.size
+        self._head = (self._head + n) % self.size
+        if wrapped:
+            np.sum(self.buf, axis=0, out=self._sum)
+
+    def clear(self):
+        """Remove all measurements from the buffer."""
+        self.count = 0
+        self._head = 0
+        self._sum[:] = 0
+
+    @property
+    def newest(self):
+        """The most recent measurement."""
+        return self.buf[self._head - 1]
+
+    @property
+    def oldest(self):
+        """The oldest measurement in the buffer."""
+        if self.full:
+            return self.buf[self._head]
+        return self.buf[0]
+
+    @property
+    def mean(self):
+        """Mean of the measurements in the buffer."""
+        return self._sum / max(self.count, 1)
+
+    @property
+    def slope(self):
+        """
+        Mean difference between consecutive measurements in the buffer.
+        This telescopes to (newest - oldest) / (count - 1). The returned
+        array is reused between calls.
+
+        """
+        if self.count < 2:
+            self._slope[:] = 0
+            return self._slope
+        np.subtract(self.newest, self.oldest, out=self._slope)
+        self._slope /= self.count - 1
+        return self._slope
+
+    @property
+    def values(self):
+        """Copy of the measurements in chronological order."""
+        if not self.full:
+            return self.buf[: self.count].copy()
+        return np.concatenate((self.buf[self._head :], self.buf[: self._head]))
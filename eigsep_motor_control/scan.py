@@ -0,0 +1,382 @@
+"""
+Scan schedules: scan patterns are turned into a table of waypoints in pot
+voltage space (within the ranges in config.yaml) with their planned arrival
+times, and executed against a Motor with pot feedback.
+
+"""
+
+import time
+import numpy as np
+from eigsep_motor_control import config as emc_config
+
+# one row per waypoint: target pot voltages, dwell time at the waypoint and
+# planned arrival time (s)
+WAYPOINT_DTYPE = np.dtype(
+    [("az", "f8"), ("alt", "f8"), ("dwell", "f8"), ("t", "f8")]
+)
+# consecutive pot sample timeouts (1 s each) before a scan is aborted
+MAX_MISSED = 3
+
+# default scan settings, overridden by the ``scan'' section of config.yaml
+SCAN_DEFAULTS = {
+    "lookahead": 0.2,  # seconds before a waypoint to command the next one
+    "margin": 0.05,  # volts kept clear of the pot limits
+}
+
+
+def load_scan_config():
+    """
+    Read the ``scan'' section and the pot voltage ranges of config.yaml.
+
+    Returns
+    -------
+    scan : dict
+        Scan settings (see ``SCAN_DEFAULTS''), and the motor to pot
+        ``gain'' of each axis (see ``emc.config.gain'').
+    volt_range : dict
+        Sorted (min, max) pot voltage of each axis.
+
+    """
+    config = emc_config.load()
+    scan = {**SCAN_DEFAULTS, **config.get("scan", {})}
+    scan["gain"] = emc_config.gain(config)
+    volt_range = {
+        m: tuple(sorted(v)) for m, v in config["volt_range"].items()
+    }
+    return scan, volt_range
+
+
+def _to_volts(uv, volt_range, margin):
+    """Map unit-square coordinates (az, alt) to pot voltages."""
+    uv = np.asarray(uv, dtype=float)
+    out = np.empty_like(uv)
+    for i, m in enumerate(["az", "alt"]):
+        lo, hi = volt_range[m]
+        lo, hi = lo + margin, hi - margin
+        if hi < lo:  # range narrower than the margins
+            lo = hi = (lo + hi) / 2
+        out[:, i] = lo + uv[:, i] * (hi - lo)
+    return out
+
+
+def check_points(points, volt_range):
+    """
+    Check that waypoints are within the pot voltage ranges.
+
+    Parameters
+    ----------
+    points : array_like
+        Waypoint voltages (az, alt), shape (N, 2).
+    volt_range : dict
+        (min, max) pot voltage of each axis, in any order.
+
+    Raises
+    ------
+    ValueError
+        If a waypoint is outside the ranges.
+
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    for i, m in enumerate(["az", "alt"]):
+        lo, hi = sorted(volt_range[m])
+        bad = (points[:, i] < lo) | (points[:, i] > hi)
+        if np.any(bad):
+            j = np.flatnonzero(bad)[0]
+            raise ValueError(
+                f"Waypoint {j} {m} = {points[j, i]:.3f} V is outside the pot "
+                f"limits {lo:.3f}-{hi:.3f} V."
+            )
+
+
+def segments(delta, max_vel):
+    """
+    Velocities and durations of straight segments, traversed with the
+    slower axis at its maximum velocity so both axes arrive together.
+
+    Parameters
+    ----------
+    delta : array_like
+        Voltage change (az, alt) of each segment, shape (N, 2).
+    max_vel : array_like
+        Maximum pot velocity (V/s) of each axis.
+
+    Returns
+    -------
+    vel : np.ndarray
+        Pot velocities (V/s), shape (N, 2).
+    duration : np.ndarray
+        Duration of each segment in seconds.
+
+    """
+    delta = np.atleast_2d(np.asarray(delta, dtype=float))
+    duration = np.max(np.abs(delta) / np.asarray(max_vel, dtype=float), axis=1)
+    vel = np.divide(
+        delta,
+        duration[:, None],
+        out=np.zeros_like(delta),
+        where=duration[:, None] > 0,
+    )
+    return vel, duration
+
+
+def raster(nrows, volt_range, margin=0.0):
+    """
+    Boustrophedon raster: sweep the full azimuth range at ``nrows''
+    altitudes, alternating direction.
+
+    Parameters
+    ----------
+    nrows : int
+        Number of azimuth sweeps.
+    volt_range : dict
+        Sorted (min, max) pot voltage of each axis.
+    margin : float
+        Volts kept clear of the pot limits.
+
+    Returns
+    -------
+    points : np.ndarray
+        Waypoint voltages (az, alt), shape (2 * nrows, 2).
+
+    """
+    alt = np.linspace(0, 1, nrows) if nrows > 1 else np.array([0.5])
+    uv = np.empty((2 * nrows, 2))
+    uv[:, 1] = np.repeat(alt, 2)
+    uv[0::4, 0] = 0
+    uv[1::4, 0] = 1
+    uv[2::4, 0] = 1
+    uv[3::4, 0] = 0
+    return _to_volts(uv, volt_range, margin)
+
+
+def spiral(turns, npoints, volt_range, margin=0.0):
+    """
+    Archimedean spiral from the center of the ranges outwards.
+
+    Parameters
+    ----------
+    turns : float
+        Number of turns.
+    npoints : int
+        Number of waypoints.
+    volt_range : dict
+        Sorted (min, max) pot voltage of each axis.
+    margin : float
+        Volts kept clear of the pot limits.
+
+    Returns
+    -------
+    points : np.ndarray
+        Waypoint voltages (az, alt), shape (npoints, 2).
+
+    """
+    s = np.linspace(0, 1, npoints)
+    phi = 2 * np.pi * turns * s
+    uv = 0.5 + 0.5 * s[:, None] * np.stack([np.cos(phi), np.sin(phi)], -1)
+    return _to_volts(uv, volt_range, margin)
+
+
+def plan(points, max_vel, dwell=0.0, start=None):
+    """
+    Precompute the waypoint table of a scan. Each segment is traversed in a
+    straight line (see ``segments'').
+
+    Parameters
+    ----------
+    points : array_like
+        Waypoint voltages (az, alt), shape (N, 2).
+    max_vel : array_like
+        Maximum pot velocity (V/s) of each axis.
+    dwell : float or array_like
+        Time to hold at each waypoint in seconds.
+    start : array_like, optional
+        Starting voltages. Defaults to the first waypoint.
+
+    Returns
+    -------
+    table : np.ndarray
+        Structured array with dtype ``WAYPOINT_DTYPE''.
+
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    if start is None:
+        start = points[0]
+    prev = np.vstack([start, points[:-1]])
+    _, duration = segments(points - prev, max_vel)
+    table = np.zeros(len(points), dtype=WAYPOINT_DTYPE)
+    table["az"], table["alt"] = points.T
+    table["dwell"] = dwell
+    # arrival time includes the dwell at all previous waypoints
+    dwell_before = np.cumsum(table["dwell"]) - table["dwell"]
+    table["t"] = np.cumsum(duration) + dwell_before
+    return table
+
+
+class ScanExecutor:
+    def __init__(
+        self, motor, pot, table, gain=None, lookahead=None, volt_range=None
+    ):
+        """
+        Execute a waypoint table against a motor with pot feedback.
+
+        Parameters
+        ----------
+        motor : emc.Motor
+            The motor to drive.
+        pot : emc.Potentiometer
+            The potentiometer reading the motor positions.
+        table : np.ndarray
+            Waypoint table from ``plan''.
+        gain : dict, optional
+            Pot V/s per unit motor speed of each axis. Defaults to the
+            ``gain'' section of config.yaml.
+        lookahead : float, optional
+            The next segment is commanded when the current waypoint is this
+            many seconds away, to cover the command latency. Defaults to
+            the ``scan'' section of config.yaml.
+        volt_range : dict, optional
+            Pot voltage limits the waypoints must be within. Defaults to
+            the limits of ``pot''.
+
+        Raises
+        ------
+        ValueError
+            If a waypoint is outside the pot limits, or the gain of an axis
+            is 0 (not calibrated).
+
+        """
+        config, _ = load_scan_config()
+        if volt_range is None:
+            volt_range = pot.VOLT_RANGE
+        check_points(np.stack([table["az"], table["alt"]], -1), volt_range)
+        self.motor = motor
+        self.pot = pot
+        self.table = table
+        if gain is None:
+            gain = config["gain"]
+        self.gain = np.array([gain["az"], gain["alt"]], dtype=float)
+        if not np.all(self.gain):
+            raise ValueError("Scans need a non-zero gain of each axis.")
+        if lookahead is None:
+            lookahead = config["lookahead"]
+        self.lookahead = lookahead
+        self.max_vel = np.abs(self.gain) * motor.MAX_SPEED
+        self._missed = 0
+
+    def _command(self, vel):
+        """Command pot velocities (V/s) as motor speeds."""
+        speed = np.clip(
+            vel / self.gain, self.motor.MIN_SPEED, self.motor.MAX_SPEED
+        )
+        self.motor.set_velocity(float(speed[0]), float(speed[1]))
+
+    def _wait_sample(self):
+        """
+        The next pot sample, or None on a timeout. Raises RuntimeError after
+        ``MAX_MISSED'' consecutive timeouts, the pot stream has stopped.
+
+        """
+        sample = self.pot.wait_sample(timeout=1)
+        if sample is not None:
+            self._missed = 0
+            return sample
+        self._missed += 1
+        if self._missed >= MAX_MISSED:
+            raise RuntimeError(
+                f"No pot samples for {self._missed} s, aborting the scan."
+            )
+        return None
+
+    def run(self, timeout=None):
+        """
+        Drive through all waypoints. Each segment's velocity is computed
+        from the measured position when it is commanded, so errors do not
+        accumulate along the scan. The motors are stopped at the end, also
+        if the scan fails.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time per waypoint in seconds. Defaults to five times the
+            planned segment duration plus ten seconds.
+
+        Returns
+        -------
+        report : dict
+            ``arrival_error'' (V, per waypoint), ``arrival_time'' (s from
+            the start, per waypoint), ``duration'' (s), ``planned_duration''
+            (s), and ``path_length'' (V).
+
+        Raises
+        ------
+        RuntimeError
+            If the pot stream stops (see ``MAX_MISSED'').
+
+        """
+        self.pot.start()
+        n = len(self.table)
+        arrival_error = np.zeros(n)
+        arrival_time = np.zeros(n)
+        targets = np.stack([self.table["az"], self.table["alt"]], axis=-1)
+        t0 = None
+        path = 0.0
+        last_pos = None
+        self._missed = 0
+        try:
+            for i, target in enumerate(targets):
+                sample = self._wait_sample()
+                t, pos = sample if sample is not None else (None, None)
+                if pos is None:
+                    pos = self.pot.last_volts()
+                    t = time.monotonic()
+                if t0 is None:
+                    t0 = t
+                vel, duration = segments(target - pos, self.max_vel)
+                vel, duration = vel[0], duration[0]
+                dist = np.linalg.norm(target - pos)
+                direction = (target - pos) / max(dist, 1e-12)
+                # switch early to cover the latency, unless we stop here
+                if self.table["dwell"][i] > 0:
+                    lead = 0.0
+                else:
+                    lead = self.lookahead * np.linalg.norm(vel)
+                limit = timeout
+                if limit is None:
+                    limit = 5 * duration + 10
+                deadline = time.monotonic() + limit
+                self._command(vel)
+                while True:
+                    remaining = np.dot(target - pos, direction)
+                    if remaining <= lead:
+                        break
+                    if time.monotonic() > deadline:
+                        self.motor.logger.warning(
+                            f"Waypoint {i} not reached in {limit:.1f} s."
+                        )
+                        break
+                    sample = self._wait_sample()
+                    if sample is None:
+                        continue
+                    t, pos = sample
+                    if last_pos is not None:
+                        path += np.linalg.norm(pos - last_pos)
+                    last_pos = pos
+                arrival_error[i] = np.linalg.norm(target - pos)
+                arrival_time[i] = t - t0
+                if self.table["dwell"][i] > 0:
+                    self.motor.stop()
+                    t_dwell = t
+                    while t - t_dwell < self.table["dwell"][i]:
+                        sample = self._wait_sample()
+                        if sample is not None:
+                            t, pos = sample
+        finally:
+            self.motor.stop()
+        duration = (t - t0) if t0 is not None else 0.0
+        return {
+            "arrival_error": arrival_error,
+            "arrival_time": arrival_time,
+            "duration": duration,
+            "planned_duration": float(self.table["t"][-1]) if n else 0.0,
+            "path_length": path,
+        }
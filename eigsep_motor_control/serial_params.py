@@ -1,2 +1,5 @@
 BAUDRATE = 115200
-INT_LEN = 100
+SAMPLE_RATE = 1000  # ADC samples per second on the Pico
+INT_LEN = 100  # default number of samples in the boxcar average
+MAX_INT_LEN = 1000  # size of the boxcar buffer on the Pico
+EMIT_RATE = 50  # default frames per second sent by the Pico
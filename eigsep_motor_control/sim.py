@@ -0,0 +1,150 @@
+"""
+Discrete-time simulation of the motors and pots on a virtual clock. The
+simulation is deterministic and runs as fast as the host allows, so hours
+of ``scripts/run.py --safe'' can be replayed in seconds.
+
+"""
+
+import logging
+from eigsep_motor_control.clock import VirtualClock
+from eigsep_motor_control.controller import Controller
+from eigsep_motor_control.motor import DummyMotor
+from eigsep_motor_control.potentiometer import DummyPotentiometer
+
+
+class Simulator:
+    def __init__(self, motor, pot, dt=0.01):
+        """
+        Step a DummyMotor and a DummyPotentiometer sharing a virtual clock.
+        Pot samples are published to the pot subscribers at the pot emit
+        rate. Sleeping on the clock (e.g., in ``reverse_limit'') steps the
+        simulation through the sleep.
+
+        Parameters
+        ----------
+        motor : emc.DummyMotor
+            The motors, created with a ``VirtualClock''.
+        pot : emc.DummyPotentiometer
+            The pots, on the same clock as the motors.
+        dt : float
+            Time step in seconds.
+
+        """
+        if not motor.clock.virtual or pot.clock is not motor.clock:
+            raise ValueError(
+                "Motor and pot must share a virtual clock (emc.clock)."
+            )
+        self.motor = motor
+        self.pot = pot
+        self.clock = motor.clock
+        self.dt = dt
+        self.sample_interval = 1 / pot.emit_rate
+        self._next_sample = self.clock.time() + self.sample_interval
+        self.nsteps = 0
+        self.clock.on_sleep = self.advance
+
+    def step(self):
+        """Advance the clock by one time step and publish due samples."""
+        self.clock.advance(self.dt)
+        self.nsteps += 1
+        self.motor.step(self.dt)
+        self.pot.step(self.dt)
+        # small tolerance against the rounding of the accumulated time
+        if self.clock.time() >= self._next_sample - 1e-9:
+            self._next_sample += self.sample_interval
+            self.pot.emit()
+
+    def advance(self, seconds):
+        """Step the simulation for ``seconds''."""
+        end = self.clock.time() + seconds - 1e-9
+        while self.clock.time() < end:
+            self.step()
+
+    def run(self, duration, controller=None):
+        """
+        Run the simulation, handling the events of a controller as they are
+        posted, as ``Controller.run'' does in real time.
+
+        Parameters
+        ----------
+        duration : float
+            Simulated time in seconds.
+        controller : emc.Controller, optional
+            Controller subscribed to the pot, using the virtual clock.
+
+        Returns
+        -------
+        bool
+            False if the controller exited (e.g., no motion in safe mode)
+            before ``duration'' passed.
+
+        """
+        end = self.clock.time() + duration - 1e-9
+        while self.clock.time() < end:
+            self.step()
+            if controller is None:
+                continue
+            while not controller.queue.empty():
+                if not controller.handle(*controller.get(timeout=0)):
+                    return False
+            if not controller._check_motion():
+                return False
+        return True
+
+
+def replay_run(
+    duration,
+    az_vel=250,
+    alt_vel=250,
+    safe=True,
+    dt=0.01,
+    logger=None,
+):
+    """
+    Replay ``scripts/run.py'' with dummy motors and pots on a virtual
+    clock.
+
+    Parameters
+    ----------
+    duration : float
+        Simulated time in seconds.
+    az_vel : float
+        Azimuth motor velocity.
+    alt_vel : float
+        Altitude motor velocity.
+    safe : bool
+        Run the controller in safe mode (``--safe'').
+    dt : float
+        Time step of the simulation in seconds.
+    logger : logging.Logger
+        Logger of the motor and controller.
+
+    Returns
+    -------
+    result : dict
+        ``completed'' (False if the controller exited early), ``time''
+        (simulated seconds), ``steps'', ``reversals'' (number per motor),
+        ``positions'' (final motor positions) and ``volts'' (final pot
+        voltages).
+
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    clock = VirtualClock()
+    motor = DummyMotor(logger=logger, clock=clock)
+    pot = DummyPotentiometer(motor)
+    sim = Simulator(motor, pot, dt=dt)
+    names = [n for n, v in zip(["az", "alt"], [az_vel, alt_vel]) if v]
+    controller = Controller(motor, pot, motors=names, safe=safe, logger=logger)
+    pot.subscribe(controller.on_sample)
+    motor.set_velocity(az_vel, alt_vel)
+    completed = sim.run(duration, controller=controller)
+    motor.stop()
+    return {
+        "completed": completed,
+        "time": clock.time(),
+        "steps": sim.nsteps,
+        "reversals": {m: len(v) for m, v in controller.latencies.items()},
+        "positions": dict(motor.simulated_positions),
+        "volts": pot.last_volts(),
+    }
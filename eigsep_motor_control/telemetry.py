@@ -0,0 +1,258 @@
+"""
+Binary telemetry of long runs. Pot samples, commanded velocities, limit
+switch events and reversals are stored as fixed-size records (see
+``RECORD_DTYPE'') after a small header, so a file can be memory-mapped and
+read as a NumPy structured array without parsing.
+
+"""
+
+from pathlib import Path
+import queue
+import threading
+import time
+import numpy as np
+
+from eigsep_motor_control.potentiometer import MOTOR_INDEX
+
+MAGIC = b"EMCTLM01"
+HEADER_SIZE = 64
+# record kinds
+SAMPLE = 0  # values: pot voltages (az, alt)
+VELOCITY = 1  # values: commanded velocities (az, alt)
+LIMIT = 2  # limit switch event of ``motor'', values: (1 set / 0 clear, 0)
+REVERSAL = 3  # reversal of ``motor'', values: (latency in s, new velocity)
+KINDS = {"sample": SAMPLE, "velocity": VELOCITY, "limit": LIMIT,
+         "reversal": REVERSAL}
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("t", "<f8"),  # unix time in seconds
+        ("kind", "u1"),
+        ("motor", "i1"),  # index in MOTOR_INDEX, -1 for both/none
+        ("values", "<f8", (2,)),
+    ]
+)
+
+
+def _header():
+    header = MAGIC + np.uint32(RECORD_DTYPE.itemsize).tobytes()
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def read(path):
+    """
+    Memory-map a telemetry file.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        The file.
+
+    Returns
+    -------
+    records : np.memmap
+        Structured array with dtype ``RECORD_DTYPE'', read-only.
+
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if header[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a telemetry file.")
+    size = Path(path).stat().st_size - HEADER_SIZE
+    n = size // RECORD_DTYPE.itemsize  # ignore a partially written record
+    if n == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(
+        path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n,)
+    )
+
+
+def files(directory, prefix="telemetry"):
+    """Telemetry files in ``directory'' in the order they were written."""
+    return sorted(Path(directory).glob(f"{prefix}_*.bin"))
+
+
+def read_all(directory, prefix="telemetry", kind=None):
+    """
+    Read all telemetry files of a directory into one array.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory of the files.
+    prefix : str
+        Prefix of the file names.
+    kind : str, optional
+        Only return records of this kind ('sample', 'velocity', 'limit',
+        or 'reversal').
+
+    Returns
+    -------
+    records : np.ndarray
+        Structured array with dtype ``RECORD_DTYPE''.
+
+    """
+    parts = [read(p) for p in files(directory, prefix=prefix)]
+    if kind is not None:
+        parts = [p[p["kind"] == KINDS[kind]] for p in parts]
+    if not parts:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.concatenate(parts)
+
+
+class TelemetryRecorder:
+    def __init__(
+        self,
+        directory,
+        prefix="telemetry",
+        max_bytes=64 * 2**20,
+        flush_interval=1.0,
+        clock=time.monotonic,
+    ):
+        """
+        Append telemetry records to rotating files from a writer thread.
+        The record methods only put a tuple on a queue, so they are cheap
+        to call from the acquisition and control threads.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            Directory of the files, created if needed.
+        prefix : str
+            Files are named ``<prefix>_<start time>_<index>.bin''.
+        max_bytes : int
+            A new file is started when the current one exceeds this size.
+        flush_interval : float
+            Maximum time in seconds records are buffered before being
+            written.
+        clock : callable
+            Clock of the timestamps passed to the record methods (the pot
+            sample timestamps). They are stored as unix time.
+
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.offset = time.time() - clock()  # clock -> unix time
+        self.stamp = time.strftime("%Y%m%dT%H%M%S")
+        self.index = 0
+        self.path = None
+        self._file = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self.nrecords = 0
+
+    def record(self, kind, motor=-1, values=(0.0, 0.0), t=None):
+        """
+        Queue a record.
+
+        Parameters
+        ----------
+        kind : int
+            Record kind, e.g., ``SAMPLE''.
+        motor : str or int
+            Motor name ('az' or 'alt') or index; -1 for none.
+        values : tuple
+            The two values of the record.
+        t : float, optional
+            Timestamp on ``clock''. Defaults to now.
+
+        """
+        if t is None:
+            t = self.clock()
+        if isinstance(motor, str):
+            motor = MOTOR_INDEX[motor]
+        self._queue.put((t + self.offset, kind, motor, tuple(values)))
+
+    def sample(self, t, v):
+        """Record pot voltages; a subscriber for the acquisition thread."""
+        self._queue.put((t + self.offset, SAMPLE, -1, (v[0], v[1])))
+
+    def velocity(self, az_vel, alt_vel, t=None):
+        self.record(VELOCITY, values=(az_vel, alt_vel), t=t)
+
+    def limit(self, motor, state, t=None):
+        self.record(LIMIT, motor=motor, values=(float(state), 0.0), t=t)
+
+    def reversal(self, motor, latency, velocity, t=None):
+        self.record(REVERSAL, motor=motor, values=(latency, velocity), t=t)
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        name = f"{self.prefix}_{self.stamp}_{self.index:05d}.bin"
+        self.path = self.directory / name
+        self.index += 1
+        self._file = open(self.path, "wb")
+        self._file.write(_header())
+        self._size = HEADER_SIZE
+
+    def _write(self, rows):
+        data = np.array(rows, dtype=RECORD_DTYPE).tobytes()
+        per_file = max(self.max_bytes - HEADER_SIZE, RECORD_DTYPE.itemsize)
+        per_file -= per_file % RECORD_DTYPE.itemsize
+        while data:
+            space = self.max_bytes - self._size
+            if space < RECORD_DTYPE.itemsize and self._size > HEADER_SIZE:
+                self._open()
+                space = per_file
+            n = max(space - space % RECORD_DTYPE.itemsize, 0) or per_file
+            self._file.write(data[:n])
+            self._size += len(data[:n])
+            data = data[n:]
+        self.nrecords += len(rows)
+
+    def _drain(self, block):
+        """Get all queued records, waiting for the first if ``block''."""
+        rows = []
+        try:
+            if block:
+                rows.append(self._queue.get(timeout=self.flush_interval))
+            while True:
+                rows.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def _run(self):
+        while True:
+            rows = self._drain(block=True)
+            stop = None in rows
+            rows = [r for r in rows if r is not None]
+            if rows:
+                self._write(rows)
+                self._file.flush()
+            if stop:
+                return
+
+    def start(self):
+        """Open the first file and start the writer thread."""
+        if self._thread is not None:
+            return
+        self._open()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write all queued records and close the file."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        # records queued after the stop marker
+        rows = [r for r in self._drain(block=False) if r is not None]
+        if rows:
+            self._write(rows)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,210 @@
+"""
+Optional latency tracing of motor reversals through the pipeline
+
+    frame -> trigger -> post -> wake -> reverse -> write
+
+where ``frame'' is the timestamp of the pot sample (after the frames are
+read and decoded), ``trigger'' is when ``_trigger_reverse'' fired in the
+controller subscriber, ``post'' is when the event was queued, ``wake'' is
+when the control loop picked it up, ``reverse'' is the call of
+``Motor.reverse'', and ``write'' is when it returned, i.e., the driver
+write completed.
+
+Tracing is off unless ``enable'' is called. Instrumented code checks the
+module attribute ``tracer'' and does nothing else while it is None.
+
+"""
+
+from collections import OrderedDict
+import json
+import threading
+import time
+import numpy as np
+
+STAGES = ("frame", "trigger", "post", "wake", "reverse", "write")
+# histogram bin edges in seconds, 10 bins per decade from 1 us to 100 s
+EDGES = np.logspace(-6, 2, 81)
+
+tracer = None  # the active Tracer, None when tracing is disabled
+
+
+class Tracer:
+    def __init__(self, clock=None, edges=EDGES, max_inflight=1000):
+        """
+        Collect stage timestamps of each traced reversal and histograms of
+        the latency between consecutive stages.
+
+        Parameters
+        ----------
+        clock : callable
+            Returns the current time in seconds, on the clock of the pot
+            sample timestamps. Defaults to ``time.monotonic''.
+        edges : array_like
+            Bin edges of the latency histograms in seconds.
+        max_inflight : int
+            Maximum number of unfinished traces kept; the oldest are
+            dropped first.
+
+        """
+        self.clock = time.monotonic if clock is None else clock
+        self.edges = np.asarray(edges, dtype=float)
+        self.max_inflight = max_inflight
+        self.lock = threading.Lock()
+        self.inflight = OrderedDict()
+        names = [f"{a}->{b}" for a, b in zip(STAGES[:-1], STAGES[1:])]
+        names.append(f"{STAGES[0]}->{STAGES[-1]}")
+        nbins = len(self.edges) + 1  # under- and overflow bins
+        self.counts = {n: np.zeros(nbins, dtype=np.int64) for n in names}
+        self.sums = dict.fromkeys(names, 0.0)
+        self.maxima = dict.fromkeys(names, 0.0)
+        self.completed = 0
+        self.dropped = 0
+        self._export_stop = threading.Event()
+        self._export_thread = None
+
+    def stamp(self, key, stage, t=None):
+        """
+        Record the time a trace reached a stage. The trace is complete and
+        added to the histograms at the last stage.
+
+        Parameters
+        ----------
+        key : hashable
+            Identifies the trace, e.g., (motor, pot sample timestamp).
+        stage : str
+            One of ``STAGES''.
+        t : float, optional
+            Time of the stage. Defaults to now.
+
+        """
+        if t is None:
+            t = self.clock()
+        with self.lock:
+            trace = self.inflight.get(key)
+            if trace is None:
+                trace = self.inflight[key] = {}
+                if len(self.inflight) > self.max_inflight:
+                    self.inflight.popitem(last=False)
+                    self.dropped += 1
+            trace[stage] = t
+            if stage == STAGES[-1]:
+                del self.inflight[key]
+                self._add(trace)
+
+    def discard(self, key):
+        """Drop an unfinished trace, e.g., of a debounced reversal."""
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def _add(self, trace):
+        done = [s for s in STAGES if s in trace]
+        pairs = list(zip(done[:-1], done[1:]))
+        if done[0] == STAGES[0] and done[-1] == STAGES[-1]:
+            pairs.append((STAGES[0], STAGES[-1]))
+        for a, b in pairs:
+            name = f"{a}->{b}"
+            if name not in self.counts:  # skipped a stage
+                continue
+            dt = trace[b] - trace[a]
+            self.counts[name][np.searchsorted(self.edges, dt)] += 1
+            self.sums[name] += dt
+            self.maxima[name] = max(self.maxima[name], dt)
+        self.completed += 1
+
+    def _quantile(self, counts, q):
+        """Upper bin edge below which a fraction ``q'' of counts lie."""
+        cum = np.cumsum(counts)
+        i = int(np.searchsorted(cum, q * cum[-1]))
+        return float(self.edges[min(i, len(self.edges) - 1)])
+
+    def summary(self):
+        """
+        Latency statistics of each stage transition.
+
+        Returns
+        -------
+        summary : dict
+            Maps 'a->b' to ``count'', ``mean'', ``max'', and the
+            approximate (bin edge) ``p50'' and ``p99'' in seconds.
+
+        """
+        out = {}
+        with self.lock:
+            for name, counts in self.counts.items():
+                n = int(counts.sum())
+                if n == 0:
+                    continue
+                out[name] = {
+                    "count": n,
+                    "mean": self.sums[name] / n,
+                    "max": self.maxima[name],
+                    "p50": self._quantile(counts, 0.5),
+                    "p99": self._quantile(counts, 0.99),
+                }
+        return out
+
+    def export(self, path):
+        """
+        Write the histograms and the summary to a JSON file.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            Output file, overwritten.
+
+        """
+        with self.lock:
+            hist = {n: c.tolist() for n, c in self.counts.items()}
+            completed, dropped = self.completed, self.dropped
+        data = {
+            "stages": list(STAGES),
+            "edges": self.edges.tolist(),
+            "histograms": hist,
+            "summary": self.summary(),
+            "completed": completed,
+            "dropped": dropped,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    def start_export(self, path, interval=60.0):
+        """Export to ``path'' every ``interval'' seconds in a thread."""
+        self.stop_export()
+        self._export_stop.clear()
+
+        def loop():
+            while not self._export_stop.wait(interval):
+                self.export(path)
+
+        self._export_thread = threading.Thread(target=loop, daemon=True)
+        self._export_thread.start()
+
+    def stop_export(self):
+        self._export_stop.set()
+        if self._export_thread is not None:
+            self._export_thread.join()
+            self._export_thread = None
+
+
+def enable(**kwargs):
+    """
+    Start tracing with a new ``Tracer'' (see its arguments).
+
+    Returns
+    -------
+    Tracer
+        The active tracer.
+
+    """
+    global tracer
+    tracer = Tracer(**kwargs)
+    return tracer
+
+
+def disable():
+    """Stop tracing. Returns the tracer that was active, if any."""
+    global tracer
+    old, tracer = tracer, None
+    if old is not None:
+        old.stop_export()
+    return old
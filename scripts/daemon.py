@@ -0,0 +1,200 @@
+from argparse import ArgumentParser
+import logging
+import statistics
+import time
+import eigsep_motor_control as emc
+from eigsep_motor_control.daemon import SOCKET_PATH, Daemon
+
+start_time = time.time()
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+parser = ArgumentParser(
+    description="Own the motors and pots and serve commands from "
+    "run.py, stop.py, read_pot.py, and calibrate_pot.py."
+)
+parser.add_argument(
+    "-b",
+    "--board",
+    type=str,
+    default="pololu",
+    help="Motor board type: ``pololu'' (default), ``qwiic'', or ``dummy''",
+)
+parser.add_argument(
+    "--gpio",
+    type=str,
+    default="rpi",
+    help="GPIO backend of the pololu board: ``rpi'' (default), ``pigpio'' "
+    "(hardware PWM), or ``fake''",
+)
+parser.add_argument(
+    "-s",
+    "--safe",
+    action="store_true",
+    help="Handle limit switches and stop the motors if the pots show no "
+    "movement.",
+)
+parser.add_argument(
+    "-d",
+    "--dummy_pot",
+    action="store_true",
+    help="Dummy potentiometer mode for testing purposes.",
+)
+parser.add_argument(
+    "--int_len",
+    type=int,
+    default=None,
+    help="Number of ADC samples the Pico averages per pot reading.",
+)
+parser.add_argument(
+    "--rate",
+    type=int,
+    default=None,
+    help="Pot readings per second sent by the Pico.",
+)
+parser.add_argument(
+    "--port",
+    type=str,
+    default=emc.Potentiometer.PORT,
+    help="Serial port of the Pico (e.g. the port of the fake_pico emulator).",
+)
+parser.add_argument(
+    "--socket",
+    type=str,
+    default=SOCKET_PATH,
+    help="Path of the Unix socket to serve on.",
+)
+parser.add_argument(
+    "--trace",
+    type=str,
+    default=None,
+    help="Trace the latency of each reversal stage and write histograms to "
+    "this JSON file (every --trace_interval seconds and at exit).",
+)
+parser.add_argument(
+    "--trace_interval",
+    type=float,
+    default=60,
+    help="Seconds between exports of the trace histograms.",
+)
+parser.add_argument(
+    "--telemetry",
+    type=str,
+    default=None,
+    help="Record pot samples, velocities, limit switch events and reversals "
+    "to binary files in this directory.",
+)
+parser.add_argument(
+    "--telemetry_max_mb",
+    type=float,
+    default=64,
+    help="Size in MB at which a new telemetry file is started.",
+)
+parser.add_argument(
+    "--mounts",
+    action="store_true",
+    help="Drive the axes of all mounts of the ``mounts'' section of the "
+    "config at full speed between their pot limits with one controller, "
+    "without serving commands. Ignores the other options except --safe.",
+)
+args = parser.parse_args()
+
+if args.mounts:
+    from eigsep_motor_control.mount import (
+        CHANNELS,
+        Mount,
+        MultiController,
+        load_mounts,
+    )
+
+    mounts = [Mount.from_config(spec, logger=logger) for spec in load_mounts()]
+    controller = MultiController(mounts, safe=args.safe, logger=logger)
+    for m in mounts:
+        vel = [m.motor.MAX_SPEED if a in m.axes else 0 for a in CHANNELS]
+        m.motor.set_velocity(*vel)
+    try:
+        controller.run()
+    except KeyboardInterrupt:
+        print("\nExiting.")
+    finally:
+        controller.unbind()
+        for m in mounts:
+            m.pot.stop(timeout=1)
+            m.motor.stop()
+            m.motor.cleanup()
+        run_time = time.time() - start_time
+        print(f"Run Time: {run_time} seconds, {run_time/3600} hours.")
+        for (i, a), n in zip(controller.axes, controller.reversals):
+            print(f"{mounts[i].name} {a}: {n} reversals.")
+    raise SystemExit
+
+if args.trace:
+    from eigsep_motor_control import tracing
+
+    tracer = tracing.enable()
+    tracer.start_export(args.trace, interval=args.trace_interval)
+
+if args.board == "dummy":
+    motor = emc.DummyMotor(logger=logger)
+    args.dummy_pot = True
+elif args.board == "pololu":
+    motor = emc.PololuMotor(logger=logger, backend=args.gpio)
+elif args.board == "qwiic":
+    motor = emc.QwiicMotor(logger=logger)
+else:
+    raise ValueError("Invalid board, use ``pololu'', ``qwiic'' or ``dummy''.")
+
+if args.dummy_pot:
+    pot = emc.DummyPotentiometer(motor)
+else:
+    pot = emc.Potentiometer(port=args.port)
+    if args.rate is not None:
+        pot.set_emit_rate(args.rate)
+    if args.int_len is not None:
+        pot.set_integration_length(args.int_len)
+
+telemetry = None
+if args.telemetry:
+    from eigsep_motor_control.telemetry import TelemetryRecorder
+
+    telemetry = TelemetryRecorder(
+        args.telemetry, max_bytes=int(args.telemetry_max_mb * 2**20)
+    )
+    telemetry.start()
+
+daemon = Daemon(
+    motor,
+    pot,
+    path=args.socket,
+    safe=args.safe,
+    logger=logger,
+    telemetry=telemetry,
+)
+try:
+    daemon.serve_forever()  # until a client sends shutdown
+except KeyboardInterrupt:
+    print("\nExiting.")
+finally:
+    # stops the motors
+    daemon.close()
+    run_time = time.time() - start_time
+    print(f"Run Time: {run_time} seconds, {run_time/3600} hours.")
+    if args.trace:
+        tracing.disable()
+        tracer.export(args.trace)
+        for name, stats in tracer.summary().items():
+            print(
+                f"{name}: p50 < {stats['p50'] * 1e3:.2f} ms, "
+                f"max {stats['max'] * 1e3:.2f} ms ({stats['count']})"
+            )
+    for name, latency in daemon.controller.latencies.items():
+        if latency:
+            print(
+                f"{name} reversal latency: median "
+                f"{statistics.median(latency) * 1e3:.1f} ms over "
+                f"{len(latency)} reversals."
+            )
+    motor.cleanup()
+    if telemetry is not None:
+        telemetry.stop()
+        print(f"Wrote {telemetry.nrecords} telemetry records.")
@@ -1,4 +1,8 @@
+from array import array
 from machine import ADC, Pin
+import select
+import struct
+import sys
 import time
 
 led = Pin(25, Pin.OUT)
@@ -6,18 +10,117 @@ led = Pin(25, Pin.OUT)
 ADC_PIN1 = 27
 ADC_PIN2 = 28
 BAUDRATE = 115200
-INT_LEN = 100  # number of readings to average
-SLEEP = 0.01  # seconds between readings
+# must match eigsep_motor_control/serial_params.py
+SAMPLE_RATE = 1000  # ADC samples per second
+INT_LEN = 100  # default number of readings in the boxcar average
+MAX_INT_LEN = 1000
+EMIT_RATE = 50  # default frames per second
+
+# binary frame: sync word, "<ii" payload, CRC-8 (poly 0x07) of payload
+# (must match eigsep_motor_control/protocol.py)
+SYNC = b"\xa5\x5a"
+CRC_POLY = 0x07
+# commands from the host: "<cmd> <value>\n"
+CMD_INT_LEN = "I"
+CMD_EMIT_RATE = "R"
+
+
+def _crc8_table():
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ CRC_POLY) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[i] = crc
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def encode_frame(v1, v2):
+    payload = struct.pack("<ii", v1, v2)
+    crc = 0
+    for b in payload:
+        crc = CRC8_TABLE[crc ^ b]
+    return SYNC + payload + bytes((crc,))
+
 
 adc1 = ADC(Pin(ADC_PIN1))  # azimuth
 adc2 = ADC(Pin(ADC_PIN2))  # altitude
+out = sys.stdout.buffer
+poll = select.poll()
+poll.register(sys.stdin, select.POLLIN)
 
+# boxcar of the last int_len readings with running sums
+buf1 = array("I", [0] * MAX_INT_LEN)
+buf2 = array("I", [0] * MAX_INT_LEN)
+int_len = INT_LEN
+emit_period = 1_000_000 // EMIT_RATE  # us
+sample_period = 1_000_000 // SAMPLE_RATE  # us
+value1 = 0
+value2 = 0
+idx = 0
+count = 0  # number of valid readings in the boxcar
+cmd = ""
+
+
+def handle(line):
+    """Apply a command from the host."""
+    global int_len, emit_period, value1, value2, idx, count
+    try:
+        name, value = line.split()
+        value = int(value)
+    except ValueError:
+        return
+    if name == CMD_INT_LEN and 1 <= value <= MAX_INT_LEN:
+        int_len = value
+        # refill the boxcar before sending again
+        value1 = value2 = idx = count = 0
+        for i in range(int_len):
+            buf1[i] = 0
+            buf2[i] = 0
+    elif name == CMD_EMIT_RATE and 0 < value <= SAMPLE_RATE:
+        emit_period = 1_000_000 // value
+
+
+next_sample = time.ticks_us()
+next_emit = next_sample
+nframes = 0
 while True:
-    value1 = 0
-    value2 = 0
-    for cnt in range(INT_LEN):
-        value1 += adc1.read_u16()
-        value2 += adc2.read_u16()
-        time.sleep(SLEEP)
-    print(value1, value2)
-    led.toggle()
+    while poll.poll(0):
+        c = sys.stdin.read(1)
+        if c == "\n":
+            handle(cmd)
+            cmd = ""
+        else:
+            cmd += c
+
+    now = time.ticks_us()
+    if time.ticks_diff(next_sample, now) > 0:
+        continue
+    next_sample = time.ticks_add(next_sample, sample_period)
+
+    a1 = adc1.read_u16()
+    a2 = adc2.read_u16()
+    value1 += a1 - buf1[idx]
+    value2 += a2 - buf2[idx]
+    buf1[idx] = a1
+    buf2[idx] = a2
+    idx = (idx + 1) % int_len
+    if count < int_len:
+        count += 1
+        if count < int_len:
+            continue
+
+    if time.ticks_diff(now, next_emit) >= 0:
+        out.write(encode_frame(value1, value2))
+        next_emit = time.ticks_add(next_emit, emit_period)
+        if time.ticks_diff(now, next_emit) >= 0:  # fell behind
+            next_emit = time.ticks_add(now, emit_period)
+        nframes += 1
+        if nframes % EMIT_RATE == 0:
+            led.toggle()
@@ -1,9 +1,27 @@
 import time
-from eigsep_motor_control import Potentiometer
+from eigsep_motor_control.daemon import Client
 
-pot = Potentiometer()
+INTERVAL = 0.5  # seconds between printed readings
 
-while True:
-    v = pot.read_volts()
-    print(f"az: {v[0]:.3f}, alt: {v[1]:.3f}")
-    time.sleep(0.5)
+try:
+    client = Client()
+except ConnectionError:
+    client = None
+
+if client is None:
+    # no daemon owns the pots, read them directly
+    from eigsep_motor_control import Potentiometer
+
+    pot = Potentiometer()
+    while True:
+        v = pot.read_volts_batch()[-1]  # latest, skipping the backlog
+        print(f"az: {v[0]:.3f}, alt: {v[1]:.3f}")
+        time.sleep(INTERVAL)
+
+last = None
+with client:
+    for t, v in client.subscribe():
+        if last is not None and t - last < INTERVAL:
+            continue
+        last = t
+        print(f"az: {v[0]:.3f}, alt: {v[1]:.3f}")
@@ -0,0 +1,73 @@
+from argparse import ArgumentParser
+import yaml
+from eigsep_motor_control import replay
+
+parser = ArgumentParser(
+    description="Replay recorded telemetry through the limit logic."
+)
+parser.add_argument("directory", help="Directory of the telemetry files.")
+parser.add_argument(
+    "-p",
+    "--param",
+    action="append",
+    default=[],
+    help="Parameter values to sweep, e.g., ``size=5,9,17''. Any of "
+    f"{', '.join(replay.PARAMS[:3])}. May be repeated.",
+)
+parser.add_argument(
+    "--grid",
+    type=str,
+    default=None,
+    help="YAML file mapping parameter names to lists of values (use this "
+    "for VOLT_RANGE).",
+)
+parser.add_argument(
+    "--processes",
+    type=int,
+    default=None,
+    help="Worker processes of the sweep (default: number of CPUs).",
+)
+parser.add_argument(
+    "--motors",
+    nargs="+",
+    default=["az", "alt"],
+    help="Motors reversed at the pot limits.",
+)
+parser.add_argument(
+    "--unsafe",
+    action="store_true",
+    help="Do not run the limit switch logic.",
+)
+args = parser.parse_args()
+
+values = {}
+if args.grid:
+    with open(args.grid, "r") as f:
+        values.update(yaml.safe_load(f))
+for p in args.param:
+    name, vals = p.split("=")
+    values[name] = [float(v) for v in vals.split(",")]
+
+results = replay.sweep(
+    args.directory,
+    replay.grid(**values),
+    processes=args.processes,
+    motors=args.motors,
+    safe=not args.unsafe,
+)
+for params, r in results:
+    print(params or "defaults")
+    print(
+        f"  {r['samples']} samples, {r['duration']:.0f} s replayed in "
+        f"{r['elapsed']:.2f} s"
+    )
+    for m in args.motors:
+        line = f"  {m}: {r['reversals'][m]} reversals, {r['forced'][m]} forced"
+        if "recorded" in r:
+            lag = r["lag"][m]
+            lag = "n/a" if lag is None else f"{lag:+.2f} s"
+            line += (
+                f", recorded {r['recorded'][m]}, lag {lag}, missed "
+                f"{r['missed'][m]}, spurious {r['spurious'][m]}"
+            )
+        print(line)
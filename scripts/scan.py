@@ -0,0 +1,83 @@
+from argparse import ArgumentParser
+import logging
+import numpy as np
+import eigsep_motor_control as emc
+from eigsep_motor_control import scan
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+parser = ArgumentParser(description="Run a scan schedule.")
+parser.add_argument(
+    "-b",
+    "--board",
+    type=str,
+    default="pololu",
+    help="Motor board to use: ``pololu'' (default) or ``qwiic''.",
+)
+parser.add_argument(
+    "pattern",
+    choices=["raster", "spiral", "points"],
+    help="Scan pattern.",
+)
+parser.add_argument(
+    "-n", type=int, default=5, help="Raster rows or spiral waypoints."
+)
+parser.add_argument(
+    "--turns", type=float, default=3, help="Number of spiral turns."
+)
+parser.add_argument(
+    "--points",
+    type=str,
+    default=None,
+    help="Text file with one ``az alt'' voltage pair per line.",
+)
+parser.add_argument(
+    "--dwell", type=float, default=0, help="Seconds to hold at each waypoint."
+)
+parser.add_argument(
+    "--port",
+    type=str,
+    default=emc.Potentiometer.PORT,
+    help="Serial port of the Pico (e.g. the port of the fake_pico emulator).",
+)
+args = parser.parse_args()
+
+config, volt_range = scan.load_scan_config()
+if args.pattern == "raster":
+    points = scan.raster(args.n, volt_range, margin=config["margin"])
+elif args.pattern == "spiral":
+    points = scan.spiral(
+        args.turns, args.n, volt_range, margin=config["margin"]
+    )
+else:
+    points = np.loadtxt(args.points, ndmin=2)
+# before touching the hardware
+scan.check_points(points, volt_range)
+
+if args.board == "pololu":
+    motor = emc.PololuMotor(logger=logger)
+elif args.board == "qwiic":
+    motor = emc.QwiicMotor(logger=logger)
+else:
+    raise ValueError("Invalid board, must be ``pololu'' or ``qwiic''.")
+pot = emc.Potentiometer(port=args.port)
+pot.attach_motor(motor)
+pot.start()
+
+gain = config["gain"]
+max_vel = [abs(gain[m]) * motor.MAX_SPEED for m in ["az", "alt"]]
+table = scan.plan(points, max_vel, dwell=args.dwell, start=pot.last_volts())
+logger.info(
+    f"{len(table)} waypoints, planned duration {table['t'][-1]:.1f} s."
+)
+try:
+    report = scan.ScanExecutor(motor, pot, table).run()
+    logger.info(
+        f"Scan took {report['duration']:.1f} s, path length "
+        f"{report['path_length']:.3f} V, max arrival error "
+        f"{np.max(report['arrival_error']):.4f} V."
+    )
+finally:
+    pot.stop(timeout=1)
+    motor.cleanup()
@@ -1,4 +1,14 @@
-from eigsep_motor_control import PololuMotor
+from eigsep_motor_control.daemon import Client
 
-motor = PololuMotor()
-motor.stop(motors=["az", "alt"])
+TIMEOUT = 5  # seconds to wait for the daemon
+
+try:
+    with Client(timeout=TIMEOUT) as client:
+        client.stop()
+except (ConnectionError, TimeoutError, OSError):
+    # no daemon owns the hardware or it does not answer, stop the motors
+    # directly
+    from eigsep_motor_control import PololuMotor
+
+    motor = PololuMotor()
+    motor.stop(motors=["az", "alt"])
@@ -0,0 +1,80 @@
+"""Stand-ins for the motors and pots shared by the tests."""
+
+import logging
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+
+
+class FakeMotor(emc.motor.Motor):
+    """Motors without a driver, recording the reversals."""
+
+    def __init__(self, max_speed=480):
+        super().__init__(logger=logging.getLogger(__name__))
+        self.MIN_SPEED = -max_speed
+        self.MAX_SPEED = max_speed
+        self.reversals = []  # (motor, time.monotonic())
+
+    def set_velocity(self, az_vel, alt_vel):
+        self.velocities = {"az": az_vel, "alt": alt_vel}
+
+    def reverse(self, motor, force=False):
+        self.reversals.append((motor, time.monotonic()))
+        super().reverse(motor, force=force)
+
+
+class FakePot:
+    """Pots with a settable direction, reversing at VOLT_RANGE."""
+
+    VOLT_RANGE = {"az": [0.5, 2.5], "alt": [0.5, 2.5]}
+    GAIN = {"az": 1e-3, "alt": -1e-3}
+
+    def __init__(self):
+        self.direction = {"az": 1, "alt": 0}
+
+    def last_volts(self, motor=None):
+        return 1.0 if motor else np.ones(2)
+
+    def _trigger_reverse(self, motor, volt_reading):
+        vmin, vmax = self.VOLT_RANGE[motor]
+        d = self.direction[motor]
+        return (d > 0 and volt_reading >= vmax) or (
+            d < 0 and volt_reading <= vmin
+        )
+
+
+class SimPot:
+    """
+    Pots moving at GAIN V/s per unit of commanded speed, with the signs of
+    the ``gain'' section of config.yaml, and a first-order lag of ``tau''
+    seconds, sampled at 50 Hz on a simulated time.
+
+    """
+
+    DT = 0.02
+    GAIN = np.array([1e-3, -1e-3])  # V/s per unit speed of az, alt
+    VOLT_RANGE = {"az": [0.2, 3.0], "alt": [3.0, 0.2]}
+
+    def __init__(self, motor, volts, tau=0):
+        self.motor = motor
+        self.volts = np.array(volts, dtype=float)
+        self.vel = np.zeros(2)
+        self.tau = tau
+        self.t = 0.0
+
+    def start(self):
+        pass
+
+    def last_volts(self):
+        return self.volts.copy()
+
+    def wait_sample(self, timeout=None):
+        cmd = np.array([self.motor.velocities[m] for m in ["az", "alt"]])
+        if self.tau > 0:
+            self.vel += (self.GAIN * cmd - self.vel) * self.DT / self.tau
+        else:
+            self.vel = self.GAIN * cmd
+        self.volts += self.vel * self.DT
+        self.t += self.DT
+        return self.t, self.volts.copy()
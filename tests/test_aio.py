@@ -0,0 +1,117 @@
+import asyncio
+import fcntl
+import os
+import struct
+import termios
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import protocol
+from fakes import FakeMotor
+
+
+class PipeSerial:
+    """Stand-in for serial.Serial backed by a non-blocking pipe."""
+
+    def __init__(self, **kwargs):
+        self.rfd, self.wfd = os.pipe()
+        os.set_blocking(self.rfd, False)
+
+    def write_frames(self, data):
+        frames = b"".join(protocol.encode_frame(v1, v2) for v1, v2 in data)
+        os.write(self.wfd, frames)
+
+    def fileno(self):
+        return self.rfd
+
+    @property
+    def in_waiting(self):
+        buf = fcntl.ioctl(self.rfd, termios.FIONREAD, b"\0\0\0\0")
+        return struct.unpack("i", buf)[0]
+
+    def read(self, size=1):
+        try:
+            return os.read(self.rfd, size)
+        except BlockingIOError:
+            return b""
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        os.close(self.rfd)
+        os.close(self.wfd)
+
+
+def _bits(volts):
+    res = 2**emc.Potentiometer.NBITS - 1
+    bits = np.round(np.asarray(volts) / emc.Potentiometer.VMAX * res)
+    return bits.astype(int) * emc.serial_params.INT_LEN
+
+
+@pytest.fixture
+def pot(monkeypatch):
+    ser = PipeSerial()
+    monkeypatch.setattr(emc.potentiometer.serial, "Serial", lambda **kw: ser)
+    monkeypatch.setattr(emc.Potentiometer, "DIRECTION_WINDOW", 0.08)
+    ser.write_frames(_bits([[1.0, 1.0]] * 5))
+    yield emc.Potentiometer()
+    ser.close()
+
+
+def test_samples(pot):
+    volts = np.linspace(1.0, 2.0, 10)[:, None] * np.ones(2)
+
+    async def main():
+        apot = emc.AsyncPotentiometer(pot, bulk=False)
+        reader = asyncio.create_task(apot.run())
+        received = []
+        loop = asyncio.get_running_loop()
+        loop.call_soon(pot.ser.write_frames, _bits(volts))
+        async for t, v in apot.samples(maxsize=0):
+            received.append(v)
+            if len(received) == len(volts):
+                break
+        reader.cancel()
+        return received
+
+    received = asyncio.run(asyncio.wait_for(main(), 5))
+    assert np.allclose(received, volts, atol=1e-4)
+    assert pot.direction == {"az": 1, "alt": 1}
+
+
+def test_acquisition_running(pot):
+    pot.start()
+
+    async def main():
+        await emc.AsyncPotentiometer(pot).run()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+    pot.stop(timeout=1)
+
+
+def test_supervise(pot):
+    motor = FakeMotor()
+    motor.set_velocity(100, 0)
+    vmax = pot.VOLT_RANGE["az"][1]
+    volts = np.linspace(vmax - 0.2, vmax + 0.1, 6)[:, None] * [1, 0]
+
+    async def main():
+        apot = emc.AsyncPotentiometer(pot)
+        reader = asyncio.create_task(apot.run())
+        supervisor = asyncio.create_task(
+            emc.aio.supervise(motor, apot, motors=["az"], stall_timeout=0.2)
+        )
+        await asyncio.sleep(0)
+        for v in volts:
+            pot.ser.write_frames(_bits([v]))
+            await asyncio.sleep(0.01)
+        # pot stops moving, the supervisor stops the motors
+        await supervisor
+        reader.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert motor.last_reversal_time["az"] > 0
+    assert motor.velocities == {"az": 0, "alt": 0}
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from eigsep_motor_control.calibration import Calibrator, fit_sweep
+from eigsep_motor_control.clock import VirtualClock
+from eigsep_motor_control.motor import MAX_SPEED
+from eigsep_motor_control.replay import ReplayPotentiometer
+from fakes import FakeMotor
+
+RATE = 20
+LIMITS = {"az": (0.6, 1.4), "alt": (1.9, 2.5)}
+GAIN = {"az": 1e-3, "alt": -2e-3}  # pot V/s per unit of speed
+
+
+def calibrate(
+    motors=("az", "alt"), stuck=(), duration=120, seed=0, max_speed=480
+):
+    """Calibrate pots stopping at hard limits, fed one sample at a time."""
+    rng = np.random.default_rng(seed)
+    clock = VirtualClock()
+    mount = FakeMotor(max_speed=max_speed)
+    pot = ReplayPotentiometer(clock, RATE)
+    pot.attach_motor(mount)
+    cal = Calibrator(mount, pot, motors=motors)
+    pot.subscribe(cal.update)
+    pos = {"az": 1.0, "alt": 2.2}
+    cal.begin(0.0)
+    for _ in range(int(duration * RATE)):
+        clock.advance(1 / RATE)
+        for m, (lo, hi) in LIMITS.items():
+            if m in stuck:
+                continue
+            pos[m] += mount.velocities[m] * GAIN[m] / RATE
+            pos[m] = min(max(pos[m], lo), hi)
+        v = np.array([pos["az"], pos["alt"]]) + rng.normal(0, 1e-4, 2)
+        pot.feed(clock.time(), v)
+        if cal.done.is_set():
+            break
+    return cal
+
+
+@pytest.mark.parametrize("board", ["pololu", "qwiic"])
+def test_concurrent(board):
+    speed = MAX_SPEED[board]
+    cal = calibrate(max_speed=speed)
+    assert cal.done.is_set()
+    res = cal.results()
+    for m, (lo, hi) in LIMITS.items():
+        assert res[m].vmin == pytest.approx(lo, abs=1e-3)
+        assert res[m].vmax == pytest.approx(hi, abs=1e-3)
+        fwd, rev = res[m].slope
+        assert fwd == pytest.approx(speed * abs(GAIN[m]), rel=0.05)
+        assert rev == pytest.approx(-speed * abs(GAIN[m]), rel=0.05)
+        assert min(res[m].r2) > 0.99
+        assert res[m].gain == pytest.approx(GAIN[m], rel=0.05)
+    # both axes are swept at once, so the calibration takes about as long
+    # as the slowest axis
+    slowest = max(
+        (1.0 - 0.6 + 0.8) / (speed * abs(GAIN["az"])),
+        (2.5 - 2.2 + 0.6) / (speed * abs(GAIN["alt"])),
+    )
+    assert cal.times[-1] < slowest + 2
+
+
+def test_stuck():
+    cal = calibrate(stuck=["alt"], duration=60)
+    assert cal.axes["alt"].error == "no movement"
+    assert cal.axes["az"].done
+    with pytest.raises(RuntimeError):
+        cal.results()
+
+
+def test_fit_sweep():
+    t = np.arange(10.0)
+    slope, rms, r2 = fit_sweep(t, 0.5 * t + 1)
+    assert slope == pytest.approx(0.5)
+    assert rms == pytest.approx(0, abs=1e-12)
+    assert r2 == pytest.approx(1)
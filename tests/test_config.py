@@ -0,0 +1,110 @@
+import gc
+import logging
+import pytest
+import yaml
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import config
+from eigsep_motor_control.clock import VirtualClock
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    """A copy of the default config, selected by the environment."""
+    path = tmp_path / "config.yaml"
+    path.write_text(config.DEFAULT_PATH.read_text())
+    monkeypatch.setenv(config.ENV_VAR, str(path))
+    return path
+
+
+def test_resolution(tmp_path, monkeypatch):
+    monkeypatch.delenv(config.ENV_VAR, raising=False)
+    user = tmp_path / "user" / "config.yaml"
+    monkeypatch.setattr(config, "USER_PATH", user)
+    assert config.config_path() == config.DEFAULT_PATH
+    assert config.user_path() == user
+    saved = config.save(config.load())
+    assert saved == user
+    assert config.config_path() == user
+    monkeypatch.setenv(config.ENV_VAR, str(tmp_path / "env.yaml"))
+    assert config.config_path() == tmp_path / "env.yaml"
+
+
+def test_cached(cfg, monkeypatch):
+    calls = []
+    safe_load = yaml.safe_load
+
+    def counting(f):
+        calls.append(f)
+        return safe_load(f)
+
+    monkeypatch.setattr(yaml, "safe_load", counting)
+    a = config.load(reload=True)
+    a["volt_range"]["az"] = [0.0, 0.1]  # copies, the cache is unchanged
+    b = config.load()
+    assert len(calls) == 1
+    assert b["volt_range"]["az"] != [0.0, 0.1]
+    b["volt_range"]["az"] = [0.6, 1.2]
+    config.save(b)
+    assert config.load()["volt_range"]["az"] == [0.6, 1.2]
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [
+        ("volt_range", {"az": [0.5, 1.0]}),
+        ("volt_range", {"az": [0.5, 4.0], "alt": [1, 2]}),
+        ("volt_range", {"az": [1.0, 1.0], "alt": [1, 2]}),
+        ("kalman", {"q": -1}),
+        ("stow", {"az": 5.0}),
+        ("gain", {"az": "fast"}),
+        ("gain", {"el": 1e-3}),
+    ],
+)
+def test_validate(cfg, key, value):
+    c = config.load()
+    c[key] = value
+    with pytest.raises(ValueError):
+        config.validate(c)
+    with pytest.raises(ValueError):
+        config.save(c)
+
+
+def test_zero_gain(cfg):
+    c = config.load()
+    c["gain"] = {"az": 0, "alt": -2e-3}
+    config.save(c)
+    goto, _ = emc.motion.load_motion_config()
+    assert goto["az"]["polarity"] == 1
+    assert goto["az"]["kp"] == emc.motion.BANDWIDTH / config.DEFAULT_GAIN
+    assert goto["alt"]["polarity"] == -1
+    assert goto["alt"]["kp"] == emc.motion.BANDWIDTH / 2e-3
+
+
+def test_watch(cfg):
+    motor = emc.DummyMotor(
+        logger=logging.getLogger(__name__), clock=VirtualClock()
+    )
+    pot = emc.DummyPotentiometer(motor)
+    watcher = config.ConfigWatcher()
+    watcher.subscribe(pot.apply_config)
+    assert not watcher.check()
+    c = config.load()
+    c["dummy_volt_range"]["az"] = [0.4, 2.0]
+    c["predictive"]["az"]["lead_time"] = 0.5
+    config.save(c)
+    assert watcher.check()
+    assert pot.VOLT_RANGE["az"] == [0.4, 2.0]
+    assert pot.predictor.lead_time["az"] == 0.5
+    # an invalid file is ignored
+    cfg.write_text("volt_range: 1\n")
+    assert not watcher.check()
+    assert pot.VOLT_RANGE["az"] == [0.4, 2.0]
+    # subscribers do not keep the pots alive
+    del pot
+    gc.collect()
+    c["dummy_volt_range"]["az"] = [0.5, 2.0]
+    config.save(c)
+    assert watcher.check()
+    assert watcher._subscribers == []
@@ -0,0 +1,84 @@
+import threading
+import time
+import numpy as np
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.clock import VirtualClock
+from fakes import FakeMotor, FakePot
+
+
+def test_reverse_on_limit():
+    motor = FakeMotor()
+    motor.set_velocity(100, 0)
+    ctrl = emc.Controller(motor, FakePot(), motors=["az"])
+    thd = threading.Thread(target=ctrl.run, daemon=True)
+    thd.start()
+    ctrl.on_sample(time.monotonic(), np.array([1.0, 1.0]))
+    t = time.monotonic()
+    ctrl.on_sample(t, np.array([2.6, 1.0]))
+    # repeated crossings before the pot direction updates are debounced
+    ctrl.on_sample(time.monotonic(), np.array([2.7, 1.0]))
+    ctrl.stop()
+    thd.join(timeout=5)
+    assert not thd.is_alive()
+    assert len(motor.reversals) == 1
+    assert motor.reversals[0][0] == "az"
+    assert motor.reversals[0][1] >= t
+    assert motor.velocities == {"az": -100, "alt": 0}
+    assert len(ctrl.latencies["az"]) == 1
+
+
+def test_stall():
+    motor = FakeMotor()
+    pot = FakePot()
+    pot.direction = {"az": 0, "alt": 0}
+    ctrl = emc.Controller(motor, pot, safe=True, stall_timeout=0.05)
+    t0 = time.monotonic()
+    ctrl.run()
+    assert 0.04 < time.monotonic() - t0 < 5
+
+
+def test_limit_switch_release():
+    motor = FakeMotor()
+    motor.set_velocity(100, 0)
+    pot = FakePot()
+    pot.direction = {"az": -1, "alt": 0}  # against the command
+    clock = VirtualClock()
+    ctrl = emc.Controller(motor, pot, motors=[], safe=True, clock=clock)
+    ctrl.handle("sample")
+    assert ctrl.limits[0].is_set()
+    # released, the motor is reversed without blocking the control loop
+    pot.direction["az"] = 0
+    t0 = time.monotonic()
+    assert ctrl.handle("sample")
+    assert time.monotonic() - t0 < 0.1
+    assert motor.velocities["az"] == -100
+    assert ctrl.switches.waiting
+    clock.advance(0.5)
+    pot.direction["az"] = 1  # the pot has not turned yet
+    ctrl.handle("sample")
+    assert ctrl.limits[0].is_set()
+    clock.advance(0.5)
+    pot.direction["az"] = -1
+    ctrl.handle("sample")
+    assert not ctrl.limits[0].is_set()
+    assert not ctrl.switches.waiting
+    assert len(motor.reversals) == 1
+
+
+def test_event_order():
+    motor = FakeMotor()
+    motor.set_velocity(100, 0)
+    ctrl = emc.Controller(motor, FakePot(), motors=["az"], safe=True)
+    for t in range(5):
+        ctrl.on_sample(float(t), np.array([1.0, 1.0]))
+    ctrl.on_sample(5.0, np.array([2.6, 1.0]))
+    ctrl.stop()
+    # the reversal overtakes the pending sample, which is posted once
+    assert ctrl.get(timeout=0) == ("reverse", "az", 5.0)
+    assert ctrl.get(timeout=0) == ("stop", None, None)
+    assert ctrl.get(timeout=0)[0] == "sample"
+    assert ctrl.queue.empty()
+    # the sample event is handled with the latest timestamp
+    assert ctrl._sample_t == 5.0
+    assert ctrl._sample_pending.is_set()
@@ -0,0 +1,106 @@
+import logging
+import os
+import threading
+import time
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.daemon import Client, Daemon
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    motor = emc.DummyMotor(logger=logger)
+    pot = emc.DummyPotentiometer(motor)
+    pot.emit_rate = 50
+    d = Daemon(motor, pot, path=tmp_path / "emc.sock")
+    thd = threading.Thread(target=d.serve_forever, daemon=True)
+    thd.start()
+    yield d
+    d.shutdown()
+    thd.join(timeout=5)
+    motor.stop_updates()
+    assert not thd.is_alive()
+
+
+def test_commands(daemon):
+    with Client(daemon.path, timeout=5) as c:
+        assert c.set_velocity(az=100) == {"az": 100, "alt": 0}
+        assert daemon.motor.velocities == {"az": 100, "alt": 0}
+        status = c.status()
+        assert status["velocities"] == {"az": 100, "alt": 0}
+        assert len(status["volts"]) == 2
+        assert status["busy"] is None
+        assert status["max_speed"] == emc.motor.MAX_SPEED["dummy"]
+        assert c.stop(motors=["az"]) == {"az": 0, "alt": 0}
+        # errors are raised by the client and the connection stays usable
+        with pytest.raises(ValueError):
+            c.call("spin")
+        with pytest.raises(TypeError):
+            c.call("status", x=1)
+        with pytest.raises(ValueError):
+            c.calibrate(["el"])
+        assert c.status()["velocities"] == {"az": 0, "alt": 0}
+    # several clients at once
+    with Client(daemon.path) as a, Client(daemon.path) as b:
+        a.set_velocity(alt=-50)
+        assert b.status()["velocities"]["alt"] == -50
+
+
+def test_subscribe(daemon):
+    assert os.stat(daemon.path).st_mode & 0o777 == 0o660
+    with Client(daemon.path, timeout=5) as c:
+        with pytest.raises(ValueError):
+            next(c.subscribe(every=0))
+        assert c.status()["busy"] is None
+    with Client(daemon.path, timeout=5) as c:
+        samples = c.subscribe()
+        t = [next(samples)[0] for _ in range(3)]
+        assert t == sorted(t)
+        assert len(next(samples)[1]) == 2
+    # the daemon drops the subscriber when the client is gone
+    with Client(daemon.path, timeout=5) as c:
+        c.set_velocity(az=10)
+
+
+def test_single_daemon(daemon, tmp_path):
+    with pytest.raises(RuntimeError):
+        Daemon(daemon.motor, daemon.pot, path=daemon.path)
+    with pytest.raises(ConnectionError):
+        Client(tmp_path / "none.sock")
+
+
+def test_shutdown(tmp_path):
+    motor = emc.DummyMotor(logger=logger)
+    pot = emc.DummyPotentiometer(motor)
+    pot.emit_rate = 50
+    path = tmp_path / "emc.sock"
+    d = Daemon(motor, pot, path=path)
+    thd = threading.Thread(target=d.serve_forever, daemon=True)
+    thd.start()
+    with Client(path, timeout=5) as c:
+        c.set_velocity(az=100, alt=100)
+        c.shutdown()
+    thd.join(timeout=5)
+    motor.stop_updates()
+    assert not thd.is_alive()
+    assert not os.path.exists(path)
+    assert motor.velocities == {"az": 0, "alt": 0}
+
+
+def test_control_error(daemon):
+    def fail():
+        raise RuntimeError("broken")
+
+    with Client(daemon.path, timeout=5) as c:
+        c.set_velocity(az=100, alt=100)
+        daemon.controller.run = fail
+        daemon.controller.stop()  # make the running loop return
+        deadline = time.monotonic() + 5
+        while c.status()["error"] is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        status = c.status()
+        assert status["error"] == "RuntimeError: broken"
+        assert status["velocities"] == {"az": 0, "alt": 0}
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from eigsep_motor_control.estimator import KalmanEstimator
+
+DT = 0.02
+SIGMA = 1e-3  # V
+
+
+def _track(est, z, u=None):
+    d = []
+    for i, zi in enumerate(z):
+        ui = None if u is None else u[i]
+        est.update(zi, DT, u=ui)
+        d.append(est.direction())
+    return np.array(d)
+
+
+def test_stationary():
+    rng = np.random.default_rng(0)
+    z = 1.5 + SIGMA * rng.normal(size=(2000, 2))
+    est = KalmanEstimator(r=SIGMA**2)
+    d = _track(est, z)
+    # false detections are rare
+    assert np.mean(d[100:] != 0) < 0.01
+    assert np.allclose(est.position, 1.5, atol=3 * SIGMA)
+
+
+@pytest.mark.parametrize("speed", [0.05, -0.2])
+def test_ramp(speed):
+    rng = np.random.default_rng(1)
+    t = np.arange(500) * DT
+    z = 1.5 + speed * t[:, None] + SIGMA * rng.normal(size=(t.size, 2))
+    est = KalmanEstimator(r=SIGMA**2)
+    d = _track(est, z)
+    assert np.all(d[100:] == np.sign(speed))
+    assert np.allclose(est.velocity, speed, atol=0.02)
+    conf = est.confidence()
+    assert np.all((conf > 0.99) & (conf <= 1))
+
+
+def test_control_input():
+    """Commanded velocity shortens the detection of a reversal."""
+    rng = np.random.default_rng(2)
+    n = 400
+    speed = 0.1  # V/s per unit command
+    u = np.ones((n, 2))
+    u[n // 2 :] = -1
+    v = speed * u[:, 0]
+    z = 1.5 + np.cumsum(v) * DT
+    z = z[:, None] + SIGMA * rng.normal(size=(n, 2))
+    lags = []
+    for gain, cmd in [(None, None), ([speed, speed], u)]:
+        est = KalmanEstimator(r=SIGMA**2, gain=gain, tau=0.05)
+        d = _track(est, z, u=cmd)
+        assert np.all(d[n // 2 - 10 : n // 2, 0] == 1)
+        lags.append(np.argmax(d[n // 2 :, 0] == -1))
+    assert lags[1] < lags[0]
+
+
+def test_from_config():
+    config = {"q": 1e-2, "r": 1e-5, "gain": {"az": 0.5}, "nsigma": 2}
+    est = KalmanEstimator.from_config(config)
+    assert est.q == 1e-2
+    assert est.nsigma == 2
+    assert np.all(est.gain == [0.5, 0.0])
+
+
+@pytest.mark.parametrize("u", [250, 480])
+@pytest.mark.parametrize("speed", [0.0, -0.05])
+def test_against_command(u, speed):
+    """A stalled pot, or one moving against the command, is seen as such."""
+    rng = np.random.default_rng(3)
+    t = np.arange(500) * DT
+    z = 1.5 + speed * t[:, None] + SIGMA * rng.normal(size=(t.size, 2))
+    est = KalmanEstimator(q=1e-3, r=SIGMA**2, tau=0.5, gain=[1e-3, 1e-3])
+    cmd = np.full((t.size, 2), u)
+    cmd[: t.size // 4] = 0  # the command starts after a while
+    d = _track(est, z, u=cmd)
+    assert np.all(d[t.size // 2 :] == np.sign(speed))
+    assert np.allclose(est.velocity, speed, atol=0.02)
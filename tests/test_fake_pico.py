@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.fake_pico import FakePico
+
+
+@pytest.fixture
+def pico():
+    pico = FakePico(rate=500, period=2.0, seed=0)
+    pico.start()
+    yield pico
+    pico.close()
+
+
+def _pot(pico, monkeypatch):
+    # keep 21 readings of history at 500 Hz
+    monkeypatch.setattr(emc.Potentiometer, "DIRECTION_WINDOW", 0.04)
+    pot = emc.Potentiometer(port=pico.port)
+    pot.set_emit_rate(pico.rate)
+    return pot
+
+
+def test_stream(pico, monkeypatch):
+    pot = _pot(pico, monkeypatch)
+    assert pot.port == pico.port
+    assert pico.commands == [("R", 500)]
+    v = pot.read_volts_batch(timeout=0.5)
+    for _ in range(20):
+        v = np.concatenate((v, pot.read_volts_batch(timeout=0.5)))
+    assert len(v) > 0
+    lo, hi = pico.volts
+    assert np.all(v >= lo - 1e-3) and np.all(v <= hi + 1e-3)
+    # az and alt sweep in antiphase
+    np.testing.assert_allclose(v.sum(axis=1), lo + hi, atol=1e-3)
+    pot.ser.close()
+
+
+def test_integration_length(pico, monkeypatch):
+    pot = _pot(pico, monkeypatch)
+    pot.set_integration_length(10)
+    assert pico.int_len == 10
+    v = pot.read_volts_batch(timeout=0.5)
+    np.testing.assert_allclose(v.sum(axis=1), sum(pico.volts), atol=1e-3)
+    pot.ser.close()
+
+
+def test_jitter():
+    # delays longer than the frame interval do not slow the stream down
+    pico = FakePico(rate=100, jitter=0.05, seed=0)
+    try:
+        pico.run(duration=1.0)
+    finally:
+        pico.close()
+    assert 90 <= pico.nframes <= 101
+
+
+def test_acquisition_with_faults(monkeypatch):
+    pico = FakePico(rate=1000, drop=0.01, burst=10, jitter=1e-4, seed=1)
+    pico.start()
+    try:
+        pot = _pot(pico, monkeypatch)
+        pot.start()
+        samples = [pot.wait_sample(timeout=1) for _ in range(20)]
+        pot.stop()
+        assert all(s is not None for s in samples)
+        # corrupted frames are dropped (up to the odd CRC-8 collision), the
+        # rest decode to valid volts
+        v = pot.volts
+        ok = (v >= pico.volts[0] - 1e-3) & (v <= pico.volts[1] + 1e-3)
+        assert ok.mean() > 0.9
+        pot.ser.close()
+    finally:
+        pico.close()
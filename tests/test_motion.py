@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.motion import PID
+from fakes import FakeMotor, SimPot
+
+TAU = 0.05  # lag of the pots in seconds
+
+
+def test_pid():
+    pid = PID(2.0, ki=1.0, limit=5)
+    assert pid.update(1.0, 0.0) == 2.0
+    assert pid.update(1.0, 1.0) == pytest.approx(3.0)
+    # saturated, the integrator does not wind up
+    assert pid.update(10.0, 2.0) == 5
+    assert pid.integral == pytest.approx(1.0)
+
+
+def test_goto():
+    motor = FakeMotor()
+    pot = SimPot(motor, [1.0, 2.0], tau=TAU)
+    with pytest.raises(ValueError):
+        motor.goto(az=1.5)
+    motor.attach_pot(pot)
+    results = motor.goto(az=1.5, alt=1.8)
+    tol = emc.motion.load_motion_config()[0]["tol"]
+    assert np.allclose(pot.volts, [1.5, 1.8], atol=tol)
+    assert motor.velocities == {"az": 0, "alt": 0}
+    for m, target in [("az", 1.5), ("alt", 1.8)]:
+        r = results[m]
+        assert r.target == target
+        assert abs(r.error) <= tol
+        assert 0 < r.settle_time < 10
+        assert r.overshoot >= 0
+
+
+def test_goto_checks():
+    motor = FakeMotor()
+    pot = SimPot(motor, [1.0, 2.0], tau=TAU)
+    motor.attach_pot(pot)
+    with pytest.raises(ValueError):
+        motor.goto(az=3.1)
+    assert pot.t == 0  # rejected before moving
+    # the pot moves the other way than the gain in the config says
+    pot.GAIN = -SimPot.GAIN
+    with pytest.raises(RuntimeError):
+        motor.goto(alt=2.5)
+    assert motor.velocities == {"az": 0, "alt": 0}
+    max_away = emc.motion.load_motion_config()[0]["max_away"]
+    assert pot.t < (max_away + 10) * SimPot.DT
+    assert pot.volts[1] < 2.0
+
+
+def test_goto_cancel():
+    motor = FakeMotor()
+    pot = SimPot(motor, [1.0, 2.0], tau=TAU)
+    motor.attach_pot(pot)
+    cancel = threading.Event()
+    cancel.set()
+    results = motor.goto(az=1.5, cancel=cancel)
+    assert results["az"].settle_time is None
+    assert motor.velocities == {"az": 0, "alt": 0}
+    assert pot.t == SimPot.DT  # stopped at the first sample
+
+
+def test_stow():
+    motor = FakeMotor()
+    pot = SimPot(motor, [0.6, 2.3], tau=TAU)
+    motor.attach_pot(pot)
+    results = motor.stow(motors="az")
+    _, stow = emc.motion.load_motion_config()
+    assert set(results) == {"az"}
+    assert results["az"].target == stow["az"]
+    assert pot.volts[1] == 2.3
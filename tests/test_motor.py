@@ -0,0 +1,174 @@
+import logging
+import os
+from pathlib import Path
+import subprocess
+import sys
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.gpio import FakeGPIOBackend, get_backend
+
+
+class FakeI2C:
+    """Records the register writes of a Qwiic motor driver."""
+
+    def __init__(self):
+        self.writes = []
+
+    def readByte(self, address, register):
+        return 0xA9  # SCMD ID
+
+    def writeByte(self, address, register, value):
+        self.writes.append((register, value))
+
+    def writeBlock(self, address, register, values):
+        self.writes.append((register, list(values)))
+
+
+@pytest.fixture
+def motor():
+    i2c = FakeI2C()
+    m = emc.QwiicMotor(logger=logging.getLogger(__name__), i2c_driver=i2c)
+    i2c.writes.clear()  # enable
+    return m, i2c
+
+
+def test_coalescing(motor):
+    m, i2c = motor
+    m.batch = False
+    m.set_velocity(100, 100)
+    assert len(i2c.writes) == 2
+    assert m.writes_issued == 2
+    # identical command is not written again
+    m.set_velocity(100, 100)
+    assert len(i2c.writes) == 2
+    assert m.writes_suppressed == 2
+    # only the changed axis is written
+    m.set_velocity(100, 50)
+    assert len(i2c.writes) == 3
+    assert i2c.writes[-1][0] == m.SCMD_MA_DRIVE + emc.motor.MOTOR_ID["alt"]
+    assert m.writes_issued == 3
+
+
+def test_batch(motor):
+    m, i2c = motor
+    m.set_velocity(100, -100)
+    # both registers in one transaction, same values as set_drive
+    assert len(i2c.writes) == 1
+    register, values = i2c.writes[0]
+    assert register == m.SCMD_MA_DRIVE
+    expected = FakeI2C()
+    m._i2c = expected
+    m.set_drive(emc.motor.MOTOR_ID["az"], 1, 100)
+    m.set_drive(emc.motor.MOTOR_ID["alt"], 0, 100)
+    assert values == [v for _, v in expected.writes]
+    m._i2c = i2c
+    # one changed motor is a single byte write
+    m.set_velocity(50, -100)
+    assert i2c.writes[-1] == (
+        m.SCMD_MA_DRIVE + emc.motor.MOTOR_ID["az"], m._drive_value(1, 50)
+    )
+    assert m.writes_issued == 3
+
+
+def test_resend_interval(motor):
+    m, i2c = motor
+    m.resend_interval = 0
+    m.set_velocity(100, 100)
+    m.set_velocity(100, 100)
+    assert len(i2c.writes) == 2
+    assert m.writes_issued == 4
+    assert m.writes_suppressed == 0
+
+
+def test_stop_always_written(motor):
+    m, i2c = motor
+    m.set_velocity(0, 0)
+    assert len(i2c.writes) == 1
+    m.stop()
+    assert len(i2c.writes) == 2
+    # the direction is irrelevant when stopped
+    m.set_velocity(0, 0)
+    assert len(i2c.writes) == 2
+
+
+def test_clip_speed(motor):
+    m, i2c = motor
+    assert m._clip_speed("az", 10 * m.MAX_SPEED) == m.MAX_SPEED
+    assert m._clip_speed("az", 10 * m.MIN_SPEED) == m.MIN_SPEED
+
+
+@pytest.fixture
+def pololu():
+    gpio = FakeGPIOBackend()
+    m = emc.PololuMotor(logger=logging.getLogger(__name__), backend=gpio)
+    return m, gpio
+
+
+def test_pololu_init(pololu):
+    m, gpio = pololu
+    assert gpio.pins[m.FAULT_PIN] == "in"
+    assert gpio.levels[m.EN_PIN] == gpio.LOW
+    for pin in m.PWM_PINS.values():
+        assert gpio.pwm[pin] == [m.pwm_frequency, 0]
+    assert not m.fault()
+    gpio.inputs[m.FAULT_PIN] = gpio.LOW
+    assert m.fault()
+
+
+def test_pololu_drive(pololu):
+    m, gpio = pololu
+    m.set_velocity(m.MAX_SPEED, m.MAX_SPEED / 2)
+    assert gpio.pwm[m.PWM_PINS["az"]][1] == 100
+    assert gpio.pwm[m.PWM_PINS["alt"]][1] == 50
+    # forward is 0 on this board
+    assert gpio.levels[m.DIR_PINS["az"]] == 0
+    assert gpio.levels[m.DIR_PINS["alt"]] == 0
+    assert m.velocities == {"az": m.MAX_SPEED, "alt": m.MAX_SPEED / 2}
+    # reversing one axis leaves the other alone
+    m.reverse("alt", force=True)
+    assert gpio.levels[m.DIR_PINS["az"]] == 0
+    assert gpio.levels[m.DIR_PINS["alt"]] == 1
+    m.reverse("alt", force=True)
+    # a speed change does not rewrite the direction pin
+    n = len(gpio.calls)
+    m.set_velocity(m.MAX_SPEED / 2, m.MAX_SPEED / 2)
+    assert [c[1] for c in gpio.calls[n:]] == ["pwm_duty_cycle"]
+    with pytest.raises(ValueError):
+        m.change_pwm_frequency(100e3)
+
+
+def test_pololu_cleanup(pololu):
+    m, gpio = pololu
+    m.set_velocity(100, 100)
+    m.cleanup()
+    assert gpio.levels[m.EN_PIN] == gpio.HIGH
+    assert gpio.pwm == {}
+    assert gpio.calls[-1][1] == "cleanup"
+
+
+def test_get_backend():
+    gpio = FakeGPIOBackend()
+    assert get_backend(gpio) is gpio
+    assert isinstance(get_backend("fake"), FakeGPIOBackend)
+    with pytest.raises(ValueError):
+        get_backend("foo")
+
+
+def test_lazy_imports():
+    code = (
+        "import sys; import eigsep_motor_control as emc; emc.PololuMotor; "
+        "print(' '.join(m for m in ['numpy', 'serial', 'qwiic_scmd'] "
+        "if m in sys.modules))"
+    )
+    root = str(Path(__file__).resolve().parent.parent)
+    env = {**os.environ, "PYTHONPATH": root}
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env
+    )
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == ""
+    # the drivers are still reachable from the motor module
+    assert emc.motor.QwiicMotor is emc.QwiicMotor
+    with pytest.raises(AttributeError):
+        emc.NoSuchMotor
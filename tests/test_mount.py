@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+import numpy as np
+import pytest
+
+from eigsep_motor_control import config
+from eigsep_motor_control.clock import VirtualClock
+from eigsep_motor_control.mount import Mount, MultiController, load_mounts
+
+logger = logging.getLogger(__name__)
+
+
+def dummy_mounts(n, clock, axes=("az", "alt")):
+    (default,) = load_mounts({})  # one mount without a mounts section
+    assert default["board"] == "pololu"
+    spec = {**default, "board": "dummy", "axes": list(axes)}
+    return [
+        Mount.from_config({**spec, "name": f"m{i}"}, logger, clock=clock)
+        for i in range(n)
+    ]
+
+
+def step(mounts, clock, dt):
+    clock.advance(dt)
+    for m in mounts:
+        m.motor.step(dt)
+        m.pot.step(dt)
+        m.pot.emit()
+
+
+def test_matches_trigger_reverse():
+    clock = VirtualClock()
+    mounts = dummy_mounts(3, clock)
+    ctrl = MultiController(mounts)
+    rng = np.random.default_rng(1)
+    for m in mounts:
+        m.motor.set_velocity(*rng.choice([-250, 250], 2))
+    for _ in range(200):
+        step(mounts, clock, 0.5)
+        reverse, _, _ = ctrl.check(clock.time())
+        expected = [
+            m.pot._trigger_reverse(a, m.pot.last_volts(a))
+            for m in mounts
+            for a in m.axes
+        ]
+        assert reverse.tolist() == expected
+        for k in np.flatnonzero(reverse):
+            i, a = ctrl.axes[k]
+            mounts[i].motor.reverse(a, force=True)
+
+
+def test_state_arrays():
+    clock = VirtualClock()
+    mounts = dummy_mounts(2, clock)
+    ctrl = MultiController(mounts)
+    # the motors and pots write into the arrays, nothing is gathered
+    mounts[1].motor.set_velocity(100, -50)
+    assert ctrl.velocities.tolist() == [[0, 0], [100, -50]]
+    step(mounts, clock, 0.5)
+    for i, m in enumerate(mounts):
+        assert ctrl.volts[i].tolist() == m.pot.last_volts().tolist()
+        assert ctrl.direction[i].tolist() == list(m.pot.direction.values())
+    ctrl.unbind()
+    mounts[1].motor.set_velocity(0, 0)
+    assert ctrl.velocities[1].tolist() == [100, -50]
+
+
+def test_multi_mount_run():
+    clock = VirtualClock()
+    mounts = dummy_mounts(4, clock, axes=["az"])
+    for m in mounts:
+        m.motor.set_velocity(250, 0)
+    ctrl = MultiController(mounts, logger=logger)
+    assert len(ctrl.axes) == 4
+    for _ in range(400):
+        step(mounts, clock, 0.5)
+        ctrl.tick()
+    # every mount bounces between its az limits and never reverses alt
+    assert np.all(ctrl.reversals >= 2)
+    for m in mounts:
+        vmin, vmax = m.pot.VOLT_RANGE["az"]
+        assert vmin - 0.1 < m.pot.last_volts("az") < vmax + 0.1
+        assert m.motor.velocities["alt"] == 0
+
+
+def test_run_on_samples():
+    clock = VirtualClock()
+    mounts = dummy_mounts(2, clock, axes=["az"])
+    for m in mounts:
+        m.motor.set_velocity(250, 0)
+    ctrl = MultiController(mounts, logger=logger)
+    thd = threading.Thread(target=ctrl.run, daemon=True)
+    thd.start()
+    # the samples published by the pots drive the checks
+    for _ in range(400):
+        step(mounts, clock, 0.5)
+        time.sleep(0.001)
+    ctrl.stop()
+    thd.join(timeout=1)
+    assert not thd.is_alive()
+    assert np.all(ctrl.reversals >= 2)
+
+
+def test_mount_volt_range(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    monkeypatch.setenv(config.ENV_VAR, str(path))
+    c = config.load(config.DEFAULT_PATH)
+    volt_range = {"az": [0.3, 2.0], "alt": [0.6, 2.8]}
+    c["mounts"] = [
+        {"name": "east", "board": "dummy", "volt_range": volt_range},
+        {"name": "west", "board": "dummy", "axes": ["alt"]},
+    ]
+    config.save(c)
+    specs = load_mounts()
+    assert [s["name"] for s in specs] == ["east", "west"]
+    clock = VirtualClock()
+    east, west = [Mount.from_config(s, clock=clock) for s in specs]
+    assert east.pot.VOLT_RANGE == volt_range
+    assert west.axes == ["alt"]
+    # the override survives a config reload
+    east.pot.apply_config(c)
+    east.apply_config(c)
+    assert east.pot.VOLT_RANGE == volt_range
+    c["mounts"][1]["name"] = "east"
+    with pytest.raises(ValueError):
+        config.save(c)
+    with pytest.raises(ValueError):
+        MultiController([east, east])
+
+
+def test_default_name(tmp_path, monkeypatch):
+    monkeypatch.setenv(config.ENV_VAR, str(tmp_path / "config.yaml"))
+    c = config.load(config.DEFAULT_PATH)
+    volt_range = {"az": [0.3, 2.0], "alt": [0.6, 2.8]}
+    c["mounts"] = [{"board": "dummy", "volt_range": volt_range}]
+    config.save(c)
+    (spec,) = load_mounts()
+    mount = Mount.from_config(spec, clock=VirtualClock())
+    assert mount.name == "main"
+    # a mount without a name in the config is the default one
+    volt_range = {"az": [0.4, 1.9], "alt": [0.6, 2.8]}
+    c["mounts"][0]["volt_range"] = volt_range
+    mount.apply_config(c)
+    assert mount.pot.VOLT_RANGE == volt_range
@@ -0,0 +1,225 @@
+import threading
+import time
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import protocol
+
+
+class FakeSerial:
+    """In-memory stand-in for serial.Serial fed with pot frames."""
+
+    def __init__(self, port=None, baudrate=None, **kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.buf = bytearray()
+        self.cond = threading.Condition()
+        self.written = bytearray()
+
+    def feed(self, data):
+        with self.cond:
+            self.buf.extend(data)
+            self.cond.notify_all()
+
+    @property
+    def in_waiting(self):
+        return len(self.buf)
+
+    def read(self, size=1):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.buf) >= size, 0.05)
+            data = bytes(self.buf[:size])
+            del self.buf[:size]
+        return data
+
+    def write(self, data):
+        self.written.extend(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self.cond:
+            self.buf.clear()
+
+
+def _frames(data):
+    return b"".join(protocol.encode_frame(v1, v2) for v1, v2 in data)
+
+
+@pytest.fixture
+def pot(monkeypatch):
+    ser = FakeSerial()
+    monkeypatch.setattr(emc.potentiometer.serial, "Serial", lambda **kw: ser)
+    # keep 5 readings of history at the default rate
+    monkeypatch.setattr(emc.Potentiometer, "DIRECTION_WINDOW", 0.08)
+    nbits = emc.Potentiometer.NBITS
+    int_len = emc.serial_params.INT_LEN
+    # frames consumed by reset_volt_readings in __init__, sent after the
+    # input buffer is reset
+    frames = _frames([[2**nbits // 2 * int_len] * 2] * 5)
+    timer = threading.Timer(0.05, ser.feed, [frames])
+    timer.start()
+    pot = emc.Potentiometer()
+    timer.join()
+    yield pot
+    pot.stop(timeout=1)
+
+
+def _to_bits(volts):
+    res = 2**emc.Potentiometer.NBITS - 1
+    return np.round(volts / emc.Potentiometer.VMAX * res).astype(int)
+
+
+def test_read_volts(pot):
+    volts = np.array([[1.7, 1.6], [1.8, 1.5], [1.9, 1.4]])
+    int_len = emc.serial_params.INT_LEN
+    pot.ser.feed(_frames(_to_bits(volts) * int_len))
+    for v in volts:
+        assert np.allclose(pot.read_volts(), v, atol=1e-4)
+    assert np.allclose(pot.volts[-3:], volts, atol=1e-4)
+    assert np.allclose(pot.last_volts(), volts[-1], atol=1e-4)
+    assert np.isclose(pot.last_volts("alt"), volts[-1, 1], atol=1e-4)
+    assert pot.direction == {"az": 1, "alt": -1}
+
+
+def test_acquisition(pot):
+    volts = np.linspace(0.5, 1.5, 20)[:, None] * np.ones(2)
+    samples = []
+    done = threading.Event()
+
+    def callback(t, v):
+        samples.append((t, v))
+        if len(samples) == len(volts):
+            done.set()
+
+    pot.subscribe(callback)
+    pot.start(bulk=False)
+    pot.ser.feed(_frames(_to_bits(volts) * emc.serial_params.INT_LEN))
+    assert done.wait(timeout=5)
+    # every frame is published, in order, with increasing timestamps
+    t = np.array([s[0] for s in samples])
+    v = np.array([s[1] for s in samples])
+    assert np.all(np.diff(t) >= 0)
+    assert np.allclose(v, volts, atol=1e-4)
+    assert pot.sample[1] is samples[-1][1]
+    pot.unsubscribe(callback)
+
+
+def test_monitor(pot):
+    pot.VOLT_RANGE = {"az": [0.5, 1.2], "alt": [0.5, 3.0]}
+    first, az, alt = threading.Event(), threading.Event(), threading.Event()
+    pot.monitor(first, None)
+    pot.monitor(az, alt)
+    # the second call replaces the subscriber of the first
+    assert len(pot._subscribers) == 1
+    volts = np.full((20, 2), pot.last_volts("alt"))  # alt does not move
+    volts[:, 0] = np.linspace(0.8, 1.5, 20)
+    pot.ser.feed(_frames(_to_bits(volts) * emc.serial_params.INT_LEN))
+    assert az.wait(timeout=5)
+    assert not first.is_set()
+    assert not alt.is_set()
+    pot.monitor(None, None)
+    assert pot._subscribers == []
+
+
+def test_stop_timeout(pot):
+    release = threading.Event()
+    busy = threading.Event()
+
+    def callback(t, v):
+        busy.set()
+        release.wait(5)
+
+    pot.subscribe(callback)
+    pot.start()
+    pot.ser.feed(_frames([[100, 200]]))
+    assert busy.wait(timeout=5)
+    # the thread is stuck in the subscriber and outlives the join
+    pot.stop(timeout=0.05)
+    assert pot._acq_thread is not None
+    with pytest.raises(RuntimeError):
+        pot.start()
+    release.set()
+    pot.stop(timeout=5)
+    assert pot._acq_thread is None
+    pot.unsubscribe(callback)
+
+
+def test_read_volts_batch(pot):
+    volts = np.linspace(0.5, 1.5, 12)[:, None] * np.ones(2)
+    pot.ser.feed(_frames(_to_bits(volts) * emc.serial_params.INT_LEN))
+    v = pot.read_volts_batch()
+    assert np.allclose(v, volts, atol=1e-4)
+    assert np.allclose(pot.volts, volts[-pot.size :], atol=1e-4)
+    assert pot.ser.in_waiting == 0
+    # non-blocking and deadline reads with nothing waiting
+    assert pot.read_volts_batch(timeout=0).shape == (0, 2)
+    t0 = time.monotonic()
+    assert pot.read_volts_batch(timeout=0.05).shape == (0, 2)
+    assert time.monotonic() - t0 < 1
+
+
+def test_record_dt(pot, monkeypatch):
+    steps = []
+    monkeypatch.setattr(
+        pot.estimator, "update", lambda z, dt, u=None: steps.append(dt)
+    )
+    pot._last_t = None
+    v = np.ones((4, 2))
+    pot._record(v[:1], t=10.0)
+    # the time since the previous call is spread over a batch
+    pot._record(v, t=10.2)
+    # a repeated or missing timestamp falls back to the emit rate
+    pot._record(v[:1], t=10.2)
+    assert steps[0] == pytest.approx(1 / pot.emit_rate)
+    assert steps[1:5] == pytest.approx([0.05] * 4)
+    assert steps[5] == pytest.approx(1 / pot.emit_rate)
+
+
+def test_acquisition_bulk(pot):
+    volts = np.linspace(0.5, 1.5, 20)[:, None] * np.ones(2)
+    pot.ser.feed(_frames(_to_bits(volts) * emc.serial_params.INT_LEN))
+    samples = []
+    done = threading.Event()
+
+    def callback(t, v):
+        samples.append(v)
+        done.set()
+
+    pot.subscribe(callback)
+    pot.start()
+    assert done.wait(timeout=5)
+    # the backlog is drained in one go and only the latest is published
+    assert len(samples) == 1
+    assert np.allclose(samples[0], volts[-1], atol=1e-4)
+    assert np.allclose(pot.volts, volts[-pot.size :], atol=1e-4)
+
+
+def test_wait_sample(pot):
+    pot.start()
+    assert pot.wait_sample(timeout=0.05) is None
+    timer = threading.Timer(0.05, pot.ser.feed, [_frames([[100, 200]])])
+    timer.start()
+    t0 = time.monotonic()
+    sample = pot.wait_sample(timeout=5)
+    assert sample is not None
+    assert sample[0] >= t0
+    timer.join()
+
+
+def test_set_integration_length(pot):
+    volts = np.array([[1.0, 2.0]] * pot.size)
+    # frames with the new length arrive after the old ones are flushed
+    frames = _frames(_to_bits(volts) * 50)
+    timer = threading.Timer(0.5, pot.ser.feed, [frames])
+    timer.start()
+    pot.set_integration_length(50)
+    timer.join()
+    assert pot.ser.written == b"I 50\n"
+    assert pot.int_len == 50
+    assert np.allclose(pot.volts, volts, atol=1e-4)
+    with pytest.raises(ValueError):
+        pot.set_integration_length(emc.serial_params.MAX_INT_LEN + 1)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from eigsep_motor_control.predictor import LimitPredictor
+
+
+def test_time_to_limit():
+    ttl = LimitPredictor.time_to_limit
+    assert ttl(1.0, 0.5, 0.5, 2.0) == pytest.approx(2.0)
+    assert ttl(1.0, -0.25, 0.5, 2.0) == pytest.approx(2.0)
+    assert ttl(1.0, 0.0, 0.5, 2.0) == np.inf
+    # past the limit
+    assert ttl(2.1, 0.5, 0.5, 2.0) < 0
+
+
+def test_should_reverse():
+    pred = LimitPredictor.from_config({"az": {"lead_time": 0.5}})
+    assert pred.horizon("az") == 0.5
+    assert pred.horizon("alt") == 0
+    # 0.4 s from the limit
+    assert pred.should_reverse("az", 1.8, 0.5, 0.5, 2.0)
+    assert not pred.should_reverse("alt", 1.8, 0.5, 0.5, 2.0)
+    assert pred.should_reverse("alt", 2.0, 0.5, 0.5, 2.0)
+    assert not pred.should_reverse("az", 1.0, 0.5, 0.5, 2.0)
+
+
+def test_observe_latency():
+    pred = LimitPredictor(lead_time={"az": 0.1}, alpha=0.5)
+    pred.observe_latency("az", 0.2)
+    pred.observe_latency("az", 0.2)
+    assert pred.latency["az"] == pytest.approx(0.15)
+    assert pred.horizon("az") == pytest.approx(0.25)
+    # 0.2 s from the limit is now within the horizon
+    assert pred.should_reverse("az", 1.9, 0.5, 0.5, 2.0)
@@ -0,0 +1,61 @@
+import struct
+import numpy as np
+import pytest
+
+from eigsep_motor_control import protocol
+
+
+def _generate_frames(seed, nframes):
+    rng = np.random.default_rng(seed=seed)
+    data = rng.integers(0, 100 * 2**16, size=(nframes, 2))
+    stream = b"".join(protocol.encode_frame(v1, v2) for v1, v2 in data)
+    return data, stream
+
+
+def test_encode_frame():
+    frame = protocol.encode_frame(1234, 5678)
+    assert len(frame) == protocol.FRAME_SIZE
+    assert frame[:2] == protocol.SYNC
+    assert struct.unpack("<ii", frame[2:-1]) == (1234, 5678)
+    assert frame[-1] == protocol.crc8(frame[2:-1])
+
+
+@pytest.mark.parametrize("seed", [0, 42, 2024, 7385])
+def test_decode_frames(seed):
+    data, stream = _generate_frames(seed, 50)
+    decoded, remainder = protocol.decode_frames(stream)
+    assert np.all(decoded == data)
+    assert len(remainder) < protocol.FRAME_SIZE
+
+
+def test_decode_partial():
+    data, stream = _generate_frames(1, 10)
+    cut = 5 * protocol.FRAME_SIZE + 3
+    first, remainder = protocol.decode_frames(stream[:cut])
+    assert np.all(first == data[:5])
+    second, remainder = protocol.decode_frames(remainder + stream[cut:])
+    assert np.all(second == data[5:])
+    assert len(remainder) == 0
+
+
+def test_decode_resync():
+    data, stream = _generate_frames(2, 10)
+    stream = bytearray(stream)
+    # garbage before the first frame, corrupt frame 3, drop a byte of frame 6
+    stream[3 * protocol.FRAME_SIZE + 4] ^= 0xFF
+    del stream[6 * protocol.FRAME_SIZE + 5]
+    stream = b"\x00\xa5\x13" + stream
+    decoded, _ = protocol.decode_frames(stream)
+    expected = np.delete(data, [3, 6], axis=0)
+    assert np.all(decoded == expected)
+
+
+def test_decode_short():
+    decoded, remainder = protocol.decode_frames(b"\xa5\x5a\x00")
+    assert decoded.shape == (0, 2)
+    assert remainder == b"\xa5\x5a\x00"
+
+
+def test_encode_command():
+    assert protocol.encode_command(protocol.CMD_INT_LEN, 250) == b"I 250\n"
+    assert protocol.encode_command(protocol.CMD_EMIT_RATE, 100.0) == b"R 100\n"
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from eigsep_motor_control import replay, telemetry
+
+RATE = 10
+PERIOD = 40  # seconds of a back-and-forth sweep of the az pot
+
+
+def triangle(duration=200):
+    t = np.arange(0, duration, 1 / RATE)
+    phase = (t % PERIOD) / PERIOD
+    az = np.where(phase < 0.5, 0.4 + 2 * phase, 1.4 - 2 * (phase - 0.5))
+    return t, np.stack([az, np.full_like(az, 2.3)], axis=1)
+
+
+def records(duration=200):
+    """Telemetry of the triangle with a reversal at each turnaround."""
+    t, v = triangle(duration)
+    turns = np.arange(PERIOD / 2, duration, PERIOD / 2)
+    rec = np.zeros(len(t) + len(turns) + 1, dtype=telemetry.RECORD_DTYPE)
+    rec[: len(t)]["t"] = t
+    rec[: len(t)]["kind"] = telemetry.SAMPLE
+    rec[: len(t)]["values"] = v
+    rec[len(t)] = (0, telemetry.VELOCITY, -1, (100, 0))
+    for i, tt in enumerate(turns):
+        vel = -100 if i % 2 == 0 else 100
+        rec[len(t) + 1 + i] = (tt, telemetry.REVERSAL, 0, (0, vel))
+    return np.sort(rec, order="t")
+
+
+def test_closed_loop():
+    t, v = triangle()
+    r = replay.Replay(t, v, velocities=(100, 0), motors=["az"], safe=False)
+    result = r.run()
+    assert result["samples"] == len(t)
+    # one reversal per limit crossing of the recording
+    assert 8 <= result["reversals"]["az"] <= 11
+    assert result["reversals"]["alt"] == 0
+    assert "recorded" not in result
+
+
+def test_follow_recording():
+    result = replay.replay(records(), motors=["az"])
+    assert result["recorded"]["az"] == 9
+    assert result["missed"]["az"] == 0
+    # reversed ahead of the turnarounds, which are beyond the limits
+    assert -5 < result["lag"]["az"] < 0
+    assert result["limits"] == []
+
+
+def test_params():
+    rec = records()
+    long = replay.replay(rec, {"debounce_interval": 30}, motors=["az"])
+    short = replay.replay(rec, {"debounce_interval": 1}, motors=["az"])
+    assert long["reversals"]["az"] < short["reversals"]["az"]
+    # narrower limits reverse earlier
+    volt_range = {"az": [0.7, 1.1], "alt": [2.2, 2.4]}
+    narrow = replay.replay(rec, {"VOLT_RANGE": volt_range}, motors=["az"])
+    assert narrow["lag"]["az"] < short["lag"]["az"]
+    with pytest.raises(ValueError):
+        replay.replay(rec, {"bogus": 1})
+
+
+def test_sweep(tmp_path):
+    with telemetry.TelemetryRecorder(tmp_path, clock=lambda: 0.0) as rec:
+        for r in records(100):
+            rec.record(r["kind"], r["motor"], r["values"], t=r["t"])
+    params = replay.grid(size=[5, 41], debounce_interval=[1, 5])
+    assert len(params) == 4
+    results = replay.sweep(tmp_path, params, processes=2, motors=["az"])
+    assert [p for p, _ in results] == params
+    for _, r in results:
+        assert r["recorded"]["az"] == 4
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from eigsep_motor_control.ring_buffer import RingBuffer
+
+
+@pytest.mark.parametrize("size", [2, 5, 17])
+def test_ring_buffer(size):
+    rng = np.random.default_rng(seed=size)
+    data = rng.normal(size=(3 * size + 1, 2))
+    rb = RingBuffer(size, 2)
+    assert len(rb) == 0
+    assert np.all(rb.slope == 0)
+    for i, x in enumerate(data):
+        rb.append(x)
+        window = data[max(0, i + 1 - size) : i + 1]
+        assert len(rb) == len(window)
+        assert np.allclose(rb.values, window)
+        assert np.allclose(rb.mean, window.mean(axis=0))
+        assert np.allclose(rb.newest, window[-1])
+        assert np.allclose(rb.oldest, window[0])
+        if len(window) > 1:
+            slope = np.mean(np.diff(window, axis=0), axis=0)
+            assert np.allclose(rb.slope, slope)
+    rb.clear()
+    assert len(rb) == 0
+    assert rb.values.shape == (0, 2)
+
+
+def test_ring_buffer_size():
+    with pytest.raises(ValueError):
+        RingBuffer(1, 2)
+
+
+@pytest.mark.parametrize("size", [2, 5, 17])
+def test_ring_buffer_extend(size):
+    rng = np.random.default_rng(seed=size)
+    data = rng.normal(size=(10 * size, 2))
+    chunks = np.split(data, np.cumsum(rng.integers(0, 2 * size, size=8)))
+    rb = RingBuffer(size, 2)
+    ref = RingBuffer(size, 2)
+    for chunk in chunks:
+        rb.extend(chunk)
+        for x in chunk:
+            ref.append(x)
+        assert len(rb) == len(ref)
+        assert np.allclose(rb.values, ref.values)
+        assert np.allclose(rb.mean, ref.mean)
+        assert np.allclose(rb.slope, ref.slope)
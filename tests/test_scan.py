@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from eigsep_motor_control import scan
+from fakes import FakeMotor, SimPot
+
+VOLT_RANGE = {"az": (0.5, 1.5), "alt": (2.0, 2.5)}
+
+
+def test_raster():
+    points = scan.raster(3, VOLT_RANGE, margin=0.1)
+    assert points.shape == (6, 2)
+    assert np.allclose(points[:, 0], [0.6, 1.4, 1.4, 0.6, 0.6, 1.4])
+    assert np.allclose(points[:, 1], [2.1, 2.1, 2.25, 2.25, 2.4, 2.4])
+
+
+def test_spiral():
+    points = scan.spiral(2, 50, VOLT_RANGE)
+    assert np.allclose(points[0], [1.0, 2.25])
+    assert np.all(points[:, 0] >= 0.5) and np.all(points[:, 0] <= 1.5)
+    assert np.all(points[:, 1] >= 2.0) and np.all(points[:, 1] <= 2.5)
+
+
+def test_plan():
+    points = [[1.0, 2.0], [1.4, 2.1], [1.4, 2.3]]
+    table = scan.plan(points, [0.4, 0.1], dwell=[0, 1, 0])
+    assert table.dtype == scan.WAYPOINT_DTYPE
+    # segment 1 is limited by az (1 s), segment 2 by alt (2 s)
+    assert np.allclose(table["t"], [0, 1, 4])
+    vel, duration = scan.segments(np.diff(points, axis=0), [0.4, 0.1])
+    assert np.allclose(vel, [[0.4, 0.1], [0, 0.1]])
+    assert np.allclose(duration, [1, 2])
+
+
+def test_check_points():
+    scan.check_points(scan.raster(3, VOLT_RANGE), VOLT_RANGE)
+    # limits may be given in either order
+    scan.check_points([[1.0, 2.2]], {"az": (1.5, 0.5), "alt": (2.5, 2.0)})
+    with pytest.raises(ValueError):
+        scan.check_points([[1.0, 2.2], [1.6, 2.2]], VOLT_RANGE)
+
+
+@pytest.mark.parametrize("dwell", [0.0, 0.5])
+def test_executor(dwell):
+    motor = FakeMotor()
+    pot = SimPot(motor, [1.0, 2.25])
+    points = scan.raster(2, VOLT_RANGE, margin=0.1)
+    max_vel = np.max(np.abs(SimPot.GAIN)) * motor.MAX_SPEED
+    table = scan.plan(points, [max_vel, max_vel], dwell=dwell, start=pot.volts)
+    gain = dict(zip(["az", "alt"], SimPot.GAIN))
+    ex = scan.ScanExecutor(
+        motor, pot, table, gain=gain, lookahead=0.1, volt_range=VOLT_RANGE
+    )
+    report = ex.run()
+    tol = 0.1 * max_vel + 2 * max_vel * SimPot.DT
+    assert np.all(report["arrival_error"] < tol)
+    assert np.all(np.diff(report["arrival_time"]) > 0)
+    assert report["duration"] == pytest.approx(
+        report["planned_duration"], rel=0.2
+    )
+    assert motor.velocities == {"az": 0, "alt": 0}
+
+
+class StalledPot(SimPot):
+    """Pots whose stream stops after ``n'' samples."""
+
+    def __init__(self, motor, volts, n):
+        super().__init__(motor, volts)
+        self.n = n
+
+    def wait_sample(self, timeout=None):
+        if self.n == 0:
+            return None
+        self.n -= 1
+        return super().wait_sample(timeout=timeout)
+
+
+def test_executor_stall(monkeypatch):
+    monkeypatch.setattr(scan, "MAX_MISSED", 2)
+    motor = FakeMotor()
+    pot = StalledPot(motor, [1.0, 2.25], 10)
+    table = scan.plan([[1.4, 2.25]], [0.48, 0.48], start=pot.volts)
+    gain = dict(zip(["az", "alt"], SimPot.GAIN))
+    ex = scan.ScanExecutor(motor, pot, table, gain=gain, volt_range=VOLT_RANGE)
+    with pytest.raises(RuntimeError):
+        ex.run()
+    assert motor.velocities == {"az": 0, "alt": 0}
+    # the limits of the pot by default
+    pot.VOLT_RANGE = {"az": (0.5, 1.2), "alt": (2.0, 2.5)}
+    with pytest.raises(ValueError):
+        scan.ScanExecutor(motor, pot, table, gain=gain)
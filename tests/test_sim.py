@@ -0,0 +1,94 @@
+import logging
+import time
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control.clock import VirtualClock
+from eigsep_motor_control.sim import Simulator, replay_run
+
+logger = logging.getLogger(__name__)
+
+
+def test_virtual_clock():
+    clock = VirtualClock(t0=10)
+    clock.sleep(2.5)
+    assert clock.time() == 12.5
+    slept = []
+    clock.on_sleep = slept.append
+    clock.sleep(1)
+    assert slept == [1]
+    assert clock.time() == 12.5
+
+
+def test_debounce():
+    clock = VirtualClock()
+    motor = emc.DummyMotor(logger=logger, clock=clock)
+    motor.set_velocity(100, 100)
+    motor.reverse("az")
+    assert motor.velocities["az"] == -100
+    clock.advance(motor.debounce_interval / 2)
+    assert not motor.should_reverse("az")
+    motor.reverse("az")
+    assert motor.velocities["az"] == -100
+    clock.advance(motor.debounce_interval)
+    assert motor.should_reverse("az")
+
+
+def test_simulator_steps():
+    clock = VirtualClock()
+    motor = emc.DummyMotor(logger=logger, clock=clock)
+    pot = emc.DummyPotentiometer(motor)
+    assert motor.update_thread is None
+    assert not hasattr(pot, "update_thread")
+    sim = Simulator(motor, pot, dt=0.1)
+    samples = []
+    pot.subscribe(lambda t, v: samples.append((t, v)))
+    motor.set_velocity(250, -250)
+    v0 = pot.last_volts()
+    sim.run(10)
+    assert clock.time() == pytest.approx(sim.clock.t)
+    assert len(samples) == 10 * pot.emit_rate
+    assert motor.simulated_positions["az"] == pytest.approx(2500)
+    v = pot.last_volts()
+    assert v[0] > v0[0] and v[1] < v0[1]
+    assert pot.direction == {"az": 1, "alt": -1}
+    # sleeping on the clock steps the simulation
+    clock.sleep(1)
+    assert len(samples) == 11 * pot.emit_rate
+    t, v = pot.wait_sample()
+    assert t == samples[-1][0]
+
+
+def test_simulator_needs_shared_clock():
+    motor = emc.DummyMotor(logger=logger, clock=VirtualClock())
+    pot = emc.DummyPotentiometer(motor, clock=VirtualClock())
+    with pytest.raises(ValueError):
+        Simulator(motor, pot)
+
+
+def test_replay_safe_run():
+    t0 = time.perf_counter()
+    result = replay_run(3600, safe=True, dt=0.05, logger=logger)
+    assert time.perf_counter() - t0 < 30
+    assert result["completed"]
+    assert result["time"] >= 3600
+    assert result["reversals"]["az"] > 0 and result["reversals"]["alt"] > 0
+    # the pots stay near the limits
+    motor = emc.DummyMotor(logger=logger, clock=VirtualClock())
+    volt_range = emc.DummyPotentiometer(motor).VOLT_RANGE
+    for i, m in enumerate(["az", "alt"]):
+        vmin, vmax = volt_range[m]
+        assert vmin - 0.05 < result["volts"][i] < vmax + 0.05
+    # deterministic
+    again = replay_run(3600, safe=True, dt=0.05, logger=logger)
+    assert again["reversals"] == result["reversals"]
+    assert again["positions"] == result["positions"]
+    np.testing.assert_array_equal(again["volts"], result["volts"])
+
+
+def test_replay_stall():
+    # nothing moves, the safe controller exits after the stall timeout
+    result = replay_run(60, az_vel=0, alt_vel=0, safe=True, logger=logger)
+    assert not result["completed"]
+    assert result["time"] < 20
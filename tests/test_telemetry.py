@@ -0,0 +1,73 @@
+import threading
+import time
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import telemetry
+
+
+def test_roundtrip(tmp_path):
+    rec = telemetry.TelemetryRecorder(tmp_path, clock=lambda: 10.0)
+    with rec:
+        rec.velocity(100, -50)
+        for i in range(100):
+            rec.sample(float(i), np.array([1.0 + i / 100, 2.0]))
+        rec.limit("alt", True, t=50.0)
+        rec.reversal("az", 0.01, -100, t=60.0)
+    data = telemetry.read_all(tmp_path)
+    assert len(data) == rec.nrecords == 103
+    assert data.dtype == telemetry.RECORD_DTYPE
+    samples = telemetry.read_all(tmp_path, kind="sample")
+    assert np.allclose(samples["values"][:, 0], 1 + np.arange(100) / 100)
+    # timestamps are stored as unix time
+    assert np.allclose(np.diff(samples["t"]), 1)
+    assert abs(data["t"][0] - time.time()) < 60
+    rev = data[data["kind"] == telemetry.REVERSAL][0]
+    assert rev["motor"] == 0
+    assert tuple(rev["values"]) == (0.01, -100)
+    lim = data[data["kind"] == telemetry.LIMIT][0]
+    assert lim["motor"] == 1 and lim["values"][0] == 1
+    assert isinstance(telemetry.read(rec.path), np.memmap)
+
+
+def test_rotation(tmp_path):
+    size = 20 * telemetry.RECORD_DTYPE.itemsize + telemetry.HEADER_SIZE
+    rec = telemetry.TelemetryRecorder(tmp_path, max_bytes=size)
+    rec.start()
+    for i in range(50):
+        rec.sample(float(i), (1.0, 2.0))
+    rec.stop()
+    files = telemetry.files(tmp_path)
+    assert len(files) == 3
+    for f in files:
+        assert f.stat().st_size <= size
+    data = telemetry.read_all(tmp_path)
+    t = data["t"] - data["t"][0]
+    assert np.allclose(t, np.arange(50))
+
+
+def test_not_telemetry(tmp_path):
+    path = tmp_path / "telemetry_x.bin"
+    path.write_bytes(b"\0" * 100)
+    with pytest.raises(ValueError):
+        telemetry.read(path)
+
+
+def test_controller_records_reversals(tmp_path):
+    from fakes import FakeMotor, FakePot
+
+    motor = FakeMotor()
+    motor.set_velocity(100, 0)
+    rec = telemetry.TelemetryRecorder(tmp_path)
+    rec.start()
+    ctrl = emc.Controller(motor, FakePot(), motors=["az"], telemetry=rec)
+    thd = threading.Thread(target=ctrl.run, daemon=True)
+    thd.start()
+    ctrl.on_sample(time.monotonic(), np.array([2.6, 1.0]))
+    ctrl.stop()
+    thd.join(timeout=1)
+    rec.stop()
+    rev = telemetry.read_all(tmp_path, kind="reversal")
+    assert len(rev) == 1
+    assert rev["values"][0, 1] == -100
@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+import numpy as np
+import pytest
+
+import eigsep_motor_control as emc
+from eigsep_motor_control import tracing
+
+
+@pytest.fixture
+def tracer():
+    tr = tracing.enable()
+    yield tr
+    tracing.disable()
+
+
+def test_tracer(tmp_path):
+    tr = tracing.Tracer(clock=lambda: 0.0)
+    times = dict(zip(tracing.STAGES, [0, 1e-3, 1.1e-3, 2e-3, 2e-3, 5e-3]))
+    for stage, t in times.items():
+        tr.stamp("a", stage, t)
+    assert tr.inflight == {}
+    assert tr.completed == 1
+    summary = tr.summary()
+    assert summary["frame->write"]["count"] == 1
+    assert summary["frame->write"]["max"] == pytest.approx(5e-3)
+    assert summary["frame->trigger"]["p50"] >= 1e-3
+    # a discarded trace is not counted
+    tr.stamp("b", "frame", 0)
+    tr.discard("b")
+    assert tr.inflight == {}
+    path = tmp_path / "trace.json"
+    tr.export(path)
+    data = json.loads(path.read_text())
+    assert data["completed"] == 1
+    counts = np.array(data["histograms"]["post->wake"])
+    assert counts.sum() == 1
+
+
+def test_inflight_bounded():
+    tr = tracing.Tracer(max_inflight=3)
+    for i in range(5):
+        tr.stamp(i, "frame", 0)
+    assert list(tr.inflight) == [2, 3, 4]
+    assert tr.dropped == 2
+
+
+def test_controller_trace(tracer):
+    from fakes import FakeMotor, FakePot
+
+    motor = FakeMotor()
+    motor.set_velocity(100, 0)
+    ctrl = emc.Controller(motor, FakePot(), motors=["az"])
+    thd = threading.Thread(target=ctrl.run, daemon=True)
+    thd.start()
+    ctrl.on_sample(time.monotonic(), np.array([2.6, 1.0]))
+    # debounced, the trace is discarded
+    ctrl.on_sample(time.monotonic(), np.array([2.7, 1.0]))
+    ctrl.stop()
+    thd.join(timeout=5)
+    assert tracer.completed == 1
+    assert tracer.inflight == {}
+    summary = tracer.summary()
+    for a, b in zip(tracing.STAGES[:-1], tracing.STAGES[1:]):
+        assert summary[f"{a}->{b}"]["count"] == 1
+    assert summary["frame->write"]["max"] == pytest.approx(
+        ctrl.latencies["az"][0], abs=1e-3
+    )